@@ -1,7 +1,13 @@
+import re
+
 from django.contrib import admin
 from django.utils.html import format_html
 from .models import SEOSettings, ContactSubmission, MovingRequest, TeamMember
+from . import exports, images, seo_cache
+from .pagination import EstimatedCountPaginator
+
 
+PHONE_RE = re.compile(r"\+?[\d\s()-]{6,}")
 
 admin.site.site_header = "Gati Expert"  # Changes the main header text
 admin.site.site_title = "Expert Gati Movers and Packers"    # Changes the HTML <title> tag and the text in the browser tab
@@ -143,14 +149,10 @@ class SEOSettingsAdmin(admin.ModelAdmin):
         js = ('admin/js/seo_admin_custom.js',)  # Optional: create this for custom JS
     
     def save_model(self, request, obj, form, change):
-        """Add custom save logic if needed"""
+        """Save and drop cached SEO lookups so the change is live immediately"""
         super().save_model(request, obj, form, change)
-        
-        # You can add logic here, like:
-        # - Clear cache when SEO settings change
-        # - Send notifications
-        # - Log changes
-        
+        seo_cache.invalidate()
+
     def get_readonly_fields(self, request, obj=None):
         """Make certain fields readonly for non-superusers"""
         readonly = list(self.readonly_fields)
@@ -189,15 +191,50 @@ duplicate_seo_settings.short_description = "Duplicate selected SEO settings"
 # Add the action to the admin
 SEOSettingsAdmin.actions = [duplicate_seo_settings]
 
+class LeadAdmin(admin.ModelAdmin):
+    """
+    Changelist tuned for large lead tables: every filter, the ordering and
+    the search below are served by an index (see models and migration 0014),
+    and the row count comes from EstimatedCountPaginator.
+    """
+    date_hierarchy = "created_at"
+    ordering = ("-created_at", "-id")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    search_fields = ("name", "email", "phone")  # enables the search box; matching is below
+    search_help_text = "Exact email or phone number, or the start of a name."
+    actions = ["export_csv", "export_ndjson"]
+
+    def get_search_results(self, request, queryset, search_term):
+        """Indexed lookups only: email iexact, phone exact, name istartswith"""
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if "@" in term:
+            return queryset.filter(email__iexact=term), False
+        if PHONE_RE.fullmatch(term):
+            return queryset.filter(phone=term), False
+        return queryset.filter(name__istartswith=term), False
+
+    @admin.action(description="Export selected leads as CSV")
+    def export_csv(self, request, queryset):
+        return exports.streaming_response(queryset.order_by("-created_at", "-id"), "csv")
+
+    @admin.action(description="Export selected leads as NDJSON")
+    def export_ndjson(self, request, queryset):
+        return exports.streaming_response(queryset.order_by("-created_at", "-id"), "ndjson")
+
+
 @admin.register(ContactSubmission)
-class ContactSubmissionAdmin(admin.ModelAdmin):
+class ContactSubmissionAdmin(LeadAdmin):
     list_display = ("name", "email", "service", "created_at")
+    list_filter = ("service", ("created_at", admin.DateFieldListFilter))
     readonly_fields = ("created_at", "ip_address")
-    search_fields = ("name", "email", "phone", "message")
 
 @admin.register(MovingRequest)
-class MovingRequestAdmin(admin.ModelAdmin):
+class MovingRequestAdmin(LeadAdmin):
     list_display = ("name", "location_from", "location_to", "date", "created_at")
+    list_filter = (("date", admin.DateFieldListFilter), ("created_at", admin.DateFieldListFilter))
     readonly_fields = ("created_at",)
     
 @admin.register(TeamMember)
@@ -209,7 +246,7 @@ class TeamMemberAdmin(admin.ModelAdmin):
         if obj.photo:
             return format_html(
                 '<img src="{}" width="60" height="60" style="object-fit: cover;" />',
-                obj.photo.url
+                images.url(obj, "photo", "jpeg", max_width=160)
             )
         return "No Image"
 
@@ -0,0 +1,350 @@
+"""
+Build-time CSS/JS bundles for the public pages.
+
+For every template under templates/pages/ this writes, into the static
+root:
+
+    bundles/<page>.css           ASSET_CSS merged (@imports inlined),
+                                 minus selectors nothing on the page uses
+    bundles/<page>.critical.css  the subset needed by the page's first
+                                 screen (base, header, first section)
+    bundles/site.css / .js       every page's selectors, and ASSET_JS
+                                 concatenated
+
+build() runs inside collectstatic (see storage.py), before the manifest
+step, so the bundles are hashed, compressed and listed in the manifest
+like any other file. It is pure Python and needs no network.
+
+Purging is conservative. A selector is kept if every class, id and
+element it names appears as a word somewhere in the page's templates,
+the Python sources (form widget classes) or the bundled JavaScript
+(classes added at runtime), or in ASSET_PURGE_SAFELIST. Arguments of
+functional pseudo-classes such as :not() are ignored. Rules without a
+class, id or element to check are always kept.
+"""
+import posixpath
+import re
+from pathlib import Path
+
+from django.conf import settings
+
+COMMENT_RE = re.compile(r"/\*.*?\*/", re.S)
+URL_RE = re.compile(r"""url\(\s*(?:(["'])(.*?)\1|([^)"'\s]+))\s*\)""", re.S)
+IMPORT_RE = re.compile(r"""@import\s+(?:url\(\s*)?["']?([^"')\s;]+)["']?\s*\)?\s*([^;]*)$""", re.S)
+WORD_RE = re.compile(r"[A-Za-z_][\w-]*")
+CLASS_ATTR_RE = re.compile(r"""class\s*=\s*["']([^"']*)["']""")
+ESCAPE_RE = re.compile(r"\\(.)")
+SELECTOR_TOKEN_RE = re.compile(r"([.#])((?:\\.|[\w-])+)")
+PSEUDO_RE = re.compile(r"::?[\w-]+")
+COMBINATOR_RE = re.compile(r"\s*[\s>+~]\s*")
+
+GROUPING_RULES = {"media", "supports", "layer", "container", "document", "-moz-document"}
+NON_CRITICAL_RULES = {"font-face", "keyframes", "-webkit-keyframes", "page", "property", "import"}
+
+CRITICAL_FALLBACK_CHARS = 20_000  # how much of a page template counts as first screen without a </section>
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# -- Parsing ------------------------------------------------------------------
+
+def _skip_string(css, i):
+    quote = css[i]
+    i += 1
+    while i < len(css) and css[i] != quote:
+        i += 2 if css[i] == "\\" else 1
+    return i + 1
+
+
+def _blocks(css):
+    """Yield (prelude, body) for each top-level statement; body is None for `@x ...;`"""
+    depth, start, prelude_end, i = 0, 0, 0, 0
+    while i < len(css):
+        c = css[i]
+        if c in "\"'":
+            i = _skip_string(css, i)
+            continue
+        if c == "{":
+            if depth == 0:
+                prelude_end = i
+            depth += 1
+        elif c == "}":
+            depth -= 1
+            if depth == 0:
+                yield css[start:prelude_end].strip(), css[prelude_end + 1:i]
+                start = i + 1
+        elif c == ";" and depth == 0:
+            yield css[start:i].strip(), None
+            start = i + 1
+        i += 1
+
+
+def _at_name(prelude):
+    return re.split(r"[\s(]", prelude[1:], maxsplit=1)[0].lower()
+
+
+class Rule:
+    def __init__(self, selectors, body):
+        self.selectors = selectors
+        self.body = body
+
+
+class AtRule:
+    """An at-rule: grouping rules have children, the rest a verbatim body (or none)"""
+
+    def __init__(self, prelude, body=None, children=None):
+        self.prelude = prelude
+        self.name = _at_name(prelude)
+        self.body = body
+        self.children = children
+
+
+def _split_selectors(prelude):
+    parts, depth, start = [], 0, 0
+    for i, c in enumerate(prelude):
+        if c in "([":
+            depth += 1
+        elif c in ")]":
+            depth -= 1
+        elif c == "," and depth == 0:
+            parts.append(prelude[start:i].strip())
+            start = i + 1
+    parts.append(prelude[start:].strip())
+    return [p for p in parts if p]
+
+
+def parse(css, path, read):
+    """
+    Parse css (from static path `path`) into Rule/AtRule nodes, inlining
+    local @imports via read(path) and making url()s absolute.
+    """
+    css = COMMENT_RE.sub("", css)
+    nodes = []
+    for prelude, body in _blocks(css):
+        if not prelude:
+            continue
+        if prelude.startswith("@"):
+            name = _at_name(prelude)
+            if body is None:
+                if name == "import":
+                    nodes.extend(_import(prelude, path, read))
+                elif name != "charset":
+                    nodes.append(AtRule(prelude))
+            elif name in GROUPING_RULES:
+                nodes.append(AtRule(prelude, children=parse(body, path, read)))
+            else:
+                nodes.append(AtRule(prelude, body=absolute_urls(body, path)))
+        elif body is not None:
+            nodes.append(Rule(_split_selectors(prelude), absolute_urls(body, path)))
+    return nodes
+
+
+def _is_local(url):
+    return not (re.match(r"^[a-z][a-z0-9+.-]*:", url, re.I) or url.startswith(("/", "#")))
+
+
+def _resolve(url, path):
+    return posixpath.normpath(posixpath.join(posixpath.dirname(path), url))
+
+
+def absolute_urls(body, path):
+    """Rewrite relative url()s against STATIC_URL, so they work from any bundle"""
+    def replace(match):
+        url = match.group(2) if match.group(1) else match.group(3)
+        if not _is_local(url):
+            return match.group(0)
+        return f'url("{settings.STATIC_URL}{_resolve(url, path)}")'
+    return URL_RE.sub(replace, body)
+
+
+def _import(prelude, path, read):
+    match = IMPORT_RE.match(prelude)
+    if not match or not _is_local(match.group(1)):
+        return [AtRule(prelude)]
+    target = _resolve(match.group(1), path)
+    css = read(target)
+    if css is None:
+        return []
+    nodes = parse(css, target, read)
+    media = match.group(2).strip()
+    return [AtRule(f"@media {media}", children=nodes)] if media else nodes
+
+
+# -- Purging ------------------------------------------------------------------
+
+def _strip_brackets(selector):
+    """Drop the contents of (...) and [...], which hold no element the page must have"""
+    out, depth = [], 0
+    for c in selector:
+        if c in "([":
+            depth += 1
+        elif c in ")]":
+            depth -= 1
+        elif depth == 0:
+            out.append(c)
+    return "".join(out)
+
+
+def selector_tokens(selector):
+    """The class names, ids and element names a selector requires"""
+    bare = _strip_brackets(selector)
+    tokens = {ESCAPE_RE.sub(r"\1", name) for _, name in SELECTOR_TOKEN_RE.findall(bare)}
+    for compound in COMBINATOR_RE.split(PSEUDO_RE.sub("", SELECTOR_TOKEN_RE.sub("", bare))):
+        element = re.match(r"[A-Za-z][\w-]*", compound)
+        if element:
+            tokens.add(element.group(0).lower())
+    return tokens
+
+
+def purge(nodes, used, critical=False):
+    """Return nodes without the selectors (and then rules) that `used` doesn't cover"""
+    kept = []
+    for node in nodes:
+        if isinstance(node, Rule):
+            selectors = [s for s in node.selectors if selector_tokens(s) <= used]
+            if selectors:
+                kept.append(Rule(selectors, node.body))
+        elif node.children is not None:
+            if critical and node.name == "media" and "print" in node.prelude and "screen" not in node.prelude:
+                continue
+            children = purge(node.children, used, critical)
+            if children:
+                kept.append(AtRule(node.prelude, children=children))
+        elif not (critical and node.name in NON_CRITICAL_RULES):
+            kept.append(node)
+    return kept
+
+
+def serialize(nodes):
+    out = []
+    for node in nodes:
+        if isinstance(node, Rule):
+            body = " ".join(node.body.split()).strip().rstrip(";")
+            out.append(f"{','.join(' '.join(s.split()) for s in node.selectors)}{{{body}}}")
+        elif node.children is not None:
+            out.append(f"{' '.join(node.prelude.split())}{{{serialize(node.children)}}}")
+        elif node.body is not None:
+            out.append(f"{' '.join(node.prelude.split())}{{{' '.join(node.body.split())}}}")
+        else:
+            out.append(f"{' '.join(node.prelude.split())};")
+    return "\n".join(out)
+
+
+def _hoist_imports(nodes):
+    """Remaining (remote) @imports must come before every other rule"""
+    imports = [n for n in nodes if isinstance(n, AtRule) and n.name == "import"]
+    return imports + [n for n in nodes if n not in imports]
+
+
+# -- Usage scanning -----------------------------------------------------------
+
+def words(text):
+    found = set(WORD_RE.findall(text))
+    found.update(w.lower() for w in list(found))
+    for classes in CLASS_ATTR_RE.findall(text):
+        found.update(classes.split())
+    return found
+
+
+def _template_dirs():
+    return [Path(d) for d in settings.TEMPLATES[0]["DIRS"]]
+
+
+def _read_text(path):
+    return Path(path).read_text(encoding="utf-8", errors="ignore")
+
+
+def page_templates():
+    """{page name: template path} for every template under templates/pages/"""
+    pages = {}
+    for directory in _template_dirs():
+        for path in sorted((directory / "pages").glob("*.html")):
+            pages.setdefault(path.stem, path)
+    return pages
+
+
+def _shared_templates():
+    for directory in _template_dirs():
+        yield from (p for p in sorted(directory.rglob("*.html")) if "pages" not in p.parts)
+
+
+def _above_the_fold(page_path):
+    """base.html, the header and the page up to the end of its first section"""
+    text = ""
+    for directory in _template_dirs():
+        for name in ("base.html", "partials/header.html"):
+            if (directory / name).exists():
+                text += _read_text(directory / name)
+    page = _read_text(page_path)
+    end = page.find("</section>")
+    return text + (page[:end] if end != -1 else page[:CRITICAL_FALLBACK_CHARS])
+
+
+def _code_words():
+    found = set()
+    for path in Path(settings.BASE_DIR, "apps").rglob("*.py"):
+        if "migrations" not in path.parts:
+            found |= words(_read_text(path))
+    return found
+
+
+# -- Build --------------------------------------------------------------------
+
+def bundle_names(page):
+    return f"bundles/{page}.css", f"bundles/{page}.critical.css"
+
+
+SITE_CSS = "bundles/site.css"
+SITE_JS = "bundles/site.js"
+
+
+def _scripts(read):
+    texts = (read(path) for path in _setting("ASSET_JS", []))
+    return [text for text in texts if text is not None]
+
+
+def _shared_words(scripts):
+    """Words every page can use: shared templates, Python sources, scripts"""
+    found = _code_words() | set(_setting("ASSET_PURGE_SAFELIST", []))
+    for text in scripts:
+        found |= words(text)
+    for path in _shared_templates():
+        found |= words(_read_text(path))
+    return found
+
+
+def site_words(read):
+    """Every word any page could use as a class name, id or element"""
+    found = _shared_words(_scripts(read))
+    for path in page_templates().values():
+        found |= words(_read_text(path))
+    return found
+
+
+def build(read):
+    """
+    Return {static path: content} for every bundle. read(path) returns the
+    text of a collected static file, or None.
+    """
+    nodes = []
+    for path in _setting("ASSET_CSS", []):
+        text = read(path)
+        if text is not None:
+            nodes.extend(parse(text, path, read))
+    nodes = _hoist_imports(nodes)
+
+    js = _scripts(read)
+    shared = _shared_words(js)
+
+    output = {SITE_JS: ";\n".join(js) + "\n"}
+    site_used = set(shared)
+    for page, path in page_templates().items():
+        page_words = words(_read_text(path))
+        site_used |= page_words
+        full, critical = bundle_names(page)
+        output[full] = serialize(purge(nodes, shared | page_words))
+        output[critical] = serialize(purge(nodes, words(_above_the_fold(path)), critical=True))
+    output[SITE_CSS] = serialize(purge(nodes, site_used))
+    return output
@@ -0,0 +1,104 @@
+"""
+Native async versions of the busiest pages, which urls.py serves in place
+of the views.py ones when ASYNC_VIEWS is on. Only turn it on under an ASGI
+server (see README); under WSGI every async view gets an event loop of its
+own and is slower than the sync one.
+
+SEOSettings, team members and leads go through the async ORM, and the
+page cache, rate limits and idempotency claims through their async
+variants, so a request waiting on the database or the cache holds no
+thread. Rendering stays on the event loop: it is CPU-bound, and every
+context is fully loaded first (pending messages included), so no
+template reaches the database.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.exceptions import ObjectDoesNotExist
+from django.shortcuts import redirect, render
+
+from . import idempotency, ingest, metrics, seo_cache
+from .forms import ContactForm, MovingRequestForm
+from .models import SEOSettings, TeamMember
+from .page_cache import cache_page_for
+from .ratelimit import client_ip, ratelimit
+from .views import seo_defaults
+
+
+async def aget_or_create_seo(page_name, defaults):
+    """get_or_create_seo() for async views"""
+    seo = await seo_cache.aget(page_name)
+    if seo is not None:
+        return seo
+
+    try:
+        seo = await SEOSettings.objects.aget(page_name=page_name)
+    except ObjectDoesNotExist:
+        seo = await SEOSettings.objects.acreate(page_name=page_name, **defaults)
+
+    await seo_cache.aset(page_name, seo)
+    return seo
+
+
+async def _load_messages(request):
+    """
+    Read pending messages before rendering. Messages that outgrew their
+    cookie are kept in the session, which lives in the database.
+    """
+    if CookieStorage.cookie_name in request.COOKIES:
+        await sync_to_async(len)(messages.get_messages(request))
+
+
+async def _lead_form(request, form_class, scope, page_name, template):
+    """The home and contact pages: a lead form next to the page's SEO"""
+    seo = await aget_or_create_seo(page_name, seo_defaults(request, page_name))
+
+    if request.method == "POST":
+        form = form_class(request.POST)
+        if form.is_valid():
+            instance = form.save(commit=False)
+            instance.ip_address = client_ip(request)
+            # A repeat of an earlier submission gets the same success redirect
+            # (ingest.asubmit also queues the email notification)
+            if await idempotency.asubmit_once(instance, form.cleaned_data, ingest.asubmit):
+                metrics.count_submission(scope, "accepted")
+            else:
+                metrics.count_submission(scope, "duplicate")
+
+            messages.success(request, "Thanks! Your message has been sent. We'll contact you shortly.")
+            return redirect(request.resolver_match.view_name)
+        messages.error(request, "Please fix the errors below.")
+        metrics.count_submission(scope, "invalid")
+    else:
+        form = form_class()
+
+    await _load_messages(request)
+    return render(request, template, {"seo": seo, "form": form})
+
+
+@ratelimit("quote")
+@cache_page_for("seo:Home")
+async def home(request):
+    """Home page view"""
+    return await _lead_form(request, MovingRequestForm, "quote", "Home", "pages/home.html")
+
+
+@ratelimit("contact")
+async def contact(request):
+    """Contact page view — handles form POST and always provides SEO data."""
+    return await _lead_form(request, ContactForm, "contact", "Contact", "pages/contact.html")
+
+
+@cache_page_for("seo:OurCompany")
+async def ourcompany(request):
+    """Our Company page view"""
+    seo = await aget_or_create_seo("OurCompany", seo_defaults(request, "OurCompany"))
+    return render(request, "pages/our-company.html", {"seo": seo})
+
+
+@cache_page_for("seo:Teams", "team")
+async def teams(request):
+    """Teams page view"""
+    seo = await aget_or_create_seo("Teams", seo_defaults(request, "Teams"))
+    members = [member async for member in TeamMember.objects.all()]
+    return render(request, "pages/team.html", {"seo": seo, "members": members})
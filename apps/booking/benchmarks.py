@@ -0,0 +1,382 @@
+"""
+Micro-benchmarks of the booking request paths.
+
+run() sends every request in SCENARIOS through the test client (the full
+middleware stack, no server) against a seeded test database, and records
+for each:
+
+    wall_ms      median wall time of the request
+    p95_ms       95th percentile wall time
+    template_ms  median time spent rendering templates
+    queries      database queries per request (the most seen)
+    peak_kib     peak Python allocations, from one extra traced request
+
+By default caches stay warm between requests, as in steady-state
+production. With cold=True every cache is cleared before each request,
+which measures the whole view path instead of the page cache.
+
+compare() checks a run against a stored baseline; see the
+benchmark_views command, which keeps it in BENCHMARK_BASELINE
+(var/benchmark_baseline.json). Timings only compare on the machine that
+recorded them, so the baseline is not committed: the first run on a
+machine records it.
+
+concurrency() instead compares the WSGI and ASGI paths of the pages that
+have async views (async_views.py) under many clients at once.
+"""
+import asyncio
+import contextlib
+import fnmatch
+import importlib
+import itertools
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from time import perf_counter
+
+from asgiref.sync import ThreadSensitiveContext
+from django.conf import settings
+from django.core.cache import caches
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client, override_settings
+from django.test.runner import DiscoverRunner
+from django.urls import clear_url_caches, reverse
+
+from . import profiling, seo_cache, seo_sync, sitemap_files, urls
+from .models import BlogPost, TeamMember
+
+THRESHOLD = 0.25  # relative rise that counts as a regression
+
+SEED_POSTS = 60
+SEED_MEMBERS = 8
+
+# Metrics where a rise past the threshold is a regression, with the
+# smallest absolute rise that counts (to ignore timer noise)
+GATED = {"wall_ms": 1.0, "template_ms": 1.0, "peak_kib": 64}
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+def baseline_path():
+    return Path(getattr(settings, "BENCHMARK_BASELINE", Path(settings.BASE_DIR) / "var" / "benchmark_baseline.json"))
+
+
+@dataclass
+class Scenario:
+    name: str
+    url: object  # path, or a callable returning one
+    method: str = "get"
+    data: object = None  # callable(i) -> POST data
+    status: int = 200
+    query: dict = field(default_factory=dict)
+
+    def request(self, client, i):
+        url = self.url() if callable(self.url) else self.url
+        if self.method == "post":
+            return client.post(url, self.data(i))
+        return client.get(url, self.query)
+
+
+def _quote(i):
+    return {
+        "location_from": "Hinjewadi, Pune",
+        "location_to": "Andheri, Mumbai",
+        "name": f"Benchmark {i}",
+        "email": f"bench{i}@example.com",
+        "phone": f"98{i:08d}",
+        "date": "2030-01-15",
+        "botcheck": "",
+        "submission_token": str(uuid.uuid4()),
+    }
+
+
+def _contact(i):
+    return {
+        "name": f"Benchmark {i}",
+        "email": f"bench{i}@example.com",
+        "phone": f"98{i:08d}",
+        "service": "Home Moving",
+        "message": "Two bedroom flat, second floor, no lift.",
+        "botcheck": "",
+        "submission_token": str(uuid.uuid4()),
+    }
+
+
+def _invalid(valid):
+    def data(i):
+        return {**valid(i), "email": "not-an-address", "name": ""}
+    return data
+
+
+def _first_post():
+    return reverse("blog:detail", args=[BlogPost.objects.order_by("id").values_list("slug", flat=True)[0]])
+
+
+def _first_sitemap_part():
+    manifest = sitemap_files._load_manifest(sitemap_files.root())
+    return reverse("sitemap_part", args=[manifest["sections"]["static"]["files"][0]])
+
+
+SCENARIOS = [
+    Scenario("home", "/"),
+    Scenario("home:post", "/", "post", _quote, status=302),
+    Scenario("home:post-invalid", "/", "post", _invalid(_quote)),
+    Scenario("contact", "/contact/"),
+    Scenario("contact:post", "/contact/", "post", _contact, status=302),
+    Scenario("contact:post-invalid", "/contact/", "post", _invalid(_contact)),
+    Scenario("ourcompany", "/ourcompany/"),
+    Scenario("teams", "/teams/"),
+    Scenario("blog", "/blog/"),
+    Scenario("blog:detail", _first_post),
+    Scenario("blog:search", "/blog/search/", query={"q": "moving"}),
+    Scenario("sitemap", "/sitemap.xml"),
+    Scenario("sitemap:part", _first_sitemap_part),
+]
+
+
+def seed():
+    """SEO rows for every page, some team members and published posts, and the sitemaps"""
+    result = seo_sync.plan(seo_sync.load(seo_sync.DEFAULT_PATH))
+    if result.has_changes:
+        seo_sync.apply(result)
+    TeamMember.objects.bulk_create(
+        TeamMember(name=f"Member {i}", role="Packing supervisor", photo=f"team_photos/member-{i}.jpg")
+        for i in range(SEED_MEMBERS)
+    )
+    BlogPost.objects.bulk_create(
+        BlogPost(
+            title=f"Moving checklist part {i}",
+            slug=f"moving-checklist-{i}",
+            excerpt="What to pack first when moving house.",
+            content="<p>Label every box with the room it belongs to before moving day.</p>" * 40,
+            published=True,
+        )
+        for i in range(SEED_POSTS)
+    )
+    sitemap_files.build(force=True)
+
+
+@contextlib.contextmanager
+def environment():
+    """A seeded test database, with rate limits and notifications off"""
+    runner = DiscoverRunner(verbosity=0, interactive=False)
+    with tempfile.TemporaryDirectory() as sitemaps, override_settings(
+        ALLOWED_HOSTS=["testserver"],
+        DEBUG=False,
+        EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+        LEAD_INGEST_MODE="sync",
+        LEAD_NOTIFY_RECIPIENTS=[],
+        RATELIMIT_ENABLED=False,
+        SITEMAP_ROOT=sitemaps,
+    ):
+        old_config = runner.setup_databases()
+        try:
+            _clear_caches()
+            seed()
+            yield
+        finally:
+            runner.teardown_databases(old_config)
+
+
+def _clear_caches():
+    for cache in caches.all():
+        cache.clear()
+    seo_cache.invalidate()
+
+
+def _measure(scenario, iterations, warmup, cold):
+    client = Client()  # per scenario, so one scenario's cookies don't affect the next
+    counter = itertools.count()
+
+    def send(**options):
+        if cold:
+            _clear_caches()
+        with profiling.profile(record_sql=False, **options) as p:
+            response = scenario.request(client, next(counter))
+        if response.status_code != scenario.status:
+            raise BenchmarkError(f"{scenario.name}: expected {scenario.status}, got {response.status_code}")
+        return p
+
+    for _ in range(warmup):
+        send()
+    runs = [send() for _ in range(iterations)]
+    traced = send(memory=True)
+
+    walls = sorted(p.wall * 1000 for p in runs)
+    return {
+        "wall_ms": round(statistics.median(walls), 3),
+        "p95_ms": round(walls[min(len(walls) - 1, int(len(walls) * 0.95))], 3),
+        "template_ms": round(statistics.median(p.template_time * 1000 for p in runs), 3),
+        "queries": max(p.query_count for p in runs),
+        "peak_kib": round(traced.peak_memory / 1024, 1),
+    }
+
+
+def run(iterations=20, warmup=3, cold=False, only=None):
+    """Return {scenario name: metrics}; call inside environment()"""
+    results = {}
+    for scenario in SCENARIOS:
+        if only and not any(fnmatch.fnmatch(scenario.name, pattern) for pattern in only):
+            continue
+        results[scenario.name] = _measure(scenario, iterations, warmup, cold)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Return a description of every regression against baseline"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current["queries"] > previous["queries"]:
+            regressions.append(f"{name}: {previous['queries']} → {current['queries']} queries")
+        for metric, floor in GATED.items():
+            before, after = previous[metric], current[metric]
+            if after > before * (1 + threshold) and after - before > floor:
+                change = f" (+{(after / before - 1) * 100:.0f}%)" if before else ""
+                regressions.append(f"{name}: {metric} {before} → {after}{change}")
+    return regressions
+
+
+# Pages with an async view, as plain GETs: concurrency() has many clients
+# writing to the (SQLite) test database at once otherwise
+CONCURRENT_SCENARIOS = ("home", "contact", "ourcompany", "teams")
+
+
+@contextlib.contextmanager
+def _db_latency(seconds):
+    """
+    Hold every query for `seconds` first, like a database across a
+    network. Both paths run their queries in fresh threads, so wrapping
+    each connection as it is opened reaches all of them.
+    """
+    def delay(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    with contextlib.ExitStack() as stack:
+        def wrap(sender, connection, **kwargs):
+            stack.enter_context(connection.execute_wrapper(delay))
+
+        connection_created.connect(wrap, weak=False)
+        stack.callback(connection_created.disconnect, wrap)
+        yield
+
+
+def _reload_urls():
+    importlib.reload(urls)
+    importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+    clear_url_caches()
+
+
+@contextlib.contextmanager
+def _async_views(enabled):
+    """Route the pages to async_views.py (or not) for the duration"""
+    with override_settings(ASYNC_VIEWS=enabled):
+        _reload_urls()
+        try:
+            yield
+        finally:
+            _reload_urls()
+
+
+class _InFlight:
+    """Counts requests being handled at once, and the most seen"""
+
+    def __init__(self):
+        self.current = self.peak = 0
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        with self.lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *exc_info):
+        with self.lock:
+            self.current -= 1
+
+
+def _summary(latencies, elapsed, in_flight):
+    latencies.sort()
+    return {
+        "rps": round(len(latencies) / elapsed, 1),
+        "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1),
+        "in_flight": in_flight.peak,
+    }
+
+
+def _wsgi(scenario, clients, threads, requests):
+    """`clients` clients sharing a worker of `threads` threads (gunicorn's gthread)"""
+    worker = threading.BoundedSemaphore(threads)
+    counter = itertools.count()
+    latencies = []
+    in_flight = _InFlight()
+
+    def client_loop(_):
+        client = Client()
+        while (i := next(counter)) < requests:
+            start = perf_counter()
+            with worker, in_flight:
+                response = scenario.request(client, i)
+            latencies.append(perf_counter() - start)
+            if response.status_code != scenario.status:
+                raise BenchmarkError(f"{scenario.name}: expected {scenario.status}, got {response.status_code}")
+
+    started = perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        list(pool.map(client_loop, range(clients)))
+    return _summary(latencies, perf_counter() - started, in_flight)
+
+
+async def _asgi(scenario, clients, requests):
+    """`clients` clients on one event loop, each request in its own thread context as under an ASGI server"""
+    counter = itertools.count()
+    latencies = []
+    in_flight = _InFlight()
+
+    async def client_loop():
+        client = AsyncClient()
+        while (i := next(counter)) < requests:
+            start = perf_counter()
+            async with ThreadSensitiveContext():
+                with in_flight:
+                    response = await scenario.request(client, i)
+            latencies.append(perf_counter() - start)
+            if response.status_code != scenario.status:
+                raise BenchmarkError(f"{scenario.name}: expected {scenario.status}, got {response.status_code}")
+
+    started = perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(clients)))
+    return _summary(latencies, perf_counter() - started, in_flight)
+
+
+def concurrency(clients=50, threads=8, requests=400, db_latency=0.005, only=None):
+    """
+    Return {scenario name: {"wsgi": summary, "asgi": summary}}, where a
+    summary is requests per second, p95 latency and the most requests in
+    flight at once, with `clients` clients sending requests back to back. WSGI runs the sync views on
+    `threads` threads; ASGI runs the async views on one event loop.
+    The page cache is off, since a hit never reaches the view, and every
+    query is held for db_latency seconds. Call inside environment().
+    """
+    results = {}
+    scenarios = [s for s in SCENARIOS if s.name in CONCURRENT_SCENARIOS]
+    with override_settings(PAGE_CACHE_ENABLED=False), _db_latency(db_latency):
+        for scenario in scenarios:
+            if only and not any(fnmatch.fnmatch(scenario.name, pattern) for pattern in only):
+                continue
+            with _async_views(False):
+                wsgi = _wsgi(scenario, clients, threads, requests)
+            with _async_views(True):
+                asgi = asyncio.run(_asgi(scenario, clients, requests))
+            results[scenario.name] = {"wsgi": wsgi, "asgi": asgi}
+    return results
@@ -0,0 +1,11 @@
+from django.urls import path
+
+from .views import blog, blog_detail, blog_search
+
+app_name = 'blog'
+
+urlpatterns = [
+    path('', blog, name='list'),
+    path('search/', blog_search, name='search'),
+    path('<slug:slug>/', blog_detail, name='detail'),
+]
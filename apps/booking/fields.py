@@ -0,0 +1,20 @@
+from django import forms
+from django.db import models
+
+
+class HeaderOnlyImageFormField(forms.ImageField):
+    """
+    ImageField that leaves image checks to the model field's validators.
+    Django's own to_python() runs Image.verify(), which reads and checks
+    the whole file before the cheap size limit has had a chance to reject it.
+    """
+
+    def to_python(self, data):
+        return forms.FileField.to_python(self, data)
+
+
+class ValidatedImageField(models.ImageField):
+    """ImageField whose uploads are only checked by its (header-only) validators"""
+
+    def formfield(self, **kwargs):
+        return super().formfield(**{"form_class": HeaderOnlyImageFormField, **kwargs})
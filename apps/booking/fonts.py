@@ -0,0 +1,210 @@
+"""
+Self-hosted web fonts.
+
+Text fonts: `manage.py build_fonts` downloads the families in
+GOOGLE_FONTS_URL once, as WOFF2 with font-display: swap, into
+static/fonts/<family>/ and writes static/css/fonts.css. Commit both, or
+run it (`make fonts`) as a build step before collectstatic; either way
+visitors never talk to Google. {% font_links %} (asset_tags) inlines
+fonts.css and preloads FONT_PRELOAD; until the fonts are vendored it
+links Google Fonts as before.
+
+Icon fonts: at collectstatic (see storage.py) each font behind the
+FONT_ICON_CSS stylesheets is cut down to the glyphs the site uses and
+written as fonts/icons/<name>.woff2; the stylesheets are rewritten to
+point at the subsets (font-display: swap) and drop faces left with no
+glyphs. A glyph is used when the class that draws it passes the same
+check the CSS purge applies (see assets.py), or when another stylesheet
+draws it directly with `content: "\\f6b0"`. Subsetting needs fontTools
+with brotli; without it the full fonts are shipped.
+"""
+import io
+import logging
+import re
+import urllib.request
+from pathlib import Path
+
+from django.conf import settings
+
+from . import assets
+
+logger = logging.getLogger(__name__)
+
+FONTS_CSS = "css/fonts.css"
+ICON_DIR = "fonts/icons"
+
+# Google serves WOFF2 only to browsers it knows support it
+_USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+
+GOOGLE_FACE_RE = re.compile(r"/\*\s*([\w-]+)\s*\*/\s*@font-face\s*\{([^}]*)\}")
+CONTENT_RE = re.compile(r"""content\s*:\s*["']\\([0-9a-fA-F]{4,6})["']""")
+SOURCE_PREFERENCE = (".ttf", ".otf", ".woff", ".woff2")
+
+
+def _declarations(body):
+    pairs = (d.split(":", 1) for d in body.split(";") if ":" in d)
+    return {name.strip().lower(): value.strip() for name, value in pairs}
+
+
+def _slug(name):
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+# -- Text fonts -----------------------------------------------------------------
+
+def _fetch(url, timeout=30):
+    request = urllib.request.Request(url, headers={"User-Agent": _USER_AGENT})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.read()
+
+
+def vendor_google_fonts(url, static_dir):
+    """Download every face of a Google Fonts CSS URL; return the files written"""
+    static_dir = Path(static_dir)
+    css = _fetch(url).decode("utf-8")
+    faces, written = [], []
+
+    for subset, body in GOOGLE_FACE_RE.findall(css):
+        decl = _declarations(body)
+        family = decl["font-family"].strip("'\"")
+        source = assets.URL_RE.search(decl["src"])
+        source = source.group(2) if source.group(1) else source.group(3)
+
+        style = "" if decl.get("font-style", "normal") == "normal" else f"-{decl['font-style']}"
+        name = f"fonts/{_slug(family)}/{_slug(family)}-{decl.get('font-weight', '400')}{style}-{subset}.woff2"
+        path = static_dir / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(_fetch(source))
+        written.append(name)
+
+        rules = [
+            f"font-family:'{family}'",
+            f"font-style:{decl.get('font-style', 'normal')}",
+            f"font-weight:{decl.get('font-weight', '400')}",
+            "font-display:swap",
+            f'src:url("../{name}") format("woff2")',
+        ]
+        if "unicode-range" in decl:
+            rules.append(f"unicode-range:{decl['unicode-range']}")
+        faces.append(f"/* {subset} */\n@font-face{{{';'.join(rules)}}}")
+
+    if not faces:
+        raise ValueError(f"No @font-face rules in {url}")
+    (static_dir / FONTS_CSS).parent.mkdir(parents=True, exist_ok=True)
+    (static_dir / FONTS_CSS).write_text(f"/* Generated by manage.py build_fonts from {url} */\n" + "\n".join(faces) + "\n")
+    written.append(FONTS_CSS)
+    return written
+
+
+# -- Icon fonts -----------------------------------------------------------------
+
+def _static_path(url):
+    return url[len(settings.STATIC_URL):] if url.startswith(settings.STATIC_URL) else None
+
+
+def _walk(nodes):
+    for node in nodes:
+        if isinstance(node, assets.AtRule) and node.children is not None:
+            yield from _walk(node.children)
+        else:
+            yield node
+
+
+def _used_codepoints(stylesheets, read, used):
+    codepoints = set()
+    for nodes in stylesheets.values():
+        for node in _walk(nodes):
+            if not isinstance(node, assets.Rule):
+                continue
+            match = CONTENT_RE.search(node.body)
+            if match and any(assets.selector_tokens(s) <= used for s in node.selectors):
+                codepoints.add(int(match.group(1), 16))
+
+    # Glyphs drawn straight from other stylesheets, e.g. `.quote::before`
+    for path in getattr(settings, "ASSET_CSS", []):
+        text = read(path) if path not in stylesheets else None
+        if text:
+            codepoints.update(int(h, 16) for h in CONTENT_RE.findall(text) if int(h, 16) >= 0xE000)
+    return codepoints
+
+
+def _subset(data, codepoints):
+    """WOFF2 of the font in `data` with only `codepoints`, or None if it has none of them"""
+    from fontTools import subset
+    from fontTools.ttLib import TTFont
+
+    font = TTFont(io.BytesIO(data))
+    keep = codepoints & set(font.getBestCmap())
+    if not keep:
+        return None
+    options = subset.Options()
+    options.flavor = "woff2"
+    options.layout_features = ["*"]
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=keep)
+    subsetter.subset(font)
+    out = io.BytesIO()
+    font.save(out)
+    return out.getvalue()
+
+
+def _font_source(src):
+    """The static path of the best src to subset from"""
+    urls = [_static_path(m.group(2) if m.group(1) else m.group(3)) for m in assets.URL_RE.finditer(src)]
+    urls = [u for u in urls if u]
+    for extension in SOURCE_PREFERENCE:
+        for url in urls:
+            if url.endswith(extension):
+                return url
+    return None
+
+
+def subset_icons(read, read_bytes):
+    """
+    Return {static path: bytes} of the subset fonts and the rewritten icon
+    stylesheets, or {} when fontTools isn't installed.
+    """
+    try:
+        import fontTools.subset  # noqa: F401
+        import brotli  # noqa: F401
+    except ImportError:
+        logger.warning("fontTools and brotli are needed to subset icon fonts; shipping them whole")
+        return {}
+    logging.getLogger("fontTools").setLevel(logging.ERROR)  # chatty about quirks of the shipped fonts
+
+    stylesheets = {}
+    for path in getattr(settings, "FONT_ICON_CSS", []):
+        text = read(path)
+        if text is not None:
+            stylesheets[path] = assets.parse(text, path, read)
+
+    codepoints = _used_codepoints(stylesheets, read, assets.site_words(read))
+    output, subsets = {}, {}
+
+    for path, nodes in stylesheets.items():
+        kept = []
+        for node in nodes:
+            if not (isinstance(node, assets.AtRule) and node.name == "font-face"):
+                kept.append(node)
+                continue
+            decl = _declarations(node.body)
+            source = _font_source(decl.get("src", ""))
+            if source is None:
+                kept.append(node)
+                continue
+            if source not in subsets:
+                data = read_bytes(source)
+                subsets[source] = _subset(data, codepoints) if data is not None else None
+                if subsets[source] is not None:
+                    output[f"{ICON_DIR}/{Path(source).stem}.woff2"] = subsets[source]
+            if subsets[source] is None:
+                continue  # none of its glyphs are used
+
+            decl.pop("font-display", None)
+            decl["src"] = f'url("{settings.STATIC_URL}{ICON_DIR}/{Path(source).stem}.woff2") format("woff2")'
+            decl["font-display"] = "swap"
+            kept.append(assets.AtRule(node.prelude, body=";".join(f"{k}:{v}" for k, v in decl.items())))
+        output[path] = assets.serialize(kept).encode("utf-8")
+
+    logger.info("Icon fonts cut to %d glyphs", len(codepoints))
+    return output
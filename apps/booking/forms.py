@@ -1,7 +1,8 @@
 from django import forms
+from .idempotency import SubmissionTokenMixin
 from .models import ContactSubmission, MovingRequest
 
-class ContactForm(forms.ModelForm):
+class ContactForm(SubmissionTokenMixin, forms.ModelForm):
     class Meta:
         model = ContactSubmission
         fields = ["name", "email", "phone", "service", "message", "botcheck"]
@@ -21,7 +22,7 @@ class ContactForm(forms.ModelForm):
             raise forms.ValidationError("Bot detected.")
         return value
 
-class MovingRequestForm(forms.ModelForm):
+class MovingRequestForm(SubmissionTokenMixin, forms.ModelForm):
     class Meta:
         model = MovingRequest
         fields = [
@@ -0,0 +1,87 @@
+"""
+Collapse repeated lead submissions (double taps, browser retries) into one.
+
+submit_once() fingerprints the normalised payload and claims the
+fingerprint with cache.add(), which is atomic on every backend, before
+saving the lead. A repeat within LEAD_IDEMPOTENCY_WINDOW seconds, whether
+a double tap or the same form re-filled on a fresh page, costs one cache
+probe and never reaches the database. If the save fails the claim is
+given back, so the user's retry is saved rather than taken for a
+duplicate.
+
+Each lead form also carries a hidden one-time submission_token. The
+lead's unique submission_id is derived from the token and the
+fingerprint, so if the cache has forgotten a claim, the unique index
+still rejects the second insert (see ingest.submit()). Deriving it,
+rather than using the token as is, matters because a page revalidated
+with a 304 keeps its old token. A different lead sent later from that
+page then gets a different id.
+"""
+import hashlib
+import json
+import uuid
+
+from django import forms
+from django.conf import settings
+from django.core.cache import cache
+
+IGNORED_FIELDS = {"submission_token", "botcheck"}
+
+
+def _window():
+    return getattr(settings, "LEAD_IDEMPOTENCY_WINDOW", 10 * 60)
+
+
+class SubmissionTokenMixin(forms.Form):
+    """Adds the hidden one-time token to a lead form"""
+
+    submission_token = forms.UUIDField(widget=forms.HiddenInput, required=False, initial=uuid.uuid4)
+
+
+def fingerprint(instance, cleaned_data):
+    """Hash of the submitted values, ignoring case and surrounding/repeated whitespace"""
+    values = {
+        name: " ".join(str(value).split()).casefold()
+        for name, value in sorted(cleaned_data.items())
+        if name not in IGNORED_FIELDS and value not in (None, "")
+    }
+    payload = json.dumps([instance._meta.label_lower, values], ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _claim_key(instance, cleaned_data):
+    """Set instance.submission_id from the form's token; return the key to claim"""
+    digest = fingerprint(instance, cleaned_data)
+    token = cleaned_data.get("submission_token")
+    if token:
+        instance.submission_id = uuid.uuid5(token, digest)
+    return f"lead:fp:{digest}"
+
+
+def submit_once(instance, cleaned_data, submit):
+    """
+    Call submit(instance) unless the submission was already seen; return
+    whether it was called. A failed submit releases the claim and re-raises.
+    """
+    key = _claim_key(instance, cleaned_data)
+    if not cache.add(key, 1, _window()):
+        return False
+    try:
+        submit(instance)
+    except BaseException:
+        cache.delete(key)
+        raise
+    return True
+
+
+async def asubmit_once(instance, cleaned_data, submit):
+    """submit_once() for async views; submit is a coroutine function"""
+    key = _claim_key(instance, cleaned_data)
+    if not await cache.aadd(key, 1, _window()):
+        return False
+    try:
+        await submit(instance)
+    except BaseException:
+        await cache.adelete(key)
+        raise
+    return True
@@ -0,0 +1,129 @@
+"""
+Resized WebP/JPEG renditions of uploaded images.
+
+When a model with image fields is saved, refresh_renditions() writes a
+copy of each new upload at every width in IMAGE_RENDITION_WIDTHS (never
+upscaling) next to the original, under "<upload dir>/renditions/". What
+it produced is recorded in the model's `renditions` JSONField:
+
+    {"photo": {"source": "team_photos/a.jpg", "width": 1200, "height": 1200,
+               "webp": [[160, 160, "team_photos/renditions/a-160.webp"], ...],
+               "jpeg": [[160, 160, "team_photos/renditions/a-160.jpg"], ...]}}
+
+Templates emit them with {% responsive_image %} from image_tags.
+"""
+import io
+import logging
+import posixpath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    "webp": ("WEBP", "webp", {"quality": 80, "method": 6}),
+    "jpeg": ("JPEG", "jpg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+
+def _widths():
+    return getattr(settings, "IMAGE_RENDITION_WIDTHS", (160, 320, 640, 1200))
+
+
+def _flatten(image):
+    """JPEG has no alpha channel, so composite transparent images onto white"""
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def build(fieldfile):
+    """Write every rendition for fieldfile and return its description"""
+    storage = fieldfile.storage
+    with fieldfile.open("rb") as f:
+        image = _flatten(ImageOps.exif_transpose(Image.open(f)))
+
+    width, height = image.size
+    widths = [w for w in _widths() if w < width]
+    if width <= max(_widths()):
+        widths.append(width)
+    directory, filename = posixpath.split(fieldfile.name)
+    stem = posixpath.splitext(filename)[0]
+
+    data = {"source": fieldfile.name, "width": width, "height": height}
+    for key, (pil_format, extension, options) in FORMATS.items():
+        data[key] = []
+        for w in widths:
+            h = round(height * w / width)
+            resized = image if w == width else image.resize((w, h), Image.LANCZOS)
+            buffer = io.BytesIO()
+            resized.save(buffer, pil_format, **options)
+            name = posixpath.join(directory, "renditions", f"{stem}-{w}.{extension}")
+            name = storage.save(name, ContentFile(buffer.getvalue()))
+            data[key].append([w, h, name])
+    return data
+
+
+def delete(data, storage):
+    for key in FORMATS:
+        for _, _, name in data.get(key, []):
+            storage.delete(name)
+
+
+def refresh_renditions(instance, field_names):
+    """
+    Bring instance.renditions in line with its image fields. Pending
+    uploads are committed to storage first, so this runs before the row
+    is written and the renditions land in the same save.
+    """
+    renditions = dict(instance.renditions or {})
+
+    for name in field_names:
+        fieldfile = getattr(instance, name)
+        current = renditions.get(name)
+
+        if fieldfile and not fieldfile._committed:
+            fieldfile.save(fieldfile.name, fieldfile.file, save=False)
+
+        if not fieldfile:
+            if current:
+                delete(current, fieldfile.storage)
+                del renditions[name]
+            continue
+
+        if current and current.get("source") == fieldfile.name:
+            continue
+
+        try:
+            renditions[name] = build(fieldfile)
+        except (OSError, ValueError):
+            logger.exception("Could not build renditions for %s", fieldfile.name)
+            renditions.pop(name, None)
+            continue
+        if current:
+            delete(current, fieldfile.storage)
+
+    instance.renditions = renditions
+
+
+def pick(instance, field_name, key, max_width=None):
+    """Return the storage name of the widest rendition up to max_width, or None"""
+    data = (instance.renditions or {}).get(field_name)
+    if not data or not data.get(key):
+        return None
+    candidates = [r for r in data[key] if max_width is None or r[0] <= max_width]
+    return (candidates or data[key][:1])[-1][2]
+
+
+def url(instance, field_name, key="jpeg", max_width=None):
+    """URL of the best rendition, falling back to the original upload"""
+    fieldfile = getattr(instance, field_name)
+    if not fieldfile:
+        return ""
+    name = pick(instance, field_name, key, max_width)
+    return fieldfile.storage.url(name) if name else fieldfile.url
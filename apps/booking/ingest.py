@@ -0,0 +1,245 @@
+"""
+Write-behind ingestion for leads (MovingRequest, ContactSubmission).
+
+With LEAD_INGEST_MODE = "buffered" a validated lead is appended as one
+JSON line to this process's segment file under LEAD_BUFFER_DIR, and a
+background flusher writes it to the database with bulk_create() at most
+LEAD_BUFFER_MAX_DELAY seconds later (sooner once LEAD_BUFFER_MAX_BATCH
+leads are waiting). The POST only pays for validation and the append.
+
+Segments left behind by a crashed or restarted worker are replayed when
+the next worker boots (see warmup.py), by the next flusher, or by
+`manage.py flush_leads`. Every lead carries a
+unique submission_id, so replaying a segment that was already partly
+written never duplicates a row.
+
+Note that created_at is stamped when the batch is flushed, not when the
+lead was appended.
+
+The default mode, "sync", saves inline as before. asubmit() is submit()
+for async views.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import uuid
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, close_old_connections, transaction
+
+from . import notifications
+
+logger = logging.getLogger(__name__)
+
+_buffer = None
+_buffer_lock = threading.Lock()
+_replay_lock = threading.Lock()
+
+
+def _mode():
+    return getattr(settings, "LEAD_INGEST_MODE", "sync")
+
+
+def _serialize(instance):
+    fields = {
+        field.attname: field.value_from_object(instance)
+        for field in instance._meta.concrete_fields
+        if not field.primary_key
+    }
+    return json.dumps(
+        {"model": instance._meta.label_lower, "fields": fields},
+        cls=DjangoJSONEncoder,
+    )
+
+
+def _deserialize(record):
+    model = apps.get_model(record["model"])
+    fields = {
+        name: model._meta.get_field(name).to_python(value)
+        for name, value in record["fields"].items()
+    }
+    return model(**fields)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def write_segment(path):
+    """bulk_create every lead in a segment file, then delete it"""
+    by_model = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                instance = _deserialize(json.loads(line))
+            except ValueError:
+                # A torn final line from a crash mid-append
+                logger.warning("Skipping unreadable lead record in %s", path)
+                continue
+            by_model.setdefault(type(instance), []).append(instance)
+
+    with transaction.atomic():
+        for model, instances in by_model.items():
+            model.objects.bulk_create(instances, batch_size=500, ignore_conflicts=True)
+
+    os.remove(path)
+    return sum(len(instances) for instances in by_model.values())
+
+
+class LeadBuffer:
+    """Append-only segment files for one process plus their flusher thread"""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.pid = os.getpid()
+        self.active_path = self.directory / f"active-{self.pid}.jsonl"
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.handle = None
+        self.pending = 0
+        self.sequence = 0
+        self.thread = None
+
+    def append(self, instance):
+        line = _serialize(instance) + "\n"
+        with self.lock:
+            if self.handle is None:
+                self.handle = open(self.active_path, "a", encoding="utf-8")
+            self.handle.write(line)
+            self.handle.flush()
+            if getattr(settings, "LEAD_BUFFER_FSYNC", True):
+                os.fsync(self.handle.fileno())
+            self.pending += 1
+            if self.pending >= getattr(settings, "LEAD_BUFFER_MAX_BATCH", 500):
+                self.wakeup.set()
+        self._ensure_flusher()
+
+    def _ensure_flusher(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._run, name="lead-flusher", daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(getattr(settings, "LEAD_BUFFER_MAX_DELAY", 2))
+            self.wakeup.clear()
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                # Leave the segment on disk; the next pass retries it.
+                logger.exception("Flushing buffered leads failed")
+
+    def rotate(self):
+        """Close the active segment and rename it so new leads start a fresh one"""
+        with self.lock:
+            if self.handle is None:
+                return
+            self.handle.close()
+            self.handle = None
+            self.pending = 0
+            self.sequence += 1
+            os.replace(self.active_path, self.directory / f"pending-{self.pid}-{self.sequence}.jsonl")
+
+    def flush(self):
+        self.rotate()
+        return replay(self.directory)
+
+
+def _claimable(path):
+    """Segments nobody else is (or could still be) working on"""
+    kind, _, rest = path.stem.partition("-")
+    if kind == "pending":
+        return True
+    pid = int(rest.split("-")[0])
+    if kind == "active":
+        return not _pid_alive(pid)
+    if kind == "claimed":
+        return pid == os.getpid() or not _pid_alive(pid)
+    return False
+
+
+def replay(directory=None):
+    """Write every pending or orphaned segment in directory; return the lead count"""
+    directory = Path(directory or settings.LEAD_BUFFER_DIR)
+    if not directory.exists():
+        return 0
+
+    written = 0
+    with _replay_lock:
+        for path in sorted(directory.glob("*.jsonl")):
+            if not _claimable(path):
+                continue
+            claimed = directory / f"claimed-{os.getpid()}-{uuid.uuid4().hex}.jsonl"
+            try:
+                os.rename(path, claimed)
+            except FileNotFoundError:
+                continue  # another worker got there first
+            written += write_segment(claimed)
+    return written
+
+
+def _get_buffer():
+    global _buffer
+
+    if _buffer is None or _buffer.pid != os.getpid():
+        with _buffer_lock:
+            if _buffer is None or _buffer.pid != os.getpid():
+                _buffer = LeadBuffer(settings.LEAD_BUFFER_DIR)
+                atexit.register(_buffer.flush)
+    return _buffer
+
+
+def submit(instance):
+    """Persist a validated lead, inline or via the buffer depending on LEAD_INGEST_MODE"""
+    if instance.submission_id is None:
+        instance.submission_id = uuid.uuid4()
+
+    if _mode() == "buffered":
+        _get_buffer().append(instance)
+    else:
+        try:
+            with transaction.atomic():
+                instance.save()
+        except IntegrityError:
+            # The unique submission_id caught a repeat the cache had missed
+            if type(instance).objects.filter(submission_id=instance.submission_id).exists():
+                logger.info("Ignoring repeated submission %s", instance.submission_id)
+                return instance
+            raise
+
+    notifications.notify(instance)
+    return instance
+
+
+async def asubmit(instance):
+    """submit() for async views; saves through the async ORM in "sync" mode"""
+    if _mode() == "buffered" or not getattr(settings, "LEAD_NOTIFY_ASYNC", True):
+        # The append fsyncs and a synchronous notification talks SMTP
+        return await sync_to_async(submit)(instance)
+
+    if instance.submission_id is None:
+        instance.submission_id = uuid.uuid4()
+    try:
+        await instance.asave()
+    except IntegrityError:
+        if await type(instance).objects.filter(submission_id=instance.submission_id).aexists():
+            logger.info("Ignoring repeated submission %s", instance.submission_id)
+            return instance
+        raise
+
+    notifications.notify(instance)
+    return instance
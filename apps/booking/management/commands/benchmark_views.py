@@ -0,0 +1,105 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from booking import benchmarks
+
+COLUMNS = ('wall_ms', 'p95_ms', 'template_ms', 'queries', 'peak_kib')
+CONCURRENCY_COLUMNS = ('rps', 'p95_ms', 'in_flight')
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the booking views against a seeded test database and compare with the baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenarios', nargs='*', help='Only these scenarios (shell patterns, e.g. "home*")')
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--cold', action='store_true', help='Clear every cache before each request')
+        parser.add_argument(
+            '--baseline',
+            help='Baseline file (default: BENCHMARK_BASELINE, var/benchmark_baseline.json)',
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=benchmarks.THRESHOLD,
+            help='Relative rise that fails the run (default 0.25 = 25%%)',
+        )
+        parser.add_argument('--save', action='store_true', help='Store this run as the baseline')
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            metavar='CLIENTS',
+            help='Compare WSGI and ASGI throughput of the async pages with this many clients at once',
+        )
+        parser.add_argument('--threads', type=int, default=8, help='WSGI worker threads for --concurrency')
+        parser.add_argument(
+            '--db-latency',
+            type=float,
+            default=5.0,
+            help='Milliseconds every query is held for in --concurrency runs (default 5)',
+        )
+
+    def handle(self, *args, **options):
+        if options['concurrency']:
+            return self.handle_concurrency(options)
+
+        mode = 'cold' if options['cold'] else 'warm'
+        with benchmarks.environment():
+            try:
+                results = benchmarks.run(
+                    iterations=options['iterations'],
+                    warmup=options['warmup'],
+                    cold=options['cold'],
+                    only=options['scenarios'],
+                )
+            except benchmarks.BenchmarkError as e:
+                raise CommandError(str(e))
+
+        self.stdout.write(f'{"scenario (" + mode + ")":<26}' + ''.join(f'{c:>13}' for c in COLUMNS))
+        for name, metrics in results.items():
+            self.stdout.write(f'{name:<26}' + ''.join(f'{metrics[c]:>13}' for c in COLUMNS))
+
+        path = Path(options['baseline'] or benchmarks.baseline_path())
+        try:
+            with open(path) as f:
+                stored = json.load(f)
+        except FileNotFoundError:
+            stored = {}
+
+        # Timings only mean something against the same machine, so the
+        # first run here records the baseline rather than gating
+        if options['save'] or mode not in stored:
+            stored[mode] = {**stored.get(mode, {}), **results}
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, 'w') as f:
+                json.dump(stored, f, indent=2, sort_keys=True)
+                f.write('\n')
+            self.stdout.write(self.style.SUCCESS(f'✓ Saved {mode} baseline to {path}'))
+            return
+
+        regressions = benchmarks.compare(results, stored[mode], options['threshold'])
+        if regressions:
+            raise CommandError('Regressions against the baseline:\n  ' + '\n  '.join(regressions))
+        self.stdout.write(self.style.SUCCESS(f'✓ No regressions against the {mode} baseline'))
+
+    def handle_concurrency(self, options):
+        clients, threads = options['concurrency'], options['threads']
+        with benchmarks.environment():
+            try:
+                results = benchmarks.concurrency(
+                    clients=clients,
+                    threads=threads,
+                    db_latency=options['db_latency'] / 1000,
+                    only=options['scenarios'],
+                )
+            except benchmarks.BenchmarkError as e:
+                raise CommandError(str(e))
+
+        self.stdout.write(f'{clients} clients, {threads} WSGI threads, {options["db_latency"]:g}ms per query')
+        self.stdout.write(f'{"scenario":<16}{"path":<6}' + ''.join(f'{c:>12}' for c in CONCURRENCY_COLUMNS))
+        for name, paths in results.items():
+            for path, summary in paths.items():
+                self.stdout.write(f'{name:<16}{path:<6}' + ''.join(f'{summary[c]:>12}' for c in CONCURRENCY_COLUMNS))
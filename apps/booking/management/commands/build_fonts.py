@@ -0,0 +1,50 @@
+from urllib.error import URLError
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand, CommandError
+
+from booking import fonts
+
+
+def _read_bytes(name):
+    path = finders.find(name)
+    if path is None:
+        return None
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _read(name):
+    content = _read_bytes(name)
+    return content.decode('utf-8', errors='replace') if content is not None else None
+
+
+class Command(BaseCommand):
+    help = 'Vendor the Google Fonts in GOOGLE_FONTS_URL into static/ and report the icon font subsets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default=settings.GOOGLE_FONTS_URL, help='Google Fonts CSS URL to vendor')
+        parser.add_argument(
+            '--skip-download',
+            action='store_true',
+            help='Only report what collectstatic will keep of the icon fonts',
+        )
+
+    def handle(self, *args, **options):
+        if not options['skip_download']:
+            try:
+                written = fonts.vendor_google_fonts(options['url'], settings.STATICFILES_DIRS[0])
+            except (URLError, ValueError) as e:
+                raise CommandError(f'Could not download {options["url"]}: {e}')
+            self.stdout.write(self.style.SUCCESS(f'✓ Vendored {len(written) - 1} font files'))
+            self.stdout.write(f'  {settings.STATICFILES_DIRS[0] / fonts.FONTS_CSS} (commit it with static/fonts/)')
+
+        subsets = fonts.subset_icons(_read, _read_bytes)
+        if not subsets:
+            self.stdout.write(self.style.WARNING('Install fontTools and brotli to subset the icon fonts'))
+            return
+        for name, content in sorted(subsets.items()):
+            if name.endswith('.woff2'):
+                self.stdout.write(f'  {name}: {len(content) / 1024:.1f} KB')
+        self.stdout.write(self.style.SUCCESS('✓ Icon fonts will be subset by collectstatic'))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from booking import images
+from booking.models import SEOSettings, TeamMember
+
+IMAGE_FIELDS = {
+    TeamMember: ["photo"],
+    SEOSettings: ["og_image", "twitter_image"],
+}
+
+
+class Command(BaseCommand):
+    help = 'Build missing responsive renditions for uploaded images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Rebuild renditions even when they are up to date',
+        )
+
+    def handle(self, *args, **options):
+        for model, field_names in IMAGE_FIELDS.items():
+            updated = 0
+            for obj in model.objects.all():
+                if options['force']:
+                    # Delete the old files first, or storage.save() would
+                    # give the new ones suffixed names and leave these behind
+                    for name in field_names:
+                        if name in (obj.renditions or {}):
+                            images.delete(obj.renditions[name], getattr(obj, name).storage)
+                    obj.renditions = {}
+                before = obj.renditions
+                images.refresh_renditions(obj, field_names)
+                if obj.renditions != before:
+                    obj.save()
+                    updated += 1
+            self.stdout.write(
+                self.style.SUCCESS(f'✓ {model.__name__}: rebuilt renditions for {updated} row(s)')
+            )
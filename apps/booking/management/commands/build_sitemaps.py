@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from booking import sitemap_files
+
+
+class Command(BaseCommand):
+    help = 'Write sitemap files and the sitemap index to SITEMAP_ROOT'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Rewrite every section even when its fingerprint is unchanged',
+        )
+
+    def handle(self, *args, **options):
+        rebuilt = sitemap_files.build(force=options['force'])
+        if rebuilt:
+            self.stdout.write(self.style.SUCCESS(f'✓ Rebuilt sitemap sections: {", ".join(rebuilt)}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('✓ Sitemaps are up to date'))
+        self.stdout.write(f'  {sitemap_files.root() / sitemap_files.INDEX_NAME}')
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from booking import seo_sync
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the precompiled JSON-LD and <head> block of every SEO page (run after each deploy)'
+
+    def handle(self, *args, **options):
+        changed = seo_sync.recompile()
+        for instance in changed:
+            self.stdout.write(f'  {instance.page_name}')
+        self.stdout.write(self.style.SUCCESS(f'✓ Recompiled {len(changed)} SEO page(s)'))
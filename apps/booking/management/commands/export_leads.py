@@ -0,0 +1,58 @@
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from booking import exports
+from booking.models import ContactSubmission, MovingRequest
+
+MODELS = {
+    'contact': ContactSubmission,
+    'moving': MovingRequest,
+}
+
+
+def _date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f'Invalid date "{value}", expected YYYY-MM-DD')
+
+
+class Command(BaseCommand):
+    help = 'Stream leads as CSV or NDJSON to stdout or a file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=MODELS, help='Which leads to export')
+        parser.add_argument('--format', choices=exports.FORMATS, default='csv')
+        parser.add_argument('--since', type=_date, help='First creation date to include (YYYY-MM-DD)')
+        parser.add_argument('--until', type=_date, help='Last creation date to include (YYYY-MM-DD)')
+        parser.add_argument('--service', help='Only contact submissions for this service')
+        parser.add_argument('--output', '-o', help='File to write (default: stdout)')
+        parser.add_argument('--chunk-size', type=int, help='Rows fetched per round trip (default: EXPORT_CHUNK_SIZE)')
+
+    def handle(self, *args, **options):
+        model = MODELS[options['model']]
+        if options['service'] and model is not ContactSubmission:
+            raise CommandError('--service only applies to contact submissions')
+
+        queryset = exports.filter_leads(
+            model.objects.order_by('created_at', 'id'),
+            since=options['since'],
+            until=options['until'],
+            service=options['service'],
+        )
+        lines, _ = exports.FORMATS[options['format']]
+
+        output = open(options['output'], 'w', encoding='utf-8', newline='') if options['output'] else sys.stdout
+        try:
+            count = -1 if options['format'] == 'csv' else 0  # don't count the CSV header
+            for line in lines(queryset, chunk_size=options['chunk_size']):
+                output.write(line)
+                count += 1
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+        if options['output']:
+            self.stdout.write(self.style.SUCCESS(f'✓ Exported {count} lead(s) to {options["output"]}'))
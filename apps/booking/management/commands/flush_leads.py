@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from booking import ingest
+
+
+class Command(BaseCommand):
+    help = 'Write buffered leads left on disk (pending or from dead workers) to the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dir',
+            default=str(settings.LEAD_BUFFER_DIR),
+            help='Buffer directory (default: LEAD_BUFFER_DIR)',
+        )
+
+    def handle(self, *args, **options):
+        written = ingest.replay(options['dir'])
+        self.stdout.write(self.style.SUCCESS(f'✓ Flushed {written} buffered lead(s)'))
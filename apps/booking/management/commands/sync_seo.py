@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from booking import seo_sync
+
+
+def _short(value, width=60):
+    text = repr(value)
+    return text if len(text) <= width else text[:width - 1] + '…'
+
+
+class Command(BaseCommand):
+    help = 'Create and update SEO settings from a JSON or YAML file in one transaction'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=str(seo_sync.DEFAULT_PATH),
+            help='Page definitions file (default: booking/data/seo_pages.json)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show what would change without writing anything',
+        )
+        parser.add_argument(
+            '--delete-missing',
+            action='store_true',
+            help='Delete pages that are not in the file',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            plan = seo_sync.plan(seo_sync.load(options['path']), delete_missing=options['delete_missing'])
+        except (OSError, ValueError, seo_sync.SyncError) as e:
+            raise CommandError(str(e))
+
+        verbose = options['verbosity'] > 1 or options['dry_run']
+        for instance in plan.create:
+            self.stdout.write(self.style.SUCCESS(f'+ {instance.page_name}'))
+        for instance, changes in plan.update:
+            self.stdout.write(self.style.WARNING(f'~ {instance.page_name}'))
+            if verbose:
+                for name, (old, new) in changes.items():
+                    self.stdout.write(f'    {name}: {_short(old)} → {_short(new)}')
+        for instance in plan.delete:
+            self.stdout.write(self.style.ERROR(f'- {instance.page_name}'))
+
+        if options['dry_run']:
+            self.stdout.write('\nDry run, nothing written.')
+        elif plan.has_changes:
+            seo_sync.apply(plan)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'\n✓ {len(plan.create)} created, {len(plan.update)} updated, '
+                f'{len(plan.delete)} deleted, {plan.unchanged} unchanged'
+            )
+        )
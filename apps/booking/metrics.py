@@ -0,0 +1,267 @@
+"""
+Prometheus metrics shared between worker processes.
+
+Every process records into its own pair of files under METRICS_DIR:
+
+    <pid>.db     an mmap'd array of float64 values, METRICS_MAX_SERIES long
+    <pid>.keys   one "slot, family, suffix, labels, le" line per series,
+                 appended the first time the process records that series
+
+Recording is a dict lookup and a read-add-write of one slot (three for a
+histogram observation) under a lock local to the process, so workers
+never wait on each other and nothing leaves the machine. Histogram
+buckets are stored uncumulated and added up when read.
+
+render() sums every file in the directory, so counters survive worker
+restarts. A worker that is replaced under the same pid carries on from
+its predecessor's file. Empty the directory when the server starts (see
+clear()) so one deployment doesn't inherit another's counts.
+
+Recording is off unless METRICS_ENABLED=1, which config/gunicorn.conf.py
+sets, and gunicorn clears the directory from on_starting. Under other
+servers (uvicorn on its own, runserver) nothing runs before the workers,
+so config/wsgi.py and config/asgi.py call prune() instead, which deletes
+the files of processes that have exited.
+
+The /metrics view (views.prometheus_metrics) serves render() to staff
+and to requests bearing METRICS_TOKEN.
+"""
+import bisect
+import hmac
+import logging
+import mmap
+import os
+import struct
+import threading
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+REQUEST_DURATION = "booking_request_duration_seconds"
+FORM_SUBMISSIONS = "booking_form_submissions_total"
+PAGE_CACHE = "booking_page_cache_requests_total"
+SEO_CACHE = "booking_seo_cache_lookups_total"
+
+FAMILIES = {
+    REQUEST_DURATION: ("histogram", "Time to respond, by view (static files excluded)"),
+    FORM_SUBMISSIONS: ("counter", "Lead form POSTs by form and outcome"),
+    PAGE_CACHE: ("counter", "Full-page cache lookups by result"),
+    SEO_CACHE: ("counter", "SEOSettings cache lookups by result"),
+}
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_DOUBLE = struct.Struct("d")
+
+# Set by clear() in the server process, and so inherited by its workers
+CLEARED_ENV = "BOOKING_METRICS_CLEARED"
+
+_store = None
+_lock = threading.Lock()
+
+
+def _enabled():
+    return getattr(settings, "METRICS_ENABLED", False)
+
+
+def _directory():
+    return Path(getattr(settings, "METRICS_DIR", Path(settings.BASE_DIR) / "var" / "metrics"))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(labels):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels)
+
+
+def _read_keys(path):
+    """Yield (slot, family, suffix, labels, le) from a keys file, skipping torn lines"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            lines = f.read().split("\n")
+    except FileNotFoundError:
+        return
+    for line in lines:
+        parts = line.split("\t")
+        if len(parts) != 5 or not parts[0].isdigit():
+            continue
+        yield (int(parts[0]), *parts[1:])
+
+
+class _Store:
+    """This process's value and key files"""
+
+    def __init__(self, directory, capacity):
+        directory.mkdir(parents=True, exist_ok=True)
+        self.pid = os.getpid()
+        self.capacity = capacity
+        self.series = {}  # (family, labels) -> slot, or None once out of room
+
+        fd = os.open(directory / f"{self.pid}.db", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < capacity * 8:
+                os.ftruncate(fd, capacity * 8)
+            self.values = mmap.mmap(fd, capacity * 8)
+        finally:
+            os.close(fd)
+
+        keys_path = directory / f"{self.pid}.keys"
+        self.slots = {(family, suffix, labels, le): slot for slot, family, suffix, labels, le in _read_keys(keys_path)}
+        self.next_slot = max(self.slots.values(), default=-1) + 1
+        self.keys = open(keys_path, "a", encoding="utf-8")
+
+    def allocate(self, family, labels, samples):
+        """Slots for one series' samples ((suffix, le) pairs), contiguous"""
+        text = _label_text(labels)
+        first = self.slots.get((family, samples[0][0], text, samples[0][1]))
+        if first is not None:
+            return first
+        if self.next_slot + len(samples) > self.capacity:
+            logger.warning("METRICS_MAX_SERIES reached; not recording %s{%s}", family, text)
+            return None
+        first = self.next_slot
+        lines = []
+        for offset, (suffix, le) in enumerate(samples):
+            self.slots[(family, suffix, text, le)] = first + offset
+            lines.append(f"{first + offset}\t{family}\t{suffix}\t{text}\t{le}\n")
+        self.next_slot += len(samples)
+        self.keys.write("".join(lines))
+        self.keys.flush()
+        return first
+
+    def add(self, slot, amount):
+        offset = slot * 8
+        _DOUBLE.pack_into(self.values, offset, _DOUBLE.unpack_from(self.values, offset)[0] + amount)
+
+
+def _get_store():
+    global _store
+
+    if _store is None or _store.pid != os.getpid():
+        _store = _Store(_directory(), getattr(settings, "METRICS_MAX_SERIES", 4096))
+    return _store
+
+
+def _histogram_samples():
+    return [("_bucket", repr(b)) for b in BUCKETS] + [("_bucket", "+Inf"), ("_sum", ""), ("_count", "")]
+
+
+def inc(family, amount=1, **labels):
+    """Add amount to a counter"""
+    if not _enabled():
+        return
+    key = (family, tuple(labels.items()))
+    with _lock:
+        store = _get_store()
+        slot = store.series.get(key, -1)
+        if slot == -1:
+            slot = store.series[key] = store.allocate(family, key[1], [("", "")])
+        if slot is not None:
+            store.add(slot, amount)
+
+
+def observe(family, value, **labels):
+    """Record value in a histogram"""
+    if not _enabled():
+        return
+    key = (family, tuple(labels.items()))
+    with _lock:
+        store = _get_store()
+        first = store.series.get(key, -1)
+        if first == -1:
+            first = store.series[key] = store.allocate(family, key[1], _histogram_samples())
+        if first is not None:
+            store.add(first + bisect.bisect_left(BUCKETS, value), 1)
+            store.add(first + len(BUCKETS) + 1, value)
+            store.add(first + len(BUCKETS) + 2, 1)
+
+
+def count_submission(form, outcome):
+    """A lead form POST: accepted, duplicate, invalid, rate_limited or shed"""
+    inc(FORM_SUBMISSIONS, form=form, outcome=outcome)
+
+
+def collect(directory=None):
+    """Sum every process's files: {(family, suffix, labels, le): value}"""
+    totals = {}
+    for keys_path in sorted(Path(directory or _directory()).glob("*.keys")):
+        try:
+            data = keys_path.with_suffix(".db").read_bytes()
+        except FileNotFoundError:
+            continue
+        for slot, *key in _read_keys(keys_path):
+            if (slot + 1) * 8 <= len(data):
+                key = tuple(key)
+                totals[key] = totals.get(key, 0.0) + _DOUBLE.unpack_from(data, slot * 8)[0]
+    return totals
+
+
+def _number(value):
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def render(directory=None):
+    """Every family in the Prometheus text exposition format"""
+    totals = collect(directory)
+    lines = []
+    for family, (kind, description) in FAMILIES.items():
+        series = [(key[1:], value) for key, value in totals.items() if key[0] == family]
+        if not series:
+            continue
+        lines.append(f"# HELP {family} {description}")
+        lines.append(f"# TYPE {family} {kind}")
+        cumulative = {}
+        for (suffix, labels, le), value in series:
+            if suffix == "_bucket":
+                value = cumulative[labels] = cumulative.get(labels, 0.0) + value
+                labels = f'{labels},le="{le}"' if labels else f'le="{le}"'
+            lines.append(f"{family}{suffix}{{{labels}}} {_number(value)}" if labels else f"{family}{suffix} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def clear(directory=None):
+    """Delete every process's files; call before any worker starts"""
+    directory = Path(directory or _directory())
+    for path in [*directory.glob("*.db"), *directory.glob("*.keys")]:
+        path.unlink(missing_ok=True)
+    os.environ[CLEARED_ENV] = "1"
+
+
+def _running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def prune(directory=None):
+    """
+    Delete the files of processes that are no longer running, unless the
+    server already cleared the directory (a gunicorn worker that died
+    since then still counts towards the totals)
+    """
+    if not _enabled() or os.environ.get(CLEARED_ENV):
+        return
+    directory = Path(directory or _directory())
+    for path in [*directory.glob("*.db"), *directory.glob("*.keys")]:
+        if path.stem.isdigit() and not _running(int(path.stem)):
+            path.unlink(missing_ok=True)
+
+
+def authorized(request):
+    """Staff, or a request with the header "Authorization: Bearer <METRICS_TOKEN>" """
+    user = getattr(request, "user", None)
+    if user is not None and user.is_staff:
+        return True
+    token = getattr(settings, "METRICS_TOKEN", "")
+    supplied = request.headers.get("Authorization", "")
+    return bool(token) and hmac.compare_digest(supplied.encode(), f"Bearer {token}".encode())
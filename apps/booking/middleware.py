@@ -0,0 +1,177 @@
+"""
+Request timing for the booking site: Server-Timing headers, slow-request
+logging and the latency histograms in metrics.py.
+
+ServerTimingMiddleware sits just inside WhiteNoise and ViewTimingMiddleware
+last, so between them they split a request into:
+
+    total   everything after static files
+    app     the middleware stack (sessions, auth, messages, CSRF ...)
+    view    the view itself, including its queries and templates
+    db      query count and time, from profiling.profile()
+    tpl     template rendering
+
+Requests are profiled when they are sampled (SERVER_TIMING_SAMPLE_RATE)
+or carry a session cookie, since staff always do. The header is sent to
+staff and on sampled requests. Any other request costs two clock reads
+and a random number.
+
+Requests slower than SERVER_TIMING_SLOW_MS are logged, with their queries
+when the request was profiled.
+
+MetricsMiddleware, next to ServerTimingMiddleware, records every request's
+duration under the name of the view that handled it.
+
+All three run in the server's mode, so under ASGI they add no thread hops
+except on profiled requests, which take two (see profiling.aprofile()).
+"""
+import logging
+import random
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import metrics, profiling
+
+logger = logging.getLogger(__name__)
+
+MAX_LOGGED_SQL = 300  # characters of each query in the slow-request log
+
+
+def header(profile):
+    """The Server-Timing value for a finished profile"""
+    parts = [f"total;dur={profile.wall * 1000:.1f}"]
+    if profile.view_time is not None:
+        parts.append(f'app;dur={(profile.wall - profile.view_time) * 1000:.1f};desc="middleware"')
+        parts.append(f"view;dur={profile.view_time * 1000:.1f}")
+    parts.append(f'db;dur={profile.db_time * 1000:.1f};desc="{profile.query_count} queries"')
+    parts.append(f"tpl;dur={profile.template_time * 1000:.1f}")
+    return ", ".join(parts)
+
+
+class _Middleware:
+    """Base for middleware that runs sync or async, whichever the stack below is"""
+
+    sync_capable = True
+    async_capable = True
+    setting = None  # turns the middleware off when False
+
+    def __init__(self, get_response):
+        if not getattr(settings, self.setting, True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+
+class MetricsMiddleware(_Middleware):
+    setting = "METRICS_ENABLED"
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        start = perf_counter()
+        response = self.get_response(request)
+        self._record(request, perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        start = perf_counter()
+        response = await self.get_response(request)
+        self._record(request, perf_counter() - start)
+        return response
+
+    def _record(self, request, duration):
+        match = request.resolver_match
+        metrics.observe(metrics.REQUEST_DURATION, duration, view=match.view_name if match else "unmatched")
+
+
+class ServerTimingMiddleware(_Middleware):
+    setting = "SERVER_TIMING_ENABLED"
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.sample_rate = getattr(settings, "SERVER_TIMING_SAMPLE_RATE", 0.0)
+        self.slow = getattr(settings, "SERVER_TIMING_SLOW_MS", 1000) / 1000
+
+    def _sampled(self):
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _profiles(self, request, sampled):
+        return sampled or settings.SESSION_COOKIE_NAME in request.COOKIES
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        sampled = self._sampled()
+        if not self._profiles(request, sampled):
+            start = perf_counter()
+            response = self.get_response(request)
+            self._check_slow(request, perf_counter() - start)
+            return response
+
+        with profiling.profile() as p:
+            response = self.get_response(request)
+        user = getattr(request, "user", None)
+        return self._finish(request, response, p, sampled or (user is not None and user.is_staff))
+
+    async def __acall__(self, request):
+        sampled = self._sampled()
+        if not self._profiles(request, sampled):
+            start = perf_counter()
+            response = await self.get_response(request)
+            self._check_slow(request, perf_counter() - start)
+            return response
+
+        async with profiling.aprofile() as p:
+            response = await self.get_response(request)
+        if not sampled and hasattr(request, "auser"):
+            sampled = (await request.auser()).is_staff
+        return self._finish(request, response, p, sampled)
+
+    def _check_slow(self, request, elapsed):
+        if elapsed >= self.slow:
+            logger.warning("Slow request %s %s: %.0fms (not profiled)", request.method, request.path, elapsed * 1000)
+
+    def _finish(self, request, response, p, send_header):
+        if send_header:
+            response["Server-Timing"] = header(p)
+        if p.wall >= self.slow:
+            queries = "".join(
+                f"\n  {duration * 1000:8.1f}ms [{alias}] {sql[:MAX_LOGGED_SQL]}" for alias, sql, duration in p.queries
+            )
+            logger.warning(
+                "Slow request %s %s: %.0fms (%s)%s", request.method, request.path, p.wall * 1000, header(p), queries
+            )
+        return response
+
+
+class ViewTimingMiddleware(_Middleware):
+    """Times the view for ServerTimingMiddleware; must be last in MIDDLEWARE"""
+
+    setting = "SERVER_TIMING_ENABLED"
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        current = profiling.active()
+        if current is None:
+            return self.get_response(request)
+        start = perf_counter()
+        try:
+            return self.get_response(request)
+        finally:
+            current.view_time = perf_counter() - start
+
+    async def __acall__(self, request):
+        current = profiling.active()
+        if current is None:
+            return await self.get_response(request)
+        start = perf_counter()
+        try:
+            return await self.get_response(request)
+        finally:
+            current.view_time = perf_counter() - start
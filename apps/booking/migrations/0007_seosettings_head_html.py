@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 18:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0006_alter_teammember_photo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='seosettings',
+            name='head_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='seosettings',
+            name='head_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+    ]
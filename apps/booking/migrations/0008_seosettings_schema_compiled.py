@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-18 18:20
+
+from django.core.exceptions import ValidationError
+from django.db import migrations, models
+
+from booking import seo_head, structured_data
+
+
+def compile_schemas(apps, schema_editor):
+    """Compile the schema_json of rows saved before schema_compiled existed"""
+    SEOSettings = apps.get_model('booking', 'SEOSettings')
+    rows = []
+    for seo in SEOSettings.objects.filter(schema_compiled=''):
+        try:
+            seo.schema_compiled = structured_data.build(seo.schema_json, seo_head.SITE_ROOT)
+        except ValidationError:
+            continue  # left for seo_head to report; the default schema is served
+        rows.append(seo)
+    SEOSettings.objects.bulk_update(rows, ['schema_compiled'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0007_seosettings_head_html'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='seosettings',
+            name='schema_compiled',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(compile_schemas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 18:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0008_seosettings_schema_compiled'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contactsubmission',
+            name='submission_id',
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='movingrequest',
+            name='submission_id',
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 18:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0009_lead_submission_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='seosettings',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='teammember',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
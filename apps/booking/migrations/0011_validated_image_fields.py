@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-18 18:24
+
+import booking.fields
+import booking.utils
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0010_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='seosettings',
+            name='og_image',
+            field=booking.fields.ValidatedImageField(blank=True, null=True, upload_to='seo/', validators=[booking.utils.ImageValidator(max_bytes=5242880)]),
+        ),
+        migrations.AlterField(
+            model_name='seosettings',
+            name='twitter_image',
+            field=booking.fields.ValidatedImageField(blank=True, null=True, upload_to='seo/', validators=[booking.utils.ImageValidator(max_bytes=5242880)]),
+        ),
+        migrations.AlterField(
+            model_name='teammember',
+            name='photo',
+            field=booking.fields.ValidatedImageField(upload_to='team_photos/', validators=[booking.utils.ImageValidator(max_bytes=2097152, min_height=600, min_width=600, square=True)]),
+        ),
+    ]
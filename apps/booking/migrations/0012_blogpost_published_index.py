@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 18:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0011_validated_image_fields'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='blogpost',
+            index=models.Index(fields=['published', '-created_at', '-id'], name='blogpost_published_idx'),
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Full-text index for BlogPost, see booking/search.py.
+# SQLite gets an external-content FTS5 table kept in sync by triggers;
+# PostgreSQL gets a generated, weighted tsvector column with a GIN index.
+# Other backends get nothing and search falls back to icontains.
+
+from django.db import migrations
+
+SQLITE_FORWARDS = [
+    """
+    CREATE VIRTUAL TABLE booking_blogpost_fts USING fts5(
+        title, excerpt, content,
+        content='booking_blogpost', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER booking_blogpost_fts_ai AFTER INSERT ON booking_blogpost BEGIN
+        INSERT INTO booking_blogpost_fts(rowid, title, excerpt, content)
+        VALUES (new.id, new.title, new.excerpt, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER booking_blogpost_fts_ad AFTER DELETE ON booking_blogpost BEGIN
+        INSERT INTO booking_blogpost_fts(booking_blogpost_fts, rowid, title, excerpt, content)
+        VALUES ('delete', old.id, old.title, old.excerpt, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER booking_blogpost_fts_au AFTER UPDATE OF title, excerpt, content ON booking_blogpost BEGIN
+        INSERT INTO booking_blogpost_fts(booking_blogpost_fts, rowid, title, excerpt, content)
+        VALUES ('delete', old.id, old.title, old.excerpt, old.content);
+        INSERT INTO booking_blogpost_fts(rowid, title, excerpt, content)
+        VALUES (new.id, new.title, new.excerpt, new.content);
+    END
+    """,
+    "INSERT INTO booking_blogpost_fts(booking_blogpost_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARDS = [
+    "DROP TRIGGER IF EXISTS booking_blogpost_fts_ai",
+    "DROP TRIGGER IF EXISTS booking_blogpost_fts_ad",
+    "DROP TRIGGER IF EXISTS booking_blogpost_fts_au",
+    "DROP TABLE IF EXISTS booking_blogpost_fts",
+]
+
+POSTGRES_FORWARDS = [
+    """
+    ALTER TABLE booking_blogpost ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(excerpt, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(content, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX booking_blogpost_search_idx ON booking_blogpost USING GIN (search_vector)",
+]
+
+POSTGRES_BACKWARDS = [
+    "DROP INDEX IF EXISTS booking_blogpost_search_idx",
+    "ALTER TABLE booking_blogpost DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0012_blogpost_published_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARDS, 'postgresql': POSTGRES_FORWARDS}),
+            _run({'sqlite': SQLITE_BACKWARDS, 'postgresql': POSTGRES_BACKWARDS}),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.8 on 2026-10-18 18:30
+
+from django.db import migrations, models
+
+# The admin lead search (LeadAdmin.get_search_results) uses email__iexact
+# and name__istartswith. Django compiles those to LIKE on SQLite, which
+# only uses an index declared COLLATE NOCASE, and to UPPER(col) LIKE on
+# PostgreSQL, which needs an expression index with a pattern opclass.
+# Neither can be expressed portably in Meta.indexes.
+CASE_INSENSITIVE_INDEXES = [
+    ('contact_email_ci_idx', 'booking_contactsubmission', 'email'),
+    ('contact_name_ci_idx', 'booking_contactsubmission', 'name'),
+    ('moving_email_ci_idx', 'booking_movingrequest', 'email'),
+    ('moving_name_ci_idx', 'booking_movingrequest', 'name'),
+]
+
+COLUMN_SQL = {
+    'sqlite': '"{column}" COLLATE NOCASE',
+    'postgresql': 'UPPER("{column}"::text) text_pattern_ops',
+}
+
+
+def create_case_insensitive_indexes(apps, schema_editor):
+    column_sql = COLUMN_SQL.get(schema_editor.connection.vendor)
+    if column_sql is None:
+        return
+    for name, table, column in CASE_INSENSITIVE_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX "{name}" ON "{table}" ({column_sql.format(column=column)})'
+        )
+
+
+def drop_case_insensitive_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor not in COLUMN_SQL:
+        return
+    for name, _, _ in CASE_INSENSITIVE_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0013_blogpost_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contactsubmission',
+            index=models.Index(fields=['-created_at', '-id'], name='contact_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contactsubmission',
+            index=models.Index(fields=['service', '-created_at'], name='contact_service_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contactsubmission',
+            index=models.Index(fields=['phone'], name='contact_phone_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movingrequest',
+            index=models.Index(fields=['-created_at', '-id'], name='moving_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movingrequest',
+            index=models.Index(fields=['date'], name='moving_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movingrequest',
+            index=models.Index(fields=['phone'], name='moving_phone_idx'),
+        ),
+        migrations.RunPython(create_case_insensitive_indexes, drop_case_insensitive_indexes),
+    ]
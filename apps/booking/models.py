@@ -1,6 +1,9 @@
 from django.db import models
 from django.urls import reverse
-from .utils import validate_team_photo
+from django.core.exceptions import ValidationError
+from .fields import ValidatedImageField
+from .utils import validate_seo_image, validate_team_photo
+from . import images, seo_head, structured_data
 
 class SEOSettings(models.Model):
     page_name = models.CharField(
@@ -34,7 +37,9 @@ class SEOSettings(models.Model):
     # Open Graph
     og_title = models.CharField(max_length=255, blank=True, null=True)
     og_description = models.TextField(blank=True, null=True)
-    og_image = models.ImageField(upload_to="seo/", blank=True, null=True)
+    og_image = ValidatedImageField(
+        upload_to="seo/", blank=True, null=True, validators=[validate_seo_image]
+    )
     og_type = models.CharField(
         max_length=50,
         default="website",
@@ -45,7 +50,9 @@ class SEOSettings(models.Model):
     # Twitter
     twitter_title = models.CharField(max_length=255, blank=True, null=True)
     twitter_description = models.TextField(blank=True, null=True)
-    twitter_image = models.ImageField(upload_to="seo/", blank=True, null=True)
+    twitter_image = ValidatedImageField(
+        upload_to="seo/", blank=True, null=True, validators=[validate_seo_image]
+    )
     twitter_card = models.CharField(
         max_length=50,
         default="summary_large_image",
@@ -72,8 +79,45 @@ class SEOSettings(models.Model):
         help_text="e.g., index, follow or noindex, nofollow"
     )
 
+    # Resized copies of og_image/twitter_image (see images.py)
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
+
+    # Minified JSON-LD built from schema_json (see structured_data.py)
+    schema_compiled = models.TextField(blank=True, editable=False)
+
+    # Precompiled <head> block, rebuilt on every save (see seo_head.py)
+    head_html = models.TextField(blank=True, editable=False)
+    head_hash = models.CharField(max_length=64, blank=True, editable=False)
+
     def __str__(self):
         return self.page_name
+
+    def clean(self):
+        super().clean()
+        if self.schema_json and self.schema_json.strip():
+            try:
+                structured_data.parse(self.schema_json)
+            except ValidationError as e:
+                raise ValidationError({"schema_json": e.messages})
+
+    def save(self, *args, **kwargs):
+        images.refresh_renditions(self, ["og_image", "twitter_image"])
+        self.compile_schema()
+        self.compile_head()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {
+                *update_fields, "renditions", "schema_compiled", "head_html", "head_hash"
+            }
+        super().save(*args, **kwargs)
+
+    def compile_schema(self):
+        """Validate schema_json and store it merged with the defaults, minified"""
+        self.schema_compiled = structured_data.build(self.schema_json, seo_head.SITE_ROOT)
+
+    def compile_head(self):
+        """Render the <head> meta block and its content hash"""
+        self.head_html, self.head_hash = seo_head.build(self)
     
     def get_meta_title(self):
         """Return meta title or generate default"""
@@ -103,52 +147,17 @@ class SEOSettings(models.Model):
         """Return Twitter description or fall back to meta description"""
         return self.twitter_description or self.get_meta_description()
     
+    def get_og_image_url(self):
+        """Return a 1200px-wide JPEG of the OG image, as social crawlers prefer"""
+        return images.url(self, "og_image", "jpeg", max_width=1200)
+
+    def get_twitter_image_url(self):
+        """Return a 1200px-wide JPEG of the Twitter image"""
+        return images.url(self, "twitter_image", "jpeg", max_width=1200)
+
     def get_default_schema(self):
-        """Generate default LocalBusiness schema if none provided"""
-        if self.schema_json:
-            return self.schema_json
-        
-        default_schema = {
-            "@context": "https://schema.org",
-            "@type": "MovingCompany",
-            "name": "Expert Gati Packers and Movers",
-            "description": "Professional packers and movers service in Pune, Mumbai and across India",
-            "url": "https://www.expertgatipackers.com",
-            "telephone": "+91-XXXXXXXXXX",
-            "priceRange": "$$",
-            "address": {
-                "@type": "PostalAddress",
-                "streetAddress": "Your Street Address",
-                "addressLocality": "Pune",
-                "addressRegion": "Maharashtra",
-                "postalCode": "411001",
-                "addressCountry": "IN"
-            },
-            "areaServed": [
-                {
-                    "@type": "City",
-                    "name": "Pune"
-                },
-                {
-                    "@type": "City",
-                    "name": "Mumbai"
-                },
-                {
-                    "@type": "Country",
-                    "name": "India"
-                }
-            ],
-            "serviceType": [
-                "Home Relocation",
-                "Office Relocation",
-                "Packing Services",
-                "Loading and Unloading",
-                "Storage Services"
-            ]
-        }
-        
-        import json
-        return json.dumps(default_schema)
+        """Return the compiled JSON-LD (custom schema merged with defaults)"""
+        return self.schema_compiled or structured_data.build(self.schema_json, seo_head.SITE_ROOT)
     
 class BlogPost(models.Model):
     title = models.CharField(max_length=255)
@@ -159,8 +168,14 @@ class BlogPost(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Serves the keyset-paginated archive (booking/pagination.py)
+            models.Index(fields=["published", "-created_at", "-id"], name="blogpost_published_idx"),
+        ]
+
     def get_absolute_url(self):
-        return reverse('blog:detail', kwargs={'slug': self.slug})  # ensure this url exists
+        return reverse('blog:detail', kwargs={'slug': self.slug})
 
     def __str__(self):
         return self.title
@@ -182,9 +197,16 @@ class ContactSubmission(models.Model):
     botcheck = models.CharField(max_length=255, blank=True, help_text="Honeypot field")
     created_at = models.DateTimeField(auto_now_add=True)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
+    submission_id = models.UUIDField(null=True, blank=True, unique=True, editable=False)
 
     class Meta:
         ordering = ["-created_at"]
+        # Case-insensitive name/email indexes are vendor-specific, see migration 0014
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="contact_created_idx"),
+            models.Index(fields=["service", "-created_at"], name="contact_service_idx"),
+            models.Index(fields=["phone"], name="contact_phone_idx"),
+        ]
 
     def __str__(self):
         return f"{self.name} — {self.email} ({self.created_at:%Y-%m-%d %H:%M})"
@@ -198,6 +220,15 @@ class MovingRequest(models.Model):
     date = models.DateField(null=True, blank=True)
     botcheck = models.CharField(max_length=50, blank=True)  # honeypot
     created_at = models.DateTimeField(auto_now_add=True)
+    submission_id = models.UUIDField(null=True, blank=True, unique=True, editable=False)
+
+    class Meta:
+        # Case-insensitive name/email indexes are vendor-specific, see migration 0014
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="moving_created_idx"),
+            models.Index(fields=["date"], name="moving_date_idx"),
+            models.Index(fields=["phone"], name="moving_phone_idx"),
+        ]
 
     def __str__(self):
         return f"{self.name} — {self.location_from} → {self.location_to} ({self.date})"
@@ -206,7 +237,15 @@ class MovingRequest(models.Model):
 class TeamMember(models.Model):
     name = models.CharField(max_length=100)
     role = models.CharField(max_length=100)
-    photo = models.ImageField(upload_to='team_photos/', validators=[validate_team_photo])
+    photo = ValidatedImageField(upload_to='team_photos/', validators=[validate_team_photo])
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+    def save(self, *args, **kwargs):
+        images.refresh_renditions(self, ["photo"])
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "renditions"}
+        super().save(*args, **kwargs)
\ No newline at end of file
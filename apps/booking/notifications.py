@@ -0,0 +1,159 @@
+"""
+Email notifications for new leads, sent off the request path.
+
+ingest.submit() hands every accepted lead to notify(). A background
+dispatcher drains the queue and sends everything waiting over a single
+connection from get_connection(). Within each minute the first
+LEAD_NOTIFY_DIGEST_THRESHOLD leads are mailed one by one; anything past
+that is held and sent as one digest when the minute is up. Failed sends
+are retried with exponential backoff; a retry only resends the messages
+that had not gone out, so nobody gets the same lead twice.
+
+Set LEAD_NOTIFY_ASYNC = False to send inline (handy with the locmem
+backend in tests). Inline sends are tried once, since the backoff would
+hold up the request. Nothing is sent while LEAD_NOTIFY_RECIPIENTS is empty.
+"""
+import logging
+import os
+import queue
+import smtplib
+import threading
+import time
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+
+logger = logging.getLogger(__name__)
+
+_dispatcher = None
+
+
+def _recipients():
+    return list(getattr(settings, "LEAD_NOTIFY_RECIPIENTS", []))
+
+
+def _describe(instance):
+    """Return (subject, body, reply_to) for a lead"""
+    lines = [
+        f"{field.verbose_name.capitalize()}: {field.value_from_object(instance)}"
+        for field in instance._meta.concrete_fields
+        if field.name not in ("id", "botcheck", "submission_id")
+    ]
+    kind = "quote request" if instance._meta.model_name == "movingrequest" else "contact"
+    return f"New {kind} from {instance.name}", "\n".join(lines), instance.email
+
+
+def _message(subject, body, reply_to=None):
+    return EmailMessage(
+        subject=subject,
+        body=body,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=_recipients(),
+        reply_to=[reply_to] if reply_to else None,
+    )
+
+
+def _digest(events):
+    body = "\n\n----------\n\n".join(f"{subject}\n\n{text}" for subject, text, _ in events)
+    return _message(f"{len(events)} new leads", body)
+
+
+def send(messages, retries=None):
+    """Send messages over one connection, retrying the unsent ones with backoff"""
+    if retries is None:
+        retries = getattr(settings, "LEAD_NOTIFY_RETRIES", 3)
+    backoff = getattr(settings, "LEAD_NOTIFY_BACKOFF", 2)
+    pending = list(messages)
+
+    for attempt in range(retries + 1):
+        try:
+            with get_connection() as connection:
+                # One at a time, so a failure part-way says which went out
+                while pending:
+                    connection.send_messages(pending[:1])
+                    pending.pop(0)
+            return True
+        except (smtplib.SMTPException, OSError):
+            if not pending:  # everything went out; closing the connection failed
+                return True
+            if attempt == retries:
+                logger.exception("Giving up on %d lead notification(s)", len(pending))
+                return False
+            time.sleep(backoff * 2 ** attempt)
+
+
+class Dispatcher:
+    """Queue plus worker thread that batches notifications for one process"""
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.queue = queue.Queue()
+        self.held = []
+        self.window_end = 0.0
+        self.sent_in_window = 0
+        self.thread = threading.Thread(target=self._run, name="lead-notifier", daemon=True)
+        self.thread.start()
+
+    def put(self, event):
+        self.queue.put(event)
+
+    def _drain(self, timeout):
+        events = []
+        try:
+            events.append(self.queue.get(timeout=timeout))
+            while True:
+                events.append(self.queue.get_nowait())
+        except queue.Empty:
+            pass
+        return events
+
+    def _run(self):
+        while True:
+            timeout = max(0.0, self.window_end - time.monotonic()) if self.held else None
+            events = self._drain(timeout)
+            try:
+                self._dispatch(events)
+            except Exception:
+                logger.exception("Lead notification dispatch failed")
+
+    def _dispatch(self, events):
+        now = time.monotonic()
+        messages = []
+
+        if now >= self.window_end:
+            if self.held:
+                messages.append(_digest(self.held))
+                self.held = []
+            self.window_end = now + 60
+            self.sent_in_window = 0
+
+        threshold = getattr(settings, "LEAD_NOTIFY_DIGEST_THRESHOLD", 5)
+        for event in events:
+            if self.sent_in_window < threshold:
+                messages.append(_message(*event))
+                self.sent_in_window += 1
+            else:
+                self.held.append(event)
+
+        if messages:
+            send(messages)
+
+
+def _get_dispatcher():
+    global _dispatcher
+
+    if _dispatcher is None or _dispatcher.pid != os.getpid():
+        _dispatcher = Dispatcher()
+    return _dispatcher
+
+
+def notify(instance):
+    """Queue an email about a newly accepted lead"""
+    if not _recipients():
+        return
+
+    event = _describe(instance)
+    if getattr(settings, "LEAD_NOTIFY_ASYNC", True):
+        _get_dispatcher().put(event)
+    else:
+        send([_message(*event)], retries=0)
@@ -0,0 +1,320 @@
+"""
+Full-page cache for the marketing views.
+
+Rendered HTML is stored per (scheme, host, path) together with the
+versions of the tags the page was rendered against. Saving or deleting a
+model bumps its tags (see signals.py), so the next request sees a version
+mismatch and re-renders. A lookup is a single get_many() for the page
+entry and its tag versions.
+
+The query string is left out of the key except for the parameters a view
+names in `params` (the blog's cursors, say), so tracking parameters such
+as utm_* and gclid share the one entry instead of each adding their own.
+
+The CSRF token and the lead forms' one-time submission token (see
+idempotency.py) in cached HTML are swapped for placeholders and filled
+in per request, so cached forms keep working for every visitor.
+
+Views whose freshness is known from a cheap query (e.g. a row's
+updated_at) can use cached_response() instead of tags.
+
+Responses also carry a weak ETag and a Last-Modified derived from the
+same tag versions and the build version. A revalidating client is
+answered 304 from the tag versions alone, before the cached page is
+fetched, the view runs or the database is touched. Pages are sent with
+Cache-Control: no-cache, so browsers always revalidate.
+"""
+import hashlib
+import os
+import re
+import time
+import uuid
+from functools import wraps
+from urllib.parse import quote, urlencode
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from . import metrics
+
+CSRF_PLACEHOLDER = b"__page_cache_csrf_token__"
+CSRF_INPUT_RE = re.compile(rb'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+TOKEN_PLACEHOLDER = b"__page_cache_submission_token__"
+TOKEN_INPUT_RE = re.compile(rb'(name="submission_token" value=")[^"]*(")')
+
+_build_version = None
+_build_time = 0
+
+_stats = {"hits": 0, "misses": 0, "bypassed": 0, "not_modified": 0}
+
+
+def _enabled():
+    return getattr(settings, "PAGE_CACHE_ENABLED", True)
+
+
+def _timeout():
+    return getattr(settings, "PAGE_CACHE_TIMEOUT", 60 * 60 * 24)
+
+
+def _tag_key(tag):
+    # Tags embed page names, which may contain spaces
+    return f"page:tag:{quote(tag)}"
+
+
+def build_version():
+    """
+    Hash of the deployed templates and static manifest, so a deploy never
+    serves pages rendered by the previous release.
+    """
+    global _build_version, _build_time
+
+    if _build_version is None:
+        digest = hashlib.sha256()
+        newest = 0
+        for directory in settings.TEMPLATES[0]["DIRS"]:
+            for root, dirs, files in sorted(os.walk(directory)):
+                dirs.sort()
+                for name in sorted(files):
+                    stat = os.stat(os.path.join(root, name))
+                    digest.update(f"{root}/{name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+                    newest = max(newest, stat.st_mtime)
+        manifest = os.path.join(settings.STATIC_ROOT, "staticfiles.json")
+        if os.path.exists(manifest):
+            with open(manifest, "rb") as f:
+                digest.update(f.read())
+            newest = max(newest, os.stat(manifest).st_mtime)
+        _build_time = int(newest)
+        _build_version = digest.hexdigest()[:12]
+    return _build_version
+
+
+def _page_key(request, params=()):
+    """The cache key for a page: its path plus the query parameters in params"""
+    query = urlencode([(name, value) for name in sorted(params) for value in request.GET.getlist(name)])
+    path = hashlib.md5(f"{request.path}?{query}".encode()).hexdigest()
+    return f"page:{build_version()}:{request.scheme}:{request.get_host()}:{path}"
+
+
+def bump(*tags):
+    """Mark every page depending on tags as stale"""
+    now = time.time_ns() // 1000
+    cache.set_many({_tag_key(tag): now for tag in tags}, None)
+    return dict.fromkeys(tags, now)
+
+
+def _has_pending_messages(request):
+    return len(messages.get_messages(request)) > 0
+
+
+def _cacheable_request(request):
+    return (
+        _enabled()
+        and request.method in ("GET", "HEAD")
+        and not _has_pending_messages(request)
+    )
+
+
+def _cacheable_response(response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and "private" not in response.get("Cache-Control", "")
+        and "no-store" not in response.get("Cache-Control", "")
+    )
+
+
+def _entry_from_response(response, versions):
+    content, csrf = CSRF_INPUT_RE.subn(rb"\1" + CSRF_PLACEHOLDER + rb"\2", response.content)
+    content, token = TOKEN_INPUT_RE.subn(rb"\1" + TOKEN_PLACEHOLDER + rb"\2", content)
+    return {
+        "versions": versions,
+        "content": content,
+        "content_type": response["Content-Type"],
+        "csrf": bool(csrf),
+        "token": bool(token),
+    }
+
+
+def _response_from_entry(request, entry):
+    content = entry["content"]
+    if entry["csrf"]:
+        content = content.replace(CSRF_PLACEHOLDER, get_token(request).encode())
+    if entry.get("token"):
+        content = content.replace(TOKEN_PLACEHOLDER, str(uuid.uuid4()).encode())
+    response = HttpResponse(content, content_type=entry["content_type"])
+    response["X-Page-Cache"] = "hit"
+    return response
+
+
+def _lookup(request, tags, params, with_entry=True):
+    """Return (entry or None, current tag versions) in one round-trip"""
+    page_key = _page_key(request, params)
+    tag_keys = {_tag_key(tag): tag for tag in tags}
+    found = cache.get_many([page_key, *tag_keys] if with_entry else list(tag_keys))
+
+    versions = {tag: found.get(key) for key, tag in tag_keys.items()}
+    missing = [tag for tag, version in versions.items() if version is None]
+    if missing:
+        # First sighting (or eviction) of a tag: start its clock now.
+        versions.update(bump(*missing))
+        return None, versions
+
+    entry = found.get(page_key)
+    if entry is not None and entry["versions"] != versions:
+        entry = None
+    return entry, versions
+
+
+def _validators(version, timestamp):
+    """
+    (ETag, Last-Modified) for a page at `version` whose data last changed
+    at `timestamp` (seconds). The ETag is weak because the CSRF and
+    submission tokens differ between otherwise identical responses.
+    """
+    digest = hashlib.sha256(f"{build_version()}:{version}".encode()).hexdigest()[:20]
+    return f'W/"{digest}"', max(int(timestamp), _build_time)
+
+
+def _tag_validators(versions):
+    version = ",".join(f"{tag}={versions[tag]}" for tag in sorted(versions))
+    return _validators(version, max(versions.values(), default=0) / 1_000_000)
+
+
+def _is_conditional(request):
+    return "If-None-Match" in request.headers or "If-Modified-Since" in request.headers
+
+
+def _add_validators(response, validators):
+    if _cacheable_response(response):
+        etag, last_modified = validators
+        response.headers.setdefault("ETag", etag)
+        response.headers.setdefault("Last-Modified", http_date(last_modified))
+        patch_cache_control(response, no_cache=True)
+    return response
+
+
+def _not_modified(request, validators):
+    etag, last_modified = validators
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        _count("not_modified")
+        patch_cache_control(response, no_cache=True)
+    return response
+
+
+def _before_view(request, tags, params):
+    """
+    Return (response, tag versions). The response is a 304 or a cache hit,
+    or None when the view has to run; versions is None when the request
+    bypasses the cache.
+    """
+    if not _cacheable_request(request):
+        _count("bypassed")
+        return None, None
+
+    if _is_conditional(request):
+        # Tag versions only; the page body isn't needed for a 304
+        _, versions = _lookup(request, tags, params, with_entry=False)
+        response = _not_modified(request, _tag_validators(versions))
+        if response is not None:
+            return response, versions
+
+    entry, versions = _lookup(request, tags, params)
+    if entry is not None:
+        _count("hits")
+        return _add_validators(_response_from_entry(request, entry), _tag_validators(versions)), versions
+
+    _count("misses")
+    return None, versions
+
+
+def _after_view(request, response, versions, params):
+    """Store the view's response and add its validators"""
+    if _cacheable_response(response):
+        cache.set(_page_key(request, params), _entry_from_response(response, versions), _timeout())
+    return _add_validators(response, _tag_validators(versions))
+
+
+def cache_page_for(*tags, params=()):
+    """
+    Cache a view's GET responses until one of tags is bumped, and answer
+    revalidations with 304. params names the query parameters that change
+    the page; any others are ignored. POSTs and requests with flash messages
+    waiting always reach the view. Async views get an async wrapper that
+    does the cache work in one thread hop either side of the view.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                response, versions = await sync_to_async(_before_view)(request, tags, params)
+                if response is not None:
+                    return response
+                response = await view(request, *args, **kwargs)
+                if versions is None:
+                    return response
+                return await sync_to_async(_after_view)(request, response, versions, params)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response, versions = _before_view(request, tags, params)
+            if response is not None:
+                return response
+            response = view(request, *args, **kwargs)
+            if versions is None:
+                return response
+            return _after_view(request, response, versions, params)
+        return wrapper
+    return decorator
+
+
+def cached_response(request, updated_at, render, params=()):
+    """
+    Return the cached response for this URL as of `updated_at` (a
+    datetime), calling render() to produce (and store) it on a miss.
+    params is as for cache_page_for().
+    """
+    if not _cacheable_request(request):
+        _count("bypassed")
+        return render()
+
+    version = updated_at.isoformat()
+    validators = _validators(version, updated_at.timestamp())
+    response = _not_modified(request, validators)
+    if response is not None:
+        return response
+
+    key = f"{_page_key(request, params)}:{version}"
+    entry = cache.get(key)
+    if entry is not None:
+        _count("hits")
+        return _add_validators(_response_from_entry(request, entry), validators)
+
+    _count("misses")
+    response = render()
+    if _cacheable_response(response):
+        cache.set(key, _entry_from_response(response, version), _timeout())
+    return _add_validators(response, validators)
+
+
+def _count(result):
+    _stats[result] += 1
+    metrics.inc(metrics.PAGE_CACHE, result=result)
+
+
+def stats():
+    """Return this process's hit/miss/304 counters"""
+    return dict(_stats)
+
+
+def reset_stats():
+    for name in _stats:
+        _stats[name] = 0
@@ -0,0 +1,146 @@
+"""
+Per-request cost accounting: database queries, template rendering and
+memory.
+
+    with profiling.profile(memory=True) as p:
+        response = client.get("/")
+    p.wall, p.query_count, p.db_time, p.template_time, p.peak_memory
+
+Queries are seen through connection.execute_wrapper(), on every database
+and whatever DEBUG is. Connections are per thread, so profile() wraps the
+calling thread's. aprofile(), for async code, also wraps those of the
+thread that runs the request's thread-sensitive sync_to_async() calls:
+under ASGI every such call in a request, the async ORM's included, runs
+in one thread, so its queries count without any change to the views.
+
+Template time is the time spent in top-level render() calls of the Django
+template backend, which is what render() and TemplateResponse use;
+included templates count towards the page that includes them. install()
+patches the backend once; with no profile active the patch costs a
+ContextVar lookup per render.
+
+Peak memory comes from tracemalloc, which slows everything it watches
+several times over, so measure it in separate runs from timings.
+"""
+import contextlib
+import functools
+import threading
+import tracemalloc
+from contextvars import ContextVar
+from time import perf_counter
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+from django.template.backends.django import Template as DjangoTemplate
+
+_active = ContextVar("booking_profile", default=None)
+_installed = False
+
+
+class Profile:
+    def __init__(self, record_sql=True):
+        self.record_sql = record_sql
+        self.wall = 0.0
+        self.db_time = 0.0
+        self.query_count = 0
+        self.queries = []  # (alias, sql, seconds)
+        self.template_time = 0.0
+        self.peak_memory = None  # bytes above the starting point
+        self.view_time = None  # set by middleware.ViewTimingMiddleware
+        self._rendering = False
+        self._threads = set()  # idents of threads whose connections are wrapped
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = perf_counter() - start
+            self.db_time += duration
+            self.query_count += 1
+            if self.record_sql:
+                self.queries.append((context["connection"].alias, sql, duration))
+
+
+@contextlib.contextmanager
+def _wrapping_queries(current):
+    """Count the queries this thread sends towards current"""
+    thread = threading.get_ident()
+    if thread in current._threads:
+        yield
+        return
+    current._threads.add(thread)
+    try:
+        with contextlib.ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(current))
+            yield
+    finally:
+        current._threads.discard(thread)
+
+
+def install():
+    """Time template rendering for active profiles (idempotent)"""
+    global _installed
+    if _installed:
+        return
+    original = DjangoTemplate.render
+
+    @functools.wraps(original)
+    def render(self, context=None, request=None):
+        current = _active.get()
+        if current is None or current._rendering:
+            return original(self, context, request)
+        current._rendering = True
+        start = perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            current.template_time += perf_counter() - start
+            current._rendering = False
+
+    DjangoTemplate.render = render
+    _installed = True
+
+
+def active():
+    """The profile collecting on this thread or task, if any"""
+    return _active.get()
+
+
+@contextlib.contextmanager
+def profile(memory=False, record_sql=True):
+    install()
+    result = Profile(record_sql=record_sql)
+    token = _active.set(result)
+
+    started_tracing = memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    if memory:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+
+    start = perf_counter()
+    try:
+        with _wrapping_queries(result):
+            yield result
+    finally:
+        result.wall = perf_counter() - start
+        if memory:
+            result.peak_memory = tracemalloc.get_traced_memory()[1] - baseline
+        if started_tracing:
+            tracemalloc.stop()
+        _active.reset(token)
+
+
+@contextlib.asynccontextmanager
+async def aprofile(memory=False, record_sql=True):
+    """profile() for async code; costs two thread hops"""
+    with profile(memory=memory, record_sql=record_sql) as result:
+        queries = _wrapping_queries(result)
+        await sync_to_async(queries.__enter__)()
+        try:
+            yield result
+        finally:
+            await sync_to_async(queries.__exit__)(None, None, None)
@@ -0,0 +1,188 @@
+"""
+Per-client rate limiting and load shedding for the lead forms.
+
+@ratelimit("quote") counts POSTs per (form, client IP) in the Django
+cache and answers 429 with Retry-After once a client is over its rate,
+before the form is parsed or the database touched. Rates come from
+RATELIMIT_RATES, e.g. {"quote": "5/m"}.
+
+The counter is a fixed window: the bucket holds `count` tokens and is
+refilled all at once when the window rolls over. That keeps the check to
+an atomic increment, where a true token bucket would need a
+read-modify-write (or a Redis script). On Redis the hit is one pipelined
+round trip, SET NX EX (create the counter with the window's expiry) then
+INCR; other backends incr() and add() the counter on the first hit of a
+window. Each window has its own key, so a counter that outlives its
+window is never read again.
+
+Each process also caps the number of form POSTs it handles at once
+(RATELIMIT_MAX_INFLIGHT); past that it sheds load with a 503. The cap
+has to sit below the worker's thread count (GUNICORN_THREADS) or it can
+never be reached.
+"""
+import ipaddress
+import logging
+import threading
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCache
+from django.http import HttpResponse
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+_inflight = None
+_inflight_lock = threading.Lock()
+
+
+def parse_rate(rate):
+    """'5/m' -> (5, 60); '20/10m' -> (20, 600)"""
+    count, period = rate.split("/")
+    multiplier = int(period[:-1] or 1)
+    return int(count), multiplier * PERIODS[period[-1]]
+
+
+def _trusted_proxies():
+    return [
+        ipaddress.ip_network(proxy, strict=False)
+        for proxy in getattr(settings, "RATELIMIT_TRUSTED_PROXIES", [])
+    ]
+
+
+def _is_trusted(ip, proxies):
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return any(address in network for network in proxies)
+
+
+def client_ip(request):
+    """
+    The address of the client that sent the request. X-Forwarded-For is
+    only believed when REMOTE_ADDR is a trusted proxy, and then read
+    right to left, skipping further trusted hops.
+    """
+    remote = request.META.get("REMOTE_ADDR", "")
+    proxies = _trusted_proxies()
+    if not proxies or not _is_trusted(remote, proxies):
+        return remote
+
+    forwarded = request.META.get("HTTP_X_FORWARDED_FOR", "")
+    for hop in reversed([h.strip() for h in forwarded.split(",") if h.strip()]):
+        if not _is_trusted(hop, proxies):
+            return hop
+    return remote
+
+
+def _hit(key, window):
+    """Increment key (expiring with the window) and return the new count"""
+    if isinstance(cache, RedisCache):
+        key = cache.make_and_validate_key(key)
+        pipe = cache._cache.get_client(key, write=True).pipeline()
+        pipe.set(key, 0, ex=window, nx=True)
+        pipe.incr(key)
+        return pipe.execute()[1]
+    try:
+        return cache.incr(key)
+    except ValueError:
+        if cache.add(key, 1, window):
+            return 1
+        return cache.incr(key)
+
+
+def check(scope, ident, rate):
+    """Count one request; return seconds to wait if over the limit, else 0"""
+    count, period = parse_rate(rate)
+    now = time.time()
+    window = int(now // period)
+    if _hit(f"rl:{scope}:{ident}:{window}", period) <= count:
+        return 0
+    return max(1, int((window + 1) * period - now))
+
+
+def _semaphore():
+    global _inflight
+
+    if _inflight is None:
+        with _inflight_lock:
+            if _inflight is None:
+                _inflight = threading.BoundedSemaphore(getattr(settings, "RATELIMIT_MAX_INFLIGHT", 4))
+    return _inflight
+
+
+def _refuse(status, retry_after, message):
+    response = HttpResponse(message, status=status, content_type="text/plain; charset=utf-8")
+    response["Retry-After"] = str(retry_after)
+    return response
+
+
+def _over_rate(scope, request):
+    """A 429 if the client has used up its rate for scope, else None"""
+    rate = getattr(settings, "RATELIMIT_RATES", {}).get(scope)
+    if rate:
+        ip = client_ip(request)
+        retry_after = check(scope, ip, rate)
+        if retry_after:
+            logger.info("Rate limited %s POST from %s", scope, ip)
+            metrics.count_submission(scope, "rate_limited")
+            return _refuse(429, retry_after, "Too many submissions. Please try again shortly.")
+    return None
+
+
+def _shed(scope):
+    metrics.count_submission(scope, "shed")
+    return _refuse(503, 1, "We're busy right now. Please try again in a moment.")
+
+
+def ratelimit(scope):
+    """
+    Rate-limit and load-shed a view's POSTs; other methods pass straight
+    through. Async views get an async wrapper, which checks the rate in
+    a thread.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if request.method != "POST" or not getattr(settings, "RATELIMIT_ENABLED", True):
+                    return await view(request, *args, **kwargs)
+
+                refusal = await sync_to_async(_over_rate)(scope, request)
+                if refusal is not None:
+                    return refusal
+
+                inflight = _semaphore()
+                if not inflight.acquire(blocking=False):
+                    return _shed(scope)
+                try:
+                    return await view(request, *args, **kwargs)
+                finally:
+                    inflight.release()
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != "POST" or not getattr(settings, "RATELIMIT_ENABLED", True):
+                return view(request, *args, **kwargs)
+
+            refusal = _over_rate(scope, request)
+            if refusal is not None:
+                return refusal
+
+            inflight = _semaphore()
+            if not inflight.acquire(blocking=False):
+                return _shed(scope)
+            try:
+                return view(request, *args, **kwargs)
+            finally:
+                inflight.release()
+        return wrapper
+    return decorator
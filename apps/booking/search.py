@@ -0,0 +1,178 @@
+"""
+Full-text search over published BlogPosts.
+
+The index lives in the database (migration 0013) and is maintained by
+the database itself, so every save, delete and bulk update is reflected
+immediately:
+
+- SQLite: an external-content FTS5 table kept in sync by triggers,
+  ranked with bm25() and excerpted with snippet().
+- PostgreSQL: a generated, weighted tsvector column with a GIN index,
+  ranked with ts_rank() and excerpted with ts_headline().
+
+Any other backend falls back to an unindexed icontains scan.
+
+On SQLite, Django alters most columns by remaking the table: it creates a
+new booking_blogpost, copies the rows across, drops the old table and
+renames the new one. Dropping the table drops its triggers, so after any
+migration that does this, saves stop reaching the index without an error.
+check_fts_triggers() is a database system check (run by migrate and by
+`manage.py check --database default`) that reports the missing triggers.
+A migration that remakes the table should recreate them.
+
+Highlights are marked with private-use sentinel characters inside the
+database, then the text is HTML-escaped and the sentinels swapped for
+<mark>, so post content can never inject markup.
+"""
+import re
+
+from django.conf import settings
+from django.core import checks
+from django.db import connection, connections
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+from django.utils.text import Truncator
+
+from .models import BlogPost
+
+MARK_START = "\ue000"
+MARK_END = "\ue001"
+ELLIPSIS = "…"
+
+TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+FTS_TABLE = "booking_blogpost_fts"
+FTS_TRIGGERS = ("booking_blogpost_fts_ai", "booking_blogpost_fts_ad", "booking_blogpost_fts_au")
+
+
+def _limit():
+    return getattr(settings, "BLOG_SEARCH_LIMIT", 20)
+
+
+def highlight(text):
+    """Escape text and turn the sentinel markers into <mark> tags"""
+    html = escape(text or "")
+    return mark_safe(html.replace(MARK_START, "<mark>").replace(MARK_END, "</mark>"))
+
+
+def _fts5_query(query):
+    """
+    Turn free text into a safe FTS5 expression: every word quoted (so
+    operators and punctuation are literal), ANDed together, with the last
+    word matched as a prefix for search-as-you-type.
+    """
+    terms = TERM_RE.findall(query)
+    if not terms:
+        return ""
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def _search_sqlite(query, limit):
+    match = _fts5_query(query)
+    if not match:
+        return []
+    return list(BlogPost.objects.raw(
+        """
+        SELECT p.id, p.title, p.slug, p.created_at,
+               bm25(booking_blogpost_fts, 10.0, 4.0, 1.0) AS rank,
+               highlight(booking_blogpost_fts, 0, %s, %s) AS title_highlight,
+               snippet(booking_blogpost_fts, -1, %s, %s, %s, 24) AS snippet
+        FROM booking_blogpost_fts
+        JOIN booking_blogpost p ON p.id = booking_blogpost_fts.rowid
+        WHERE booking_blogpost_fts MATCH %s AND p.published
+        ORDER BY rank
+        LIMIT %s
+        """,
+        [MARK_START, MARK_END, MARK_START, MARK_END, ELLIPSIS, match, limit],
+    ))
+
+
+def _search_postgresql(query, limit):
+    if not TERM_RE.search(query):
+        return []
+    options = (
+        f"StartSel={MARK_START}, StopSel={MARK_END}, MaxWords=30, MinWords=12, "
+        f"MaxFragments=2, FragmentDelimiter={ELLIPSIS}"
+    )
+    # Rank and limit first; ts_headline re-parses the document, so only
+    # run it for the rows actually shown.
+    return list(BlogPost.objects.raw(
+        """
+        SELECT id, title, slug, created_at, rank,
+               ts_headline('english', title, q, %s) AS title_highlight,
+               ts_headline('english', coalesce(excerpt, '') || ' ' || content, q, %s) AS snippet
+        FROM (
+            SELECT p.id, p.title, p.slug, p.excerpt, p.content, p.created_at, q,
+                   ts_rank(p.search_vector, q) AS rank
+            FROM booking_blogpost p, websearch_to_tsquery('english', %s) q
+            WHERE p.published AND p.search_vector @@ q
+            ORDER BY rank DESC, p.created_at DESC
+            LIMIT %s
+        ) hits
+        ORDER BY rank DESC, created_at DESC
+        """,
+        [f"{options}, HighlightAll=true", options, query, limit],
+    ))
+
+
+def _search_fallback(query, limit):
+    terms = TERM_RE.findall(query)
+    if not terms:
+        return []
+    condition = Q()
+    for term in terms:
+        condition &= Q(title__icontains=term) | Q(excerpt__icontains=term) | Q(content__icontains=term)
+    posts = list(BlogPost.objects.filter(condition, published=True).order_by("-created_at")[:limit])
+    for post in posts:
+        post.title_highlight = post.title
+        post.snippet = Truncator(post.excerpt or post.content).words(30)
+    return posts
+
+
+BACKENDS = {
+    "sqlite": _search_sqlite,
+    "postgresql": _search_postgresql,
+}
+
+
+def search(query, limit=None):
+    """
+    Return up to `limit` published posts matching query, best first. Each
+    carries safe `title_html` and `snippet_html` with matches in <mark>.
+    """
+    query = (query or "").strip()
+    if not query:
+        return []
+    backend = BACKENDS.get(connection.vendor, _search_fallback)
+    results = backend(query, limit or _limit())
+    for post in results:
+        post.title_html = highlight(post.title_highlight)
+        post.snippet_html = highlight(post.snippet)
+    return results
+
+
+@checks.register(checks.Tags.database)
+def check_fts_triggers(app_configs=None, databases=None, **kwargs):
+    """Error for each SQLite database whose FTS5 index has lost its triggers"""
+    errors = []
+    for alias in databases or []:
+        db = connections[alias]
+        if db.vendor != "sqlite":
+            continue
+        with db.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+            found = {name for (name,) in cursor.fetchall()}
+        missing = [name for name in FTS_TRIGGERS if name not in found]
+        if FTS_TABLE in found and missing:
+            errors.append(checks.Error(
+                f"Blog search triggers missing from database '{alias}': {', '.join(missing)}",
+                hint=(
+                    "A migration remade booking_blogpost and dropped them. Migrate booking back "
+                    "to 0012 and forward again to rebuild the index and its triggers."
+                ),
+                id="booking.E001",
+            ))
+    return errors
@@ -0,0 +1,131 @@
+"""
+Two-level cache for SEOSettings lookups.
+
+L1 is a dict local to the process, L2 is the shared Django cache. Every
+entry is stamped with a global version number that lives in the shared
+cache; saving or deleting any SEOSettings row bumps it (see signals.py),
+which orphans the old entries in every worker at once.
+
+Workers re-read the version at most once every SEO_CACHE_L1_TTL seconds,
+so a page view normally costs no database query and no cache round-trip.
+aget() and aset() are the same for async views; aget() answers L1 hits
+without leaving the event loop.
+"""
+import time
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import metrics
+
+VERSION_KEY = "seo:version"
+
+_local = {}
+_version = None
+_version_checked_at = 0.0
+
+_stats = {"l1_hits": 0, "l2_hits": 0, "misses": 0}
+
+
+def _l1_ttl():
+    return getattr(settings, "SEO_CACHE_L1_TTL", 5)
+
+
+def _timeout():
+    return getattr(settings, "SEO_CACHE_TIMEOUT", 60 * 60 * 24)
+
+
+def _key(version, page_name):
+    return f"seo:{version}:{page_name}"
+
+
+def _current_version():
+    """Return the shared version, re-reading it once per L1 TTL"""
+    global _version, _version_checked_at
+
+    now = time.monotonic()
+    if _version is None or now - _version_checked_at >= _l1_ttl():
+        # Seed with a timestamp so an evicted counter never restarts at a
+        # value that older L2 entries were stored under.
+        version = cache.get_or_set(VERSION_KEY, int(time.time() * 1000), None)
+        if version != _version:
+            _local.clear()
+        _version = version
+        _version_checked_at = now
+    return _version
+
+
+def get(page_name):
+    """Return the cached SEOSettings for page_name, or None on a miss"""
+    version = _current_version()
+
+    entry = _local.get(page_name)
+    if entry is not None and entry[0] == version:
+        _count("l1_hits")
+        return entry[1]
+
+    seo = cache.get(_key(version, page_name))
+    if seo is not None:
+        _count("l2_hits")
+        _local[page_name] = (version, seo)
+        return seo
+
+    _count("misses")
+    return None
+
+
+async def aget(page_name):
+    """get() for async views"""
+    entry = _local.get(page_name)
+    if (
+        entry is not None
+        and entry[0] == _version
+        and time.monotonic() - _version_checked_at < _l1_ttl()
+    ):
+        _count("l1_hits")
+        return entry[1]
+    return await sync_to_async(get)(page_name)
+
+
+def set(page_name, seo):
+    """Store seo in both levels under the current version"""
+    version = _current_version()
+    cache.set(_key(version, page_name), seo, _timeout())
+    _local[page_name] = (version, seo)
+
+
+async def aset(page_name, seo):
+    """set() for async views"""
+    await sync_to_async(set)(page_name, seo)
+
+
+def invalidate():
+    """Drop every cached SEOSettings in all workers"""
+    global _version, _version_checked_at
+
+    try:
+        version = cache.incr(VERSION_KEY)
+    except ValueError:
+        version = int(time.time() * 1000)
+        cache.set(VERSION_KEY, version, None)
+
+    _local.clear()
+    _version = version
+    _version_checked_at = time.monotonic()
+
+
+def _count(result):
+    _stats[result] += 1
+    metrics.inc(metrics.SEO_CACHE, result=result)
+
+
+def stats():
+    """Return this process's hit/miss counters"""
+    return dict(_stats)
+
+
+def reset_stats():
+    for name in _stats:
+        _stats[name] = 0
@@ -0,0 +1,71 @@
+"""
+Compile an SEOSettings row into its <head> meta block.
+
+The block is rendered once when the row is saved. The values that
+change per request (the page URL and the site root) or per deploy (the
+hashed URLs of the default share images) are left as placeholders and
+filled in by the {% seo_head %} tag. JSON-LD comes precompiled from
+structured_data.
+
+A template change still needs every block rebuilt; `manage.py
+compile_seo_heads` does that, and is part of `make release`.
+"""
+import hashlib
+import logging
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import ValidationError
+from django.template.loader import render_to_string
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from . import structured_data
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE = "partials/seo_head.html"
+
+REQUEST_URL = "__seo_request_url__"
+SITE_ROOT = "__seo_site_root__"
+
+# Placeholder -> static path, resolved through the manifest when served
+STATIC_URLS = {
+    "__seo_default_og_image__": "images/og-default.jpg",
+    "__seo_default_twitter_image__": "images/twitter-default.jpg",
+}
+
+
+def _schema_json(seo):
+    if seo is None:
+        return mark_safe(structured_data.default_json(SITE_ROOT))
+    try:
+        # schema_compiled, or the row's own schema_json compiled now
+        return mark_safe(seo.get_default_schema())
+    except ValidationError as e:
+        logger.warning("Invalid schema_json on SEO page %s; serving the default: %s", seo.page_name, e)
+        return mark_safe(structured_data.default_json(SITE_ROOT))
+
+
+def build(seo):
+    """Return (html, sha256 hex digest) for seo with placeholders left in"""
+    html = render_to_string(TEMPLATE, {
+        "seo": seo,
+        "request_url": REQUEST_URL,
+        "site_root": SITE_ROOT,
+        "schema_json": _schema_json(seo),
+        "default_og_image": "__seo_default_og_image__",
+        "default_twitter_image": "__seo_default_twitter_image__",
+    })
+    return html, hashlib.sha256(html.encode()).hexdigest()
+
+
+def render(seo, request):
+    """Return the head block for seo, using the precompiled copy if any"""
+    html = getattr(seo, "head_html", "")
+    if not html:
+        html, _ = build(seo)
+
+    html = html.replace(REQUEST_URL, escape(request.build_absolute_uri()))
+    for placeholder, path in STATIC_URLS.items():
+        html = html.replace(placeholder, escape(staticfiles_storage.url(path)))
+    return mark_safe(html.replace(SITE_ROOT, escape(f"{request.scheme}://{request.get_host()}")))
@@ -0,0 +1,192 @@
+"""
+Declarative sync of SEOSettings from a JSON or YAML file.
+
+The file holds a list of page definitions keyed by page_name (see
+data/seo_pages.json). plan() compares them with the database in one
+query and apply() writes the result with one bulk_create and one
+bulk_update inside a transaction, however many pages there are.
+
+Fields a definition leaves out are not touched on existing pages.
+Bulk writes skip save() and signals, so apply() compiles each page's
+schema and head block itself and invalidates the SEO and page caches.
+
+recompile() rebuilds every page's compiled fields in place, for deploys
+that change the head template (see the compile_seo_heads command).
+"""
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+
+from . import page_cache, seo_cache
+from .models import SEOSettings
+
+try:
+    import yaml
+except ImportError:  # YAML support is optional
+    yaml = None
+
+DEFAULT_PATH = Path(__file__).resolve().parent / "data" / "seo_pages.json"
+
+COMPILED_FIELDS = ["schema_compiled", "head_html", "head_hash"]
+
+BATCH_SIZE = 500
+
+
+class SyncError(Exception):
+    pass
+
+
+def syncable_fields():
+    """Editable, non-file fields a definition may set"""
+    return {
+        f.name for f in SEOSettings._meta.concrete_fields
+        if f.editable and not f.primary_key and not isinstance(f, models.FileField)
+    }
+
+
+def load(path):
+    """Read a list of page definitions from a .json, .yaml or .yml file"""
+    path = Path(path)
+    with open(path, encoding="utf-8") as f:
+        if path.suffix in (".yaml", ".yml"):
+            if yaml is None:
+                raise SyncError("Install PyYAML to read YAML files")
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+
+    if isinstance(data, dict) and "pages" in data:
+        data = data["pages"]
+    if not isinstance(data, list):
+        raise SyncError(f"{path}: expected a list of page definitions")
+    return data
+
+
+def _normalise(definitions):
+    allowed = syncable_fields()
+    pages = {}
+    for index, definition in enumerate(definitions):
+        name = definition.get("page_name") if isinstance(definition, dict) else None
+        if not name:
+            raise SyncError(f"Definition #{index + 1} has no page_name")
+        if name in pages:
+            raise SyncError(f'Duplicate page_name "{name}"')
+        unknown = set(definition) - allowed
+        if unknown:
+            raise SyncError(f'"{name}": unknown field(s) {", ".join(sorted(unknown))}')
+
+        definition = dict(definition)
+        if isinstance(definition.get("schema_json"), (dict, list)):
+            definition["schema_json"] = json.dumps(definition["schema_json"], ensure_ascii=False)
+        pages[name] = definition
+    return pages
+
+
+@dataclass
+class Plan:
+    create: list = field(default_factory=list)
+    update: list = field(default_factory=list)  # (instance, {field: (old, new)})
+    delete: list = field(default_factory=list)
+    unchanged: int = 0
+
+    @property
+    def has_changes(self):
+        return bool(self.create or self.update or self.delete)
+
+
+def _validate(instance):
+    try:
+        instance.full_clean(exclude=["og_image", "twitter_image"], validate_unique=False)
+    except ValidationError as e:
+        errors = "; ".join(f"{k}: {' '.join(v)}" for k, v in e.message_dict.items())
+        raise SyncError(f'"{instance.page_name}": {errors}')
+
+
+def plan(definitions, delete_missing=False):
+    """Diff definitions against the database (one query) and validate them"""
+    pages = _normalise(definitions)
+    existing = SEOSettings.objects.in_bulk(
+        None if delete_missing else list(pages), field_name="page_name"
+    )
+
+    result = Plan()
+    for name, values in pages.items():
+        instance = existing.get(name)
+        if instance is None:
+            instance = SEOSettings(**values)
+            _validate(instance)
+            result.create.append(instance)
+            continue
+
+        changes = {}
+        for key, new in values.items():
+            old = getattr(instance, key)
+            if old != new:
+                changes[key] = (old, new)
+                setattr(instance, key, new)
+        if changes:
+            _validate(instance)
+            result.update.append((instance, changes))
+        else:
+            result.unchanged += 1
+
+    if delete_missing:
+        result.delete = [instance for name, instance in existing.items() if name not in pages]
+    return result
+
+
+@transaction.atomic
+def apply(result):
+    """Write a Plan in bulk and invalidate the affected caches on commit"""
+    for instance in result.create:
+        instance.compile_schema()
+        instance.compile_head()
+    SEOSettings.objects.bulk_create(result.create, batch_size=BATCH_SIZE)
+
+    if result.update:
+        fields = set(COMPILED_FIELDS)
+        for instance, changes in result.update:
+            instance.compile_schema()
+            instance.compile_head()
+            fields.update(changes)
+        SEOSettings.objects.bulk_update(
+            [instance for instance, _ in result.update], sorted(fields), batch_size=BATCH_SIZE
+        )
+
+    if result.delete:
+        SEOSettings.objects.filter(pk__in=[instance.pk for instance in result.delete]).delete()
+
+    touched = [i.page_name for i in result.create + result.delete] + [i.page_name for i, _ in result.update]
+    if touched:
+        _invalidate_on_commit(touched)
+
+
+def _invalidate_on_commit(names):
+    def invalidate():
+        seo_cache.invalidate()
+        page_cache.bump(*(f"seo:{name}" for name in names))
+
+    transaction.on_commit(invalidate)
+
+
+@transaction.atomic
+def recompile():
+    """Recompile every page's schema and head block; return the pages that changed"""
+    changed = []
+    for instance in SEOSettings.objects.all():
+        before = (instance.schema_compiled, instance.head_hash)
+        try:
+            instance.compile_schema()
+        except ValidationError:
+            instance.schema_compiled = ""  # seo_head serves the default schema and says why
+        instance.compile_head()
+        if (instance.schema_compiled, instance.head_hash) != before:
+            changed.append(instance)
+
+    SEOSettings.objects.bulk_update(changed, COMPILED_FIELDS, batch_size=BATCH_SIZE)
+    if changed:
+        _invalidate_on_commit([instance.page_name for instance in changed])
+    return changed
@@ -0,0 +1,27 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import page_cache, seo_cache, sitemap_files
+from .models import BlogPost, SEOSettings, TeamMember
+
+
+@receiver(post_save, sender=SEOSettings)
+@receiver(post_delete, sender=SEOSettings)
+def invalidate_seo_cache(sender, instance, **kwargs):
+    """Drop cached SEO lookups and pages whenever a page's settings change"""
+    seo_cache.invalidate()
+    page_cache.bump(f"seo:{instance.page_name}")
+
+
+@receiver(post_save, sender=TeamMember)
+@receiver(post_delete, sender=TeamMember)
+def invalidate_team_pages(sender, **kwargs):
+    page_cache.bump("team")
+
+
+@receiver(post_save, sender=BlogPost)
+@receiver(post_delete, sender=BlogPost)
+def invalidate_blog_pages(sender, **kwargs):
+    page_cache.bump("blog")
+    transaction.on_commit(sitemap_files.schedule_rebuild)
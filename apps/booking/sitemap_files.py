@@ -0,0 +1,247 @@
+"""
+Pre-generated sitemap files.
+
+build() renders every section in SECTIONS to SITEMAP_ROOT as numbered
+part files of at most 50,000 URLs (plus .gz copies) and writes a
+sitemap index pointing at them. Part file names carry a content hash, so
+they can be cached for a year; only the index is revalidated.
+
+Clients and caches may hold the previous index for up to INDEX_MAX_AGE.
+So the parts a rebuild replaces are not deleted straight away. They are
+listed as retired in the manifest, and a later build deletes them once
+they have been out of the index for that long.
+
+Items are streamed from the database and written as they arrive, so
+memory use does not grow with the number of URLs. Each section has a
+fingerprint (see config/settings/sitemap.py); a section is only
+rewritten when its fingerprint changes, so calling build() after every
+BlogPost save is cheap.
+"""
+import fcntl
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models.query import QuerySet
+
+from config.settings.sitemap import StaticViewSitemap, BlogSitemap
+
+logger = logging.getLogger(__name__)
+
+SECTIONS = {
+    "static": StaticViewSitemap,
+    "blog": BlogSitemap,
+}
+
+MAX_URLS_PER_FILE = 50_000
+INDEX_NAME = "sitemap.xml"
+MANIFEST_NAME = "manifest.json"
+INDEX_MAX_AGE = 60 * 60  # seconds the index may be cached for
+PART_NAME = re.compile(r"[a-z]+-\d+-[0-9a-f]{12}\.xml")
+
+_XML_HEAD = '<?xml version="1.0" encoding="UTF-8"?>\n'
+_URLSET_OPEN = '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+_URLSET_CLOSE = "</urlset>\n"
+
+_rebuild_lock = threading.Lock()
+_rebuild_again = threading.Event()
+
+
+def root():
+    return Path(getattr(settings, "SITEMAP_ROOT", Path(settings.BASE_DIR) / "var" / "sitemaps"))
+
+
+def _site_url():
+    return settings.SITE_URL.rstrip("/")
+
+
+def _get(sitemap, name, item):
+    attr = getattr(sitemap, name, None)
+    return attr(item) if callable(attr) else attr
+
+
+def _iter_items(sitemap):
+    items = sitemap.items()
+    if isinstance(items, QuerySet):
+        return items.iterator(chunk_size=2000)
+    return iter(items)
+
+
+def _url_entry(sitemap, item):
+    parts = [f"<url><loc>{escape(_site_url() + _get(sitemap, 'location', item))}</loc>"]
+    lastmod = _get(sitemap, "lastmod", item)
+    if lastmod is not None:
+        parts.append(f"<lastmod>{lastmod.date().isoformat() if hasattr(lastmod, 'date') else lastmod}</lastmod>")
+    changefreq = _get(sitemap, "changefreq", item)
+    if changefreq:
+        parts.append(f"<changefreq>{changefreq}</changefreq>")
+    priority = _get(sitemap, "priority", item)
+    if priority is not None:
+        parts.append(f"<priority>{priority:.1f}</priority>")
+    parts.append("</url>\n")
+    return "".join(parts)
+
+
+class _PartWriter:
+    """Writes <url> entries into numbered, content-hashed part files"""
+
+    def __init__(self, directory, section, limit):
+        self.directory = directory
+        self.section = section
+        self.limit = limit
+        self.files = []
+        self._handle = None
+
+    def _open(self):
+        fd, self._tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        self._handle = os.fdopen(fd, "w", encoding="utf-8")
+        self._digest = hashlib.sha256()
+        self._count = 0
+        self._write(_XML_HEAD + _URLSET_OPEN)
+
+    def _write(self, text):
+        self._handle.write(text)
+        self._digest.update(text.encode())
+
+    def add(self, entry):
+        if self._handle is None:
+            self._open()
+        self._write(entry)
+        self._count += 1
+        if self._count >= self.limit:
+            self._close()
+
+    def _close(self):
+        self._write(_URLSET_CLOSE)
+        self._handle.close()
+        self._handle = None
+
+        name = f"{self.section}-{len(self.files) + 1}-{self._digest.hexdigest()[:12]}.xml"
+        path = self.directory / name
+        os.replace(self._tmp, path)
+        with open(path, "rb") as src, gzip.open(f"{path}.gz", "wb", compresslevel=9) as dst:
+            shutil.copyfileobj(src, dst)
+        self.files.append(name)
+
+    def finish(self):
+        if self._handle is not None:
+            self._close()
+        return self.files
+
+
+def _write_section(directory, name, sitemap):
+    limit = min(getattr(sitemap, "limit", MAX_URLS_PER_FILE), MAX_URLS_PER_FILE)
+    writer = _PartWriter(directory, name, limit)
+    for item in _iter_items(sitemap):
+        writer.add(_url_entry(sitemap, item))
+    return writer.finish()
+
+
+def _write_index(directory, manifest):
+    lines = [_XML_HEAD, '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n']
+    for section in manifest["sections"].values():
+        for name in section["files"]:
+            lines.append(f"<sitemap><loc>{escape(_site_url())}/sitemaps/{name}</loc></sitemap>\n")
+    lines.append("</sitemapindex>\n")
+
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.writelines(lines)
+    os.replace(tmp, directory / INDEX_NAME)
+    with open(directory / INDEX_NAME, "rb") as src, gzip.open(directory / f"{INDEX_NAME}.gz", "wb") as dst:
+        shutil.copyfileobj(src, dst)
+
+
+def _load_manifest(directory):
+    try:
+        with open(directory / MANIFEST_NAME) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"sections": {}, "retired": {}}
+
+
+def build(force=False):
+    """Regenerate changed sections and the index; return the rewritten section names"""
+    directory = root()
+    directory.mkdir(parents=True, exist_ok=True)
+
+    with open(directory / ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+
+        manifest = _load_manifest(directory)
+        retired = manifest.setdefault("retired", {})  # part name -> time it left the index
+        rebuilt = []
+        stale_files = []
+
+        for name, sitemap_class in SECTIONS.items():
+            sitemap = sitemap_class()
+            fingerprint = sitemap.fingerprint()
+            current = manifest["sections"].get(name)
+            up_to_date = (
+                current
+                and current["fingerprint"] == fingerprint
+                and all((directory / f).exists() for f in current["files"])
+            )
+            if up_to_date and not force:
+                continue
+
+            files = _write_section(directory, name, sitemap)
+            if current:
+                stale_files += [f for f in current["files"] if f not in files]
+            manifest["sections"][name] = {"fingerprint": fingerprint, "files": files}
+            rebuilt.append(name)
+
+        now = time.time()
+        for name in stale_files:
+            retired[name] = now
+        live = {f for section in manifest["sections"].values() for f in section["files"]}
+        expired = [n for n, since in retired.items() if n in live or now - since >= INDEX_MAX_AGE]
+
+        for name in expired:
+            del retired[name]
+        if rebuilt or not (directory / INDEX_NAME).exists():
+            manifest["sections"] = {n: manifest["sections"][n] for n in SECTIONS if n in manifest["sections"]}
+            _write_index(directory, manifest)
+        if rebuilt or expired or not (directory / MANIFEST_NAME).exists():
+            with open(directory / MANIFEST_NAME, "w") as f:
+                json.dump(manifest, f)
+
+        # Only once the manifest no longer lists them
+        for name in expired:
+            if name not in live:
+                for path in (directory / name, directory / f"{name}.gz"):
+                    path.unlink(missing_ok=True)
+
+    return rebuilt
+
+
+def _rebuild_in_background():
+    while True:
+        _rebuild_again.clear()
+        try:
+            build()
+        except Exception:
+            logger.exception("Sitemap rebuild failed")
+        finally:
+            close_old_connections()
+        if not _rebuild_again.is_set():
+            break
+    _rebuild_lock.release()
+
+
+def schedule_rebuild():
+    """Rebuild off the request thread; saves arriving mid-build trigger one more pass"""
+    _rebuild_again.set()
+    if _rebuild_lock.acquire(blocking=False):
+        threading.Thread(target=_rebuild_in_background, name="sitemap-build", daemon=True).start()
@@ -0,0 +1,145 @@
+"""
+AVIF/WebP variants of the theme's raster images.
+
+At collectstatic (see storage.py) every JPEG and PNG under
+STATIC_IMAGE_DIRS is encoded as AVIF and WebP at each width in
+STATIC_IMAGE_WIDTHS narrower than the original, and at its own width
+unless that is wider than them all (never upscaling, as in images.py):
+
+    demos/movers/images/section/1.jpg -> demos/movers/images/section/1-640.avif, 1-640.webp, ...
+
+A full-width variant that comes out bigger than the original is dropped,
+which happens for tiny PNGs such as the flags. What was produced is saved
+in staticfiles.json under "images", next to the original's intrinsic size,
+in the same shape as the upload renditions in images.py:
+
+    {"demos/movers/images/section/1.jpg": {"width": 1600, "height": 1069,
+        "avif": [[320, 214, "demos/movers/images/section/1-320.avif"], ...],
+        "webp": [...]}}
+
+{% picture %} (image_tags) reads it. Encoding, AVIF especially, is slow,
+so encoded variants are kept in STATIC_IMAGE_CACHE under the hash of the
+source bytes and encoder settings; unchanged images are not re-encoded on
+the next deploy.
+"""
+import hashlib
+import io
+import logging
+import posixpath
+from pathlib import Path
+
+from django.conf import settings
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    "avif": ("AVIF", {"quality": 55, "speed": 6}),
+    "webp": ("WEBP", {"quality": 80, "method": 6}),
+}
+EXTENSIONS = (".jpg", ".jpeg", ".png")
+ORIENTATION = 0x0112  # EXIF tag; values 5-8 mean the image is stored on its side
+ROTATED = {5, 6, 7, 8}
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _cache_dir():
+    return Path(_setting("STATIC_IMAGE_CACHE", Path(settings.BASE_DIR) / "var" / "static-images"))
+
+
+def is_source(name):
+    """A raster image this stage makes variants of (and not one of its outputs)"""
+    directories = tuple(d.rstrip("/") + "/" for d in _setting("STATIC_IMAGE_DIRS", ()))
+    return name.lower().endswith(EXTENSIONS) and name.startswith(directories)
+
+
+def _formats():
+    available = {key: value for key, value in FORMATS.items() if features.check(key)}
+    for key in FORMATS.keys() - available.keys():
+        logger.warning("Pillow was built without %s support; skipping those variants", key.upper())
+    return available
+
+
+def _open(data):
+    image = ImageOps.exif_transpose(Image.open(io.BytesIO(data)))
+    if image.mode == "P":
+        image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+    elif image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+    return image
+
+
+class _Encoder:
+    """Encodes one source image, reusing cached output keyed by content hash"""
+
+    def __init__(self, data):
+        self.data = data
+        self.digest = hashlib.sha256(data).hexdigest()
+        self._image = None
+
+    @property
+    def image(self):
+        if self._image is None:
+            self._image = _open(self.data)
+        return self._image
+
+    def encode(self, key, width, height):
+        pil_format, options = FORMATS[key]
+        fingerprint = hashlib.sha256(f"{self.digest}{sorted(options.items())}".encode()).hexdigest()[:24]
+        cached = _cache_dir() / fingerprint[:2] / f"{fingerprint}-{width}.{key}"
+        if cached.exists():
+            return cached.read_bytes()
+
+        image = self.image
+        if width != image.width:
+            image = image.resize((width, height), Image.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, pil_format, **options)
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        cached.write_bytes(buffer.getvalue())
+        return buffer.getvalue()
+
+
+def build(names, read_bytes):
+    """
+    Return ({variant name: bytes}, {source name: description}) for the
+    sources among names. read_bytes(name) returns a collected file's bytes.
+    """
+    formats = _formats()
+    widths = _setting("STATIC_IMAGE_WIDTHS", (320, 640, 1024, 1600))
+    files, info = {}, {}
+
+    for name in sorted(n for n in names if is_source(n)):
+        data = read_bytes(name)
+        if data is None:
+            continue
+        try:
+            with Image.open(io.BytesIO(data)) as probe:
+                width, height = probe.size
+                if probe.getexif().get(ORIENTATION) in ROTATED:
+                    width, height = height, width
+        except (OSError, ValueError):
+            logger.warning("Could not read %s; no variants made", name)
+            continue
+
+        encoder = _Encoder(data)
+        stem = posixpath.splitext(name)[0]
+        entry = {"width": width, "height": height}
+        for key in formats:
+            variants = []
+            for w in [w for w in widths if w < width] + ([width] if width <= max(widths) else []):
+                h = round(height * w / width)
+                content = encoder.encode(key, w, h)
+                if w == width and len(content) >= len(data):
+                    continue  # no smaller than what it would replace
+                variant = f"{stem}-{w}.{key}"
+                files[variant] = content
+                variants.append([w, h, variant])
+            if variants:
+                entry[key] = variants
+        info[name] = entry
+
+    return files, info
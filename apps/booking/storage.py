@@ -0,0 +1,106 @@
+"""
+Static files storage for production.
+
+On top of WhiteNoise's hashed, compressed manifest storage, post_process
+first writes into the static root the AVIF/WebP image variants from
+booking/static_images.py, the subset icon fonts from booking/fonts.py and
+the CSS/JS bundles from booking/assets.py, so they are hashed (including
+the url()s inside them), compressed and listed in staticfiles.json like
+the files they were built from. The manifest also carries the image
+variants and sizes, as image_info.
+
+The theme's stylesheets refer to a handful of images that were never
+shipped. Those references are left as they are, with a warning, rather
+than failing the whole collectstatic run.
+"""
+import json
+import logging
+from urllib.parse import unquote, urlsplit
+
+from django.core.files.base import ContentFile
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+from booking import assets, fonts, static_images
+
+logger = logging.getLogger(__name__)
+
+
+class BundlingStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    manifest_strict = False
+
+    def __init__(self, *args, **kwargs):
+        self.image_info = {}
+        super().__init__(*args, **kwargs)
+        self._missing = set()
+
+    def load_manifest(self):
+        hashed_files, manifest_hash = super().load_manifest()
+        if hashed_files:
+            self.image_info = json.loads(self.read_manifest()).get("images", {})
+        return hashed_files, manifest_hash
+
+    def save_manifest(self):
+        self.manifest_hash = self.file_hash(
+            None, ContentFile(json.dumps(sorted(self.hashed_files.items())).encode())
+        )
+        payload = {
+            "paths": self.hashed_files,
+            "images": self.image_info,
+            "version": self.manifest_version,
+            "hash": self.manifest_hash,
+        }
+        if self.manifest_storage.exists(self.manifest_name):
+            self.manifest_storage.delete(self.manifest_name)
+        self.manifest_storage._save(self.manifest_name, ContentFile(json.dumps(payload).encode()))
+
+    def _read_bytes(self, name):
+        if not self.exists(name):
+            logger.warning("Static file %s is missing; left out of the build", name)
+            return None
+        with self.open(name) as f:
+            return f.read()
+
+    def _read(self, name):
+        content = self._read_bytes(name)
+        return content.decode("utf-8", errors="replace") if content is not None else None
+
+    def _write(self, paths, name, content):
+        if self.exists(name):
+            self.delete(name)
+        self.save(name, ContentFile(content))
+        paths[name] = (self, name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            images, self.image_info = static_images.build(list(paths), self._read_bytes)
+            for name, content in images.items():
+                self._write(paths, name, content)
+            for name, content in fonts.subset_icons(self._read, self._read_bytes).items():
+                self._write(paths, name, content)
+            for name, content in assets.build(self._read).items():
+                self._write(paths, name, content.encode("utf-8"))
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+
+    def hashed_name(self, name, content=None, filename=None):
+        try:
+            return super().hashed_name(name, content, filename)
+        except ValueError:
+            if content is not None:
+                raise
+            if name not in self._missing:
+                self._missing.add(name)
+                logger.warning("Static file %s is referenced but missing; not hashed", name)
+            return name
+
+    def stored_name(self, name):
+        # Names the manifest doesn't know (there is none before the first
+        # collectstatic, and missing files never get in) are served as they
+        # are, rather than hashed from disk on every {% static %}.
+        path = urlsplit(unquote(name)).path.strip()
+        if self.hash_key(self.clean_name(path)) not in self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def has_bundle(self, name):
+        """True if the last collectstatic produced `name`"""
+        return self.hash_key(self.clean_name(name)) in self.hashed_files
@@ -0,0 +1,124 @@
+"""
+JSON-LD structured data for SEOSettings.
+
+schema_json is parsed and validated when an admin saves it, merged with
+the MovingCompany defaults below, and stored minified in
+SEOSettings.schema_compiled, ready to be dropped into a <script> tag.
+"""
+import json
+from functools import lru_cache
+
+from django.core.exceptions import ValidationError
+
+DEFAULT_SCHEMA = {
+    "@context": "https://schema.org",
+    "@type": "MovingCompany",
+    "name": "Expert Gati Packers and Movers",
+    "description": "Professional packers and movers service in Pune, Mumbai and across India",
+    "telephone": "+91-8199073923",
+    "priceRange": "$$",
+    "address": {
+        "@type": "PostalAddress",
+        "streetAddress": "Your Street Address",
+        "addressLocality": "Pune",
+        "addressRegion": "Maharashtra",
+        "postalCode": "411001",
+        "addressCountry": "IN"
+    },
+    "geo": {
+        "@type": "GeoCoordinates",
+        "latitude": "18.5204",
+        "longitude": "73.8567"
+    },
+    "areaServed": [
+        {"@type": "City", "name": "Pune", "sameAs": "https://en.wikipedia.org/wiki/Pune"},
+        {"@type": "City", "name": "Mumbai", "sameAs": "https://en.wikipedia.org/wiki/Mumbai"},
+        {"@type": "State", "name": "Maharashtra"},
+        {"@type": "Country", "name": "India"}
+    ],
+    "serviceType": [
+        "Home Relocation",
+        "Office Relocation",
+        "Packing Services",
+        "Loading and Unloading",
+        "Car Transportation",
+        "Storage Services",
+        "Interstate Moving",
+        "Local Shifting"
+    ],
+    "aggregateRating": {
+        "@type": "AggregateRating",
+        "ratingValue": "4.8",
+        "bestRating": "5",
+        "worstRating": "1",
+        "reviewCount": "500"
+    },
+    "openingHoursSpecification": {
+        "@type": "OpeningHoursSpecification",
+        "dayOfWeek": [
+            "Monday", "Tuesday", "Wednesday", "Thursday",
+            "Friday", "Saturday", "Sunday"
+        ],
+        "opens": "08:00",
+        "closes": "20:00"
+    }
+}
+
+# Keep "</script>" and friends from ever closing the tag early
+_SCRIPT_ESCAPES = {ord("<"): "\\u003C", ord(">"): "\\u003E", ord("&"): "\\u0026"}
+
+
+def parse(text):
+    """Parse schema_json into a list of JSON-LD nodes, or raise ValidationError"""
+    try:
+        data = json.loads(text)
+    except ValueError as e:
+        raise ValidationError(f"Invalid JSON: {e}")
+
+    nodes = data if isinstance(data, list) else [data]
+    if not nodes:
+        raise ValidationError("Schema must contain at least one object.")
+    for node in nodes:
+        if not isinstance(node, dict):
+            raise ValidationError("Schema must be a JSON object or a list of objects.")
+        if "@type" not in node:
+            raise ValidationError('Every schema object needs an "@type".')
+    return nodes
+
+
+def defaults(site_root):
+    data = dict(DEFAULT_SCHEMA)
+    data["url"] = site_root
+    return data
+
+
+def merge(nodes, site_root):
+    """
+    Merge custom nodes into the defaults: a node of the default @type
+    overrides the default keys, anything else is emitted alongside it.
+    """
+    base = defaults(site_root)
+    extra = []
+    for node in nodes:
+        if node["@type"] == base["@type"]:
+            base.update(node)
+        else:
+            extra.append({"@context": base["@context"], **node})
+    return [base, *extra] if extra else base
+
+
+def minify(data):
+    text = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return text.translate(_SCRIPT_ESCAPES)
+
+
+def build(text, site_root):
+    """Return the minified JSON-LD for schema_json (blank means defaults)"""
+    if not text or not text.strip():
+        return default_json(site_root)
+    return minify(merge(parse(text), site_root))
+
+
+@lru_cache(maxsize=None)
+def default_json(site_root):
+    return minify(defaults(site_root))
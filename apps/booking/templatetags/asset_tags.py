@@ -0,0 +1,94 @@
+from pathlib import PurePosixPath
+
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+from .. import assets, fonts
+
+register = template.Library()
+
+_inlined = {}  # hashed name -> inlined CSS; the name changes whenever the content does
+
+
+def _bundled(name):
+    has_bundle = getattr(staticfiles_storage, "has_bundle", None)
+    return not settings.DEBUG and has_bundle is not None and has_bundle(name)
+
+
+def _available(name):
+    """Built by collectstatic, or (with DEBUG) present in a static dir"""
+    return _bundled(name) or (settings.DEBUG and finders.find(name) is not None)
+
+
+def _read_css(path, name):
+    with open(path, encoding="utf-8") as f:
+        css = assets.absolute_urls(f.read(), name)
+    return mark_safe(css.replace("</", "<\\/"))
+
+
+def _inline(name):
+    if not _bundled(name):
+        return _read_css(finders.find(name), name)
+    stored = staticfiles_storage.stored_name(name)
+    if stored not in _inlined:
+        _inlined[stored] = _read_css(staticfiles_storage.path(stored), stored)
+    return _inlined[stored]
+
+
+@register.simple_tag
+def font_links():
+    """
+    Preloads for the first-screen fonts, and the self-hosted @font-face
+    rules inline; Google Fonts until build_fonts has vendored them.
+    """
+    preloads = format_html_join(
+        "", '<link rel="preload" href="{}" as="font" type="font/woff2" crossorigin>\n',
+        ((staticfiles_storage.url(path),) for path in settings.FONT_PRELOAD if _available(path)),
+    )
+    if _available(fonts.FONTS_CSS):
+        return format_html("{}<style>{}</style>", preloads, _inline(fonts.FONTS_CSS))
+    return format_html(
+        '{}<link rel="preconnect" href="https://fonts.googleapis.com">\n'
+        '<link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>\n'
+        '<link href="{}" rel="stylesheet">',
+        preloads, settings.GOOGLE_FONTS_URL,
+    )
+
+
+@register.simple_tag(takes_context=True)
+def page_css(context):
+    """
+    Critical CSS inline plus the page's bundle loaded without blocking
+    render, once collectstatic has built them; the source stylesheets
+    otherwise.
+    """
+    page = PurePosixPath(context.template.name).stem if context.template and context.template.name else ""
+    full, critical = assets.bundle_names(page)
+
+    if _bundled(full) and _bundled(critical):
+        href = staticfiles_storage.url(full)
+        return format_html(
+            '<style>{}</style>\n'
+            '<link rel="preload" href="{}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">\n'
+            '<noscript><link rel="stylesheet" href="{}"></noscript>',
+            _inline(critical), href, href,
+        )
+    if _bundled(assets.SITE_CSS):
+        return format_html('<link rel="stylesheet" href="{}">', staticfiles_storage.url(assets.SITE_CSS))
+    return format_html_join(
+        "\n", '<link rel="stylesheet" href="{}">',
+        ((staticfiles_storage.url(path),) for path in settings.ASSET_CSS),
+    )
+
+
+@register.simple_tag
+def page_js():
+    """The script bundle, or the source scripts before it is built"""
+    paths = [assets.SITE_JS] if _bundled(assets.SITE_JS) else settings.ASSET_JS
+    return format_html_join(
+        "\n", '<script src="{}"></script>', ((staticfiles_storage.url(path),) for path in paths)
+    )
@@ -0,0 +1,94 @@
+from functools import lru_cache
+
+from django import template
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import ValidationError
+from django.utils.html import format_html, format_html_join
+
+from ..utils import read_image_header
+
+register = template.Library()
+
+
+def _srcset(storage, entries):
+    return ", ".join(f"{storage.url(name)} {w}w" for w, _, name in entries)
+
+
+@register.simple_tag
+def responsive_image(instance, field_name, sizes="100vw", alt="", css_class="", loading="lazy"):
+    """
+    Emit a <picture> with WebP and JPEG srcsets for an image field that has
+    renditions, or a plain <img> for uploads that predate them.
+    """
+    fieldfile = getattr(instance, field_name)
+    if not fieldfile:
+        return ""
+
+    data = (instance.renditions or {}).get(field_name)
+    if not data:
+        return format_html('<img src="{}" alt="{}" class="{}" loading="{}">', fieldfile.url, alt, css_class, loading)
+
+    storage = fieldfile.storage
+    jpeg = data["jpeg"]
+    sources = format_html_join(
+        "", '<source type="image/{}" srcset="{}" sizes="{}">',
+        ((key, _srcset(storage, data[key]), sizes) for key in ("webp",) if data.get(key)),
+    )
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}" class="{}"'
+        ' loading="{}" decoding="async"></picture>',
+        sources,
+        storage.url(jpeg[-1][2]),
+        _srcset(storage, jpeg),
+        sizes,
+        data["width"],
+        data["height"],
+        alt,
+        css_class,
+        loading,
+    )
+
+
+@lru_cache(maxsize=None)
+def _static_size(path):
+    """Intrinsic size of a static image before collectstatic has recorded it"""
+    found = finders.find(path)
+    if found is None:
+        return None
+    try:
+        with open(found, "rb") as f:
+            _, width, height = read_image_header(f)
+    except ValidationError:
+        return None
+    return width, height
+
+
+@register.simple_tag
+def picture(path, alt="", sizes="100vw", css_class="", loading="lazy", width=None, height=None):
+    """
+    Emit a <picture> with AVIF and WebP srcsets for a static image, from
+    the variants collectstatic recorded (see static_images.py), or a plain
+    <img> with its intrinsic size before they exist. width/height override
+    the size attributes, e.g. for an image shown smaller than it is.
+    """
+    data = getattr(staticfiles_storage, "image_info", {}).get(path)
+    size = (data["width"], data["height"]) if data else _static_size(path)
+    if size and (width or height):
+        width = width or round(size[0] * int(height) / size[1])
+        height = height or round(size[1] * int(width) / size[0])
+    elif size:
+        width, height = size
+
+    dimensions = format_html(' width="{}" height="{}"', width, height) if width and height else ""
+    img = format_html(
+        '<img src="{}"{} alt="{}" class="{}" loading="{}" decoding="async">',
+        staticfiles_storage.url(path), dimensions, alt, css_class, loading,
+    )
+    if not (data and (data.get("avif") or data.get("webp"))):
+        return img
+    sources = format_html_join(
+        "", '<source type="image/{}" srcset="{}" sizes="{}">',
+        ((key, _srcset(staticfiles_storage, data[key]), sizes) for key in ("avif", "webp") if data.get(key)),
+    )
+    return format_html("<picture>{}{}</picture>", sources, img)
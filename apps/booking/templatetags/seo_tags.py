@@ -0,0 +1,11 @@
+from django import template
+
+from .. import seo_head as compiler
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def seo_head(context):
+    """Emit the <head> SEO block for the page's `seo` object"""
+    return compiler.render(context.get("seo"), context["request"])
@@ -1,3 +1,488 @@
-from django.test import TestCase
+import io
+import json
+import os
+import smtplib
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from inspect import iscoroutinefunction
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core import mail
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import ingest, metrics, notifications, page_cache, ratelimit, search, seo_head, sitemap_files, warmup
+from .benchmarks import _async_views
+from .models import BlogPost, ContactSubmission, MovingRequest, SEOSettings, TeamMember
+from .pagination import decode_cursor, encode_cursor, keyset_page
+from .uploadhandlers import OversizedUpload
+from .utils import validate_seo_image, validate_team_photo
+
+QUOTE = {
+    "location_from": "Pune",
+    "location_to": "Mumbai",
+    "name": "Asha Rao",
+    "email": "asha@example.com",
+    "phone": "9800000000",
+    "date": "2030-01-15",
+}
+
+CONTACT = {
+    "name": "Asha Rao",
+    "email": "asha@example.com",
+    "phone": "9800000000",
+    "message": "Do you move pianos?",
+}
+
+
+def _failing_once(function, error=DatabaseError("connection lost")):
+    """A stand-in for function that raises error on its first call"""
+    calls = []
+
+    def wrapper(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 1:
+            raise error
+        return function(*args, **kwargs)
+
+    return wrapper
+
+
+@override_settings(
+    LEAD_NOTIFY_RECIPIENTS=["office@example.com"],
+    LEAD_NOTIFY_DIGEST_THRESHOLD=2,
+    LEAD_NOTIFY_BACKOFF=0,
+)
+class NotificationTests(TestCase):
+    def setUp(self):
+        self.dispatcher = notifications.Dispatcher()
+
+    def _events(self, count):
+        return [(f"New contact from Lead {n}", f"Message {n}", f"lead{n}@example.com") for n in range(count)]
+
+    def test_leads_past_the_threshold_are_held_for_the_digest(self):
+        self.dispatcher._dispatch(self._events(3))
+        self.assertEqual([m.subject for m in mail.outbox], ["New contact from Lead 0", "New contact from Lead 1"])
+        self.assertEqual(mail.outbox[0].reply_to, ["lead0@example.com"])
+        self.assertEqual(len(self.dispatcher.held), 1)
+
+        self.dispatcher.window_end = 0  # the minute is up
+        self.dispatcher._dispatch([])
+        self.assertEqual(mail.outbox[-1].subject, "1 new leads")
+        self.assertIn("Lead 2", mail.outbox[-1].body)
+        self.assertEqual(self.dispatcher.held, [])
+
+    def test_batch_is_sent_over_one_connection(self):
+        with mock.patch.object(notifications, "get_connection", wraps=notifications.get_connection) as get_connection:
+            self.dispatcher._dispatch(self._events(2))
+        self.assertEqual(get_connection.call_count, 1)
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_failed_send_is_retried(self):
+        failing = _failing_once(notifications.get_connection, smtplib.SMTPServerDisconnected("gone"))
+        with mock.patch.object(notifications, "get_connection", failing):
+            self.assertTrue(notifications.send([notifications._message("Subject", "Body")]))
+        self.assertEqual(len(mail.outbox), 1)
+
+    @override_settings(LEAD_NOTIFY_RETRIES=1)
+    def test_send_gives_up_after_the_retries(self):
+        with mock.patch.object(notifications, "get_connection", side_effect=OSError("refused")) as get_connection:
+            with self.assertLogs("booking.notifications", "ERROR"):
+                self.assertFalse(notifications.send([notifications._message("Subject", "Body")]))
+        self.assertEqual(get_connection.call_count, 2)
+
+    def test_retry_only_resends_unsent_messages(self):
+        connection = mock.MagicMock()
+        connection.__enter__.return_value = connection
+        connection.send_messages.side_effect = [1, smtplib.SMTPServerDisconnected("gone"), 1, 1]
+        messages = [notifications._message(subject, "Body") for subject in ("A", "B", "C")]
+        with mock.patch.object(notifications, "get_connection", return_value=connection):
+            self.assertTrue(notifications.send(messages))
+        sent = [call.args[0][0].subject for call in connection.send_messages.call_args_list]
+        self.assertEqual(sent, ["A", "B", "B", "C"])
+
+    @override_settings(LEAD_NOTIFY_ASYNC=False)
+    def test_inline_send_is_not_retried(self):
+        with mock.patch.object(notifications, "get_connection", side_effect=OSError("refused")) as get_connection:
+            with self.assertLogs("booking.notifications", "ERROR"):
+                notifications.notify(ContactSubmission(**CONTACT))
+        self.assertEqual(get_connection.call_count, 1)
+
+    @override_settings(LEAD_NOTIFY_ASYNC=False, RATELIMIT_ENABLED=False)
+    def test_accepted_lead_is_mailed(self):
+        cache.clear()
+        self.client.post(reverse("contact"), CONTACT)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["office@example.com"])
+        self.assertIn("Do you move pianos?", mail.outbox[0].body)
+
+
+@override_settings(LEAD_NOTIFY_ASYNC=False, LEAD_NOTIFY_RECIPIENTS=[], RATELIMIT_ENABLED=False)
+class IdempotencyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_repeat_is_saved_once(self):
+        for _ in range(2):
+            response = self.client.post(reverse("home"), QUOTE)
+            self.assertRedirects(response, reverse("home"), fetch_redirect_response=False)
+        self.assertEqual(MovingRequest.objects.count(), 1)
+
+    def test_whitespace_and_case_do_not_make_a_new_lead(self):
+        self.client.post(reverse("contact"), CONTACT)
+        self.client.post(reverse("contact"), {**CONTACT, "name": "  asha   RAO ", "email": "ASHA@example.com"})
+        self.assertEqual(ContactSubmission.objects.count(), 1)
+
+    def test_retry_after_failed_submit_is_saved(self):
+        with mock.patch.object(ingest, "submit", _failing_once(ingest.submit)):
+            with self.assertRaises(DatabaseError):
+                self.client.post(reverse("home"), QUOTE)
+            self.assertEqual(MovingRequest.objects.count(), 0)
+
+            response = self.client.post(reverse("home"), QUOTE)
+        self.assertRedirects(response, reverse("home"), fetch_redirect_response=False)
+        self.assertEqual(MovingRequest.objects.count(), 1)
+
+
+class PageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # The first request creates each page's SEOSettings, which bumps its tag
+        self.client.get(reverse("home"))
+        self.client.get(reverse("blog:list"))
+
+    def test_second_request_is_a_hit(self):
+        self.assertIsNone(self.client.get(reverse("ourcompany")).get("X-Page-Cache"))
+        self.client.get(reverse("ourcompany"))
+        response = self.client.get(reverse("ourcompany"))
+        self.assertEqual(response.get("X-Page-Cache"), "hit")
+        self.assertContains(response, "<html")
+
+    def test_bumped_tag_is_a_miss(self):
+        self.client.get(reverse("home"))
+        page_cache.bump("seo:Home")
+        self.assertIsNone(self.client.get(reverse("home")).get("X-Page-Cache"))
+
+    def test_cached_form_gets_fresh_tokens(self):
+        first = self.client.get(reverse("home"))
+        second = self.client.get(reverse("home"))
+        self.assertEqual(second.get("X-Page-Cache"), "hit")
+        self.assertNotContains(second, page_cache.CSRF_PLACEHOLDER.decode())
+        self.assertNotContains(second, page_cache.TOKEN_PLACEHOLDER.decode())
+        token = page_cache.TOKEN_INPUT_RE.search(first.content).group(0)
+        self.assertNotIn(token, second.content)
+
+    def test_revalidation_is_not_modified(self):
+        etag = self.client.get(reverse("home"))["ETag"]
+        response = self.client.get(reverse("home"), headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertIn("no-cache", response["Cache-Control"])
+
+        page_cache.bump("seo:Home")
+        self.assertEqual(self.client.get(reverse("home"), headers={"if-none-match": etag}).status_code, 200)
+
+    def test_posts_bypass_the_cache(self):
+        with override_settings(RATELIMIT_ENABLED=False, LEAD_NOTIFY_RECIPIENTS=[]):
+            response = self.client.post(reverse("home"), {})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.get("X-Page-Cache"))
+
+    def test_tracking_parameters_share_the_cached_page(self):
+        self.client.get(reverse("home"))
+        response = self.client.get(reverse("home"), {"utm_source": "newsletter", "gclid": "abc"})
+        self.assertEqual(response.get("X-Page-Cache"), "hit")
+
+    def test_cursor_parameters_are_part_of_the_key(self):
+        self.client.get(reverse("blog:list"))
+        self.assertEqual(self.client.get(reverse("blog:list")).get("X-Page-Cache"), "hit")
+        response = self.client.get(reverse("blog:list"), {"after": "1700000000000000-1"})
+        self.assertIsNone(response.get("X-Page-Cache"))
+
+
+class KeysetCursorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        # Posts 1 and 2 share a timestamp, so the id breaks the tie
+        for n, age in enumerate([0, 1, 1, 2, 3]):
+            post = BlogPost.objects.create(title=f"Post {n}", slug=f"post-{n}", content="Text", published=True)
+            BlogPost.objects.filter(pk=post.pk).update(created_at=now - timedelta(days=age))
+        cls.posts = BlogPost.objects.order_by("-created_at", "-pk")
+
+    def test_cursor_round_trips(self):
+        post = self.posts[0]
+        self.assertEqual(decode_cursor(encode_cursor(post)), (post.created_at, post.pk))
+
+    def test_pages_walk_forwards_and_back(self):
+        expected = list(self.posts)
+        first = keyset_page(BlogPost.objects.all(), 2)
+        second = keyset_page(BlogPost.objects.all(), 2, after=first.next_cursor)
+        third = keyset_page(BlogPost.objects.all(), 2, after=second.next_cursor)
+        self.assertEqual(list(first) + list(second) + list(third), expected)
+        self.assertFalse(first.has_previous)
+        self.assertFalse(third.has_next)
+
+        back = keyset_page(BlogPost.objects.all(), 2, before=third.previous_cursor)
+        self.assertEqual(list(back), list(second))
+        self.assertTrue(back.has_previous and back.has_next)
+
+    def test_archive_links_to_the_next_page(self):
+        with override_settings(BLOG_PAGE_SIZE=2):
+            response = self.client.get(reverse("blog:list"))
+        self.assertContains(response, f"?after={response.context['page'].next_cursor}")
+
+    def test_out_of_range_cursor_is_not_found(self):
+        for cursor in ("99999999999999999999-1", "1700000000000000-99999999999999999999", "abc"):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.client.get(reverse("blog:list"), {"after": cursor}).status_code, 404)
+
+
+class BlogSearchTests(TestCase):
+    def test_saves_reach_the_index(self):
+        post = BlogPost.objects.create(title="Packing pianos", slug="pianos", content="Text", published=True)
+        self.assertEqual([p.id for p in search.search("piano")], [post.id])
+        self.assertEqual(search.check_fts_triggers(databases=["default"]), [])
+
+    def test_check_reports_dropped_triggers(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER booking_blogpost_fts_au")
+        errors = search.check_fts_triggers(databases=["default"])
+        self.assertEqual([e.id for e in errors], ["booking.E001"])
+        self.assertIn("booking_blogpost_fts_au", errors[0].msg)
+
+
+class SitemapFileTests(TestCase):
+    def setUp(self):
+        self.directory = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.enterContext(override_settings(SITEMAP_ROOT=self.directory))
+
+    def _parts(self):
+        return {p.name for p in self.directory.glob("blog-*.xml")}
+
+    def test_replaced_parts_outlive_the_cached_index(self):
+        BlogPost.objects.create(title="First", slug="first", content="Text", published=True)
+        sitemap_files.build()
+        first = self._parts()
+        BlogPost.objects.create(title="Second", slug="second", content="Text", published=True)
+        sitemap_files.build()
+        self.assertLess(first, self._parts())
+
+        later = time.time() + sitemap_files.INDEX_MAX_AGE
+        with mock.patch.object(sitemap_files.time, "time", return_value=later):
+            sitemap_files.build()
+        self.assertFalse(first & self._parts())
+        self.assertEqual(len(self._parts()), 1)
+
+
+class LeadReplayTests(TestCase):
+    def test_boot_writes_segments_left_by_exited_workers(self):
+        # A pid that is certainly no longer running
+        child = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"], capture_output=True, text=True)
+        record = {"model": "booking.contactsubmission", "fields": {**CONTACT, "submission_id": "6f1c8f0e-0c36-4a8e-9d43-0d1f1b8a7e11"}}
+        with tempfile.TemporaryDirectory() as directory:
+            segment = Path(directory) / f"active-{child.stdout.strip()}.jsonl"
+            segment.write_text(json.dumps(record) + "\n", encoding="utf-8")
+            warmup._done.discard((os.getpid(), "leads"))
+            with override_settings(LEAD_BUFFER_DIR=directory):
+                warmup.run()
+            self.assertFalse(segment.exists())
+        self.assertEqual(ContactSubmission.objects.count(), 1)
+
+    def test_threads_share_one_buffer(self):
+        def slow_buffer(directory):
+            time.sleep(0.05)
+            return mock.Mock(pid=os.getpid())
+
+        buffers = []
+        with mock.patch.object(ingest, "_buffer", None), mock.patch.object(ingest, "LeadBuffer", slow_buffer), \
+                mock.patch("atexit.register"):
+            threads = [threading.Thread(target=lambda: buffers.append(ingest._get_buffer())) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(len({id(buffer) for buffer in buffers}), 1)
+
+
+@override_settings(RATELIMIT_RATES={"contact": "2/m"}, LEAD_NOTIFY_RECIPIENTS=[])
+class RateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_parse_rate(self):
+        self.assertEqual(ratelimit.parse_rate("5/m"), (5, 60))
+        self.assertEqual(ratelimit.parse_rate("20/10m"), (20, 600))
+
+    def test_client_over_its_rate_is_refused(self):
+        for n in range(2):
+            self.assertEqual(self.client.post(reverse("contact"), {**CONTACT, "message": f"Lead {n}"}).status_code, 302)
+        response = self.client.post(reverse("contact"), CONTACT)
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response["Retry-After"]), 0)
+        self.assertEqual(ContactSubmission.objects.count(), 2)
+
+        other_client = self.client.post(reverse("contact"), CONTACT, REMOTE_ADDR="10.0.0.2")
+        self.assertEqual(other_client.status_code, 302)
+
+    def test_gets_are_not_counted(self):
+        for _ in range(3):
+            self.assertEqual(self.client.get(reverse("contact")).status_code, 200)
+
+    @override_settings(RATELIMIT_TRUSTED_PROXIES=["10.0.0.0/8"])
+    def test_forwarded_for_is_believed_from_trusted_proxies_only(self):
+        factory = RequestFactory()
+        proxied = factory.post("/", REMOTE_ADDR="10.0.0.1", HTTP_X_FORWARDED_FOR="203.0.113.9, 10.0.0.7")
+        self.assertEqual(ratelimit.client_ip(proxied), "203.0.113.9")
+        direct = factory.post("/", REMOTE_ADDR="198.51.100.4", HTTP_X_FORWARDED_FOR="203.0.113.9")
+        self.assertEqual(ratelimit.client_ip(direct), "198.51.100.4")
+
+    def test_full_worker_sheds_load(self):
+        with mock.patch.object(ratelimit, "_inflight", threading.BoundedSemaphore(1)) as inflight:
+            inflight.acquire()
+            response = self.client.post(reverse("contact"), CONTACT)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(ContactSubmission.objects.count(), 0)
+
+    def test_redis_hit_is_one_round_trip(self):
+        redis_cache = RedisCache("redis://127.0.0.1:6379/1", {})
+        redis_cache.__dict__["_cache"] = client = mock.Mock()
+        pipe = client.get_client.return_value.pipeline.return_value
+        pipe.execute.return_value = [None, 3]
+        with mock.patch.object(ratelimit, "cache", redis_cache):
+            self.assertEqual(ratelimit.check("quote", "198.51.100.4", "5/m"), 0)
+        key = pipe.incr.call_args.args[0]
+        pipe.set.assert_called_once_with(key, 0, ex=60, nx=True)
+        pipe.execute.assert_called_once_with()
+
+
+@override_settings(LEAD_NOTIFY_RECIPIENTS=[], RATELIMIT_ENABLED=False)
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.enterContext(_async_views(True))
+
+    async def test_pages_render(self):
+        for name in ("home", "contact", "ourcompany", "team"):
+            with self.subTest(name=name):
+                response = await self.async_client.get(reverse(name))
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(iscoroutinefunction(response.resolver_match.func))
+
+    async def test_lead_is_saved_once(self):
+        for _ in range(2):
+            response = await self.async_client.post(reverse("contact"), CONTACT)
+            self.assertRedirects(response, reverse("contact"), fetch_redirect_response=False)
+        self.assertEqual(await ContactSubmission.objects.acount(), 1)
+
+    async def test_retry_after_failed_submit_is_saved(self):
+        async def failing(instance):
+            raise DatabaseError("connection lost")
+
+        with mock.patch.object(ingest, "asubmit", failing):
+            with self.assertRaises(DatabaseError):
+                await self.async_client.post(reverse("home"), QUOTE)
+        await self.async_client.post(reverse("home"), QUOTE)
+        self.assertEqual(await MovingRequest.objects.acount(), 1)
+
+    async def test_page_cache_hit(self):
+        for _ in range(2):
+            await self.async_client.get(reverse("ourcompany"))
+        response = await self.async_client.get(reverse("ourcompany"))
+        self.assertEqual(response.get("X-Page-Cache"), "hit")
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=1.0, PAGE_CACHE_ENABLED=False)
+    async def test_server_timing_counts_queries_run_in_threads(self):
+        response = await self.async_client.get(reverse("team"))
+        self.assertRegex(response["Server-Timing"], r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+
+
+class UploadTests(TestCase):
+    @override_settings(UPLOAD_MAX_FILE_BYTES=5 * 1024 * 1024)
+    def test_oversized_upload_fails_the_size_check(self):
+        upload = OversizedUpload("photo.jpg", "image/jpeg", 6 * 1024 * 1024)
+        for validator, limit in ((validate_team_photo, 2), (validate_seo_image, 5)):
+            with self.subTest(limit=limit):
+                with self.assertRaisesMessage(ValidationError, f"must not exceed {limit} MB"):
+                    validator(upload)
+
+    def test_oversized_upload_has_no_contents(self):
+        upload = OversizedUpload("photo.jpg", "image/jpeg", 6 * 1024 * 1024)
+        for access in (upload.read, lambda: upload.seek(0), upload.chunks):
+            self.assertRaises(ValueError, access)
+
+
+    def test_forced_rebuild_replaces_the_rendition_files(self):
+        buffer = io.BytesIO()
+        Image.new("RGB", (400, 300), "teal").save(buffer, "JPEG")
+        with tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media):
+            TeamMember.objects.create(name="Asha", role="Crew", photo=SimpleUploadedFile("asha.jpg", buffer.getvalue()))
+            directory = Path(media) / "team_photos" / "renditions"
+            before = sorted(p.name for p in directory.iterdir())
+            call_command("build_renditions", force=True, stdout=StringIO())
+            self.assertEqual(sorted(p.name for p in directory.iterdir()), before)
+
+
+class SeoHeadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_rows_saved_before_compilation_keep_their_schema(self):
+        schema = '{"@type": "FAQPage", "name": "Moving questions"}'
+        SEOSettings.objects.create(page_name="Home", schema_json=schema)
+        # As left by a save from before schema_compiled and head_html existed
+        SEOSettings.objects.filter(page_name="Home").update(schema_compiled="", head_html="", head_hash="")
+        self.assertContains(self.client.get(reverse("home")), "Moving questions")
+
+    def test_default_images_are_resolved_when_served(self):
+        seo = SEOSettings.objects.create(page_name="Home")
+        self.assertIn(seo_head.SITE_ROOT + "__seo_default_og_image__", seo.head_html)
+        with mock.patch.object(staticfiles_storage, "url", lambda path: f"/static/{path}.abc123"):
+            html = seo_head.render(seo, RequestFactory().get("/"))
+        self.assertIn('content="http://testserver/static/images/og-default.jpg.abc123"', html)
+
+    def test_compile_seo_heads_rebuilds_stale_blocks(self):
+        SEOSettings.objects.create(page_name="Home", meta_title="Moving day")
+        SEOSettings.objects.update(head_html="", head_hash="")
+        call_command("compile_seo_heads", stdout=StringIO())
+        self.assertIn("Moving day", SEOSettings.objects.get().head_html)
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+        self.directory = Path(directory)
+        self.enterContext(override_settings(METRICS_ENABLED=True, METRICS_DIR=self.directory))
+        self.enterContext(mock.patch.dict(os.environ))
+        os.environ.pop(metrics.CLEARED_ENV, None)
+
+    def test_prune_drops_exited_processes(self):
+        exited = subprocess.Popen([sys.executable, "-c", ""])
+        exited.wait()
+        for pid in (os.getpid(), exited.pid):
+            for suffix in (".db", ".keys"):
+                (self.directory / f"{pid}{suffix}").touch()
+        metrics.prune()
+        self.assertEqual(sorted(p.name for p in self.directory.iterdir()), [f"{os.getpid()}.db", f"{os.getpid()}.keys"])
+
+    def test_prune_keeps_files_once_the_server_cleared(self):
+        metrics.clear()
+        exited = subprocess.Popen([sys.executable, "-c", ""])
+        exited.wait()
+        (self.directory / f"{exited.pid}.db").touch()
+        metrics.prune()
+        self.assertTrue((self.directory / f"{exited.pid}.db").exists())
@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.core.exceptions import RequestDataTooBig
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+
+
+DISCARDED = "The contents of an oversized upload were discarded."
+
+
+class OversizedUpload(UploadedFile):
+    """Stand-in for a file that was dropped mid-stream; only its size is known"""
+
+    def __init__(self, name, content_type, size, charset=None):
+        super().__init__(None, name, content_type, size, charset)
+
+    def open(self, mode=None):
+        raise ValueError(DISCARDED)
+
+    def chunks(self, chunk_size=None):
+        raise ValueError(DISCARDED)
+
+    def read(self, size=-1):
+        raise ValueError(DISCARDED)
+
+    def seek(self, offset, whence=0):
+        raise ValueError(DISCARDED)
+
+
+class LimitedUploadHandler(FileUploadHandler):
+    """
+    First handler in FILE_UPLOAD_HANDLERS. Rejects request bodies over
+    UPLOAD_MAX_REQUEST_BYTES before any of it is read, and stops passing a
+    file's chunks down the chain once it exceeds UPLOAD_MAX_FILE_BYTES. Such
+    a file arrives as an OversizedUpload, so the field's size validator
+    reports it like any other too-large image.
+    """
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        limit = getattr(settings, "UPLOAD_MAX_REQUEST_BYTES", None)
+        if limit and content_length > limit:
+            raise RequestDataTooBig("Request body exceeded settings.UPLOAD_MAX_REQUEST_BYTES.")
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        limit = getattr(settings, "UPLOAD_MAX_FILE_BYTES", None)
+        if limit and self.received > limit:
+            return None
+        return raw_data
+
+    def file_complete(self, file_size):
+        limit = getattr(settings, "UPLOAD_MAX_FILE_BYTES", None)
+        if limit and self.received > limit:
+            return OversizedUpload(self.file_name, self.content_type, self.received, self.charset)
+        return None
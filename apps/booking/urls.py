@@ -1,21 +1,10 @@
-from django.urls import path
+from django.conf import settings
+from django.urls import include, path
 from .views import *
-from config.settings.sitemap import StaticViewSitemap, BlogSitemap  # adjust import path
-from django.contrib.sitemaps.views import sitemap
-from django.views.decorators.cache import cache_page
 
-sitemaps = {
-    'static': StaticViewSitemap,
-}
-
-# only add blog sitemap if BlogPost exists
-try:
-    from config.settings.sitemap import BlogSitemap  # same module
-    sitemaps['blog'] = BlogSitemap
-except Exception:
-    pass
-
-cached_sitemap = cache_page(60 * 60 * 24)(sitemap) 
+if settings.ASYNC_VIEWS:
+    # Native async pages for ASGI deployments (see booking/async_views.py)
+    from .async_views import contact, home, ourcompany, teams
 
 urlpatterns = [
     path('', home, name='home'),
@@ -23,8 +12,11 @@ urlpatterns = [
     # path('faqs/', faqs, name='faqs'),
     path('ourcompany/', ourcompany, name='ourcompany'),
     # path('rates/', rates, name='rates'),
-    # path('blog/', blog, name='blog'),
+    path('blog/', include('booking.blog_urls')),
     path('teams/', teams, name='team'),
-    path('sitemap.xml', sitemap, {'sitemaps': sitemaps}, name='django_sitemap'),
-    path('sitemap.xml', cached_sitemap, {'sitemaps': sitemaps}, name='django_sitemap'),
-]
\ No newline at end of file
+    path('sitemap.xml', sitemap_index, name='django_sitemap'),
+    path('sitemaps/<str:filename>', sitemap_part, name='sitemap_part'),
+    path('metrics', prometheus_metrics, name='metrics'),
+    path('healthz', healthz, name='healthz'),
+    path('readyz', readyz, name='readyz'),
+]
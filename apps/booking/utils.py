@@ -1,23 +1,78 @@
 from PIL import Image
+from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.utils.deconstruct import deconstructible
 
+from .uploadhandlers import OversizedUpload
 
 
-def validate_team_photo(image):
-    # Open the uploaded image
-    img = Image.open(image)
+def read_image_header(file, formats=None):
+    """
+    Return (format, width, height) by parsing only the image header.
+    PIL's open() is lazy: it reads enough bytes to identify the format and
+    size but decodes no pixel data.
+    """
+    Image.init()  # register every plugin, so any name in formats resolves
+    try:
+        file.seek(0)
+        with Image.open(file, formats=formats) as img:
+            return img.format, img.width, img.height
+    except Image.DecompressionBombError:
+        raise ValidationError("Image has too many pixels.")
+    except (OSError, SyntaxError, ValueError):
+        raise ValidationError("Upload a valid image.")
+    finally:
+        file.seek(0)
 
-    width, height = img.size
 
-    # 1. Validate aspect ratio (must be 1:1)
-    if width != height:
-        raise ValidationError("Image must have a 1:1 aspect ratio (square).")
+@deconstructible
+class ImageValidator:
+    """
+    Cheapest checks first: byte size (no I/O), then the header for format
+    and dimensions. The image itself is never decoded.
+    """
 
-    # 2. Validate minimum intrinsic size
-    if width < 600 or height < 600:
-        raise ValidationError("Image must be at least 600×600 pixels.")
+    def __init__(self, max_bytes=None, min_width=None, min_height=None,
+                 max_pixels=40_000_000, square=False, formats=("JPEG", "PNG", "WEBP")):
+        self.max_bytes = max_bytes
+        self.min_width = min_width
+        self.min_height = min_height
+        self.max_pixels = max_pixels
+        self.square = square
+        self.formats = tuple(formats)
 
-    # Optional: Validate maximum file size (example: 2 MB)
-    max_size = 2 * 1024 * 1024
-    if image.size > max_size:
-        raise ValidationError("Image file size must not exceed 2 MB.")
\ No newline at end of file
+    def __call__(self, image):
+        # Files already in storage were validated when they were uploaded
+        if getattr(image, "_committed", False):
+            return
+
+        # LimitedUploadHandler dropped it mid-stream; there is no header to read
+        if isinstance(image, OversizedUpload):
+            limit = min(filter(None, [self.max_bytes, getattr(settings, "UPLOAD_MAX_FILE_BYTES", None)]))
+            raise ValidationError(f"Image file size must not exceed {limit // (1024 * 1024)} MB.")
+
+        if self.max_bytes and image.size > self.max_bytes:
+            raise ValidationError(
+                f"Image file size must not exceed {self.max_bytes // (1024 * 1024)} MB."
+            )
+
+        _, width, height = read_image_header(image, formats=self.formats)
+
+        if self.max_pixels and width * height > self.max_pixels:
+            raise ValidationError("Image has too many pixels.")
+
+        if self.square and width != height:
+            raise ValidationError("Image must have a 1:1 aspect ratio (square).")
+
+        if (self.min_width and width < self.min_width) or (self.min_height and height < self.min_height):
+            raise ValidationError(f"Image must be at least {self.min_width}×{self.min_height} pixels.")
+
+    def __eq__(self, other):
+        return isinstance(other, ImageValidator) and vars(self) == vars(other)
+
+
+validate_team_photo = ImageValidator(
+    max_bytes=2 * 1024 * 1024, min_width=600, min_height=600, square=True
+)
+
+validate_seo_image = ImageValidator(max_bytes=5 * 1024 * 1024)
@@ -2,56 +2,104 @@ from pyexpat.errors import messages
 from django.shortcuts import render, redirect
 from django.core.exceptions import ObjectDoesNotExist
 from .forms import ContactForm, MovingRequestForm
-from .models import SEOSettings, ContactSubmission, TeamMember
+from .models import SEOSettings, ContactSubmission, TeamMember, BlogPost
 from django.contrib import messages
-from django.core.mail import send_mail  # for email notifications (optional)
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+from . import idempotency, ingest, metrics, page_cache, search, seo_cache, sitemap_files, warmup
+from .page_cache import cache_page_for
+from .pagination import keyset_page
+from .ratelimit import client_ip, ratelimit
+
+
+# SEOSettings created on a page's first view, shared with async_views.py
+SEO_DEFAULTS = {
+    "Home": {
+        'meta_title': "Expert Gati Packers and Movers Pune | Best Moving Company Mumbai",
+        'meta_description': "Expert Gati Packers and Movers - #1 Trusted Packers and Movers in Pune & Mumbai. Professional home & office shifting services across India. Get FREE quotes! ✓Safe ✓Reliable ✓Affordable",
+        'meta_keywords': "packers and movers pune, movers pune, packers movers mumbai, home shifting pune, office relocation pune, best packers movers pune, gati packers pune",
+        'og_title': "Expert Gati Packers and Movers - Pune & Mumbai's #1 Moving Company",
+        'og_description': "Professional packing & moving services in Pune, Mumbai & across India. 10+ years experience, 5000+ happy customers. Get instant free quote!",
+        'twitter_title': "Expert Gati Packers and Movers - Pune & Mumbai",
+        'twitter_description': "Trusted packers and movers in Pune & Mumbai. Safe, affordable & professional relocation services across India.",
+    },
+    "Contact": {
+        'meta_title': "Contact Us - Expert Gati Packers and Movers Pune | Get Free Quote",
+        'meta_description': "Contact Expert Gati Packers and Movers for relocation services in Pune & Mumbai. Call us for FREE quotes. Available 24/7. Email, phone & visit our office for best moving rates.",
+        'meta_keywords': "contact packers movers pune, packers movers phone number pune, movers contact mumbai, free quote packers movers, relocation inquiry pune",
+        'og_title': "Contact Expert Gati Packers and Movers - Get Free Moving Quote",
+        'og_description': "Get in touch with Pune & Mumbai's trusted moving company. Free quotes, 24/7 support, instant response. Call now for relocation assistance!",
+        'twitter_title': "Contact Expert Gati Packers - Free Moving Quote",
+        'twitter_description': "Need movers in Pune or Mumbai? Contact us for instant free quotes and professional moving services.",
+    },
+    "OurCompany": {
+        'meta_title': "About Expert Gati Packers and Movers | 10+ Years Moving Experience",
+        'meta_description': "Learn about Expert Gati Packers and Movers - Pune & Mumbai's trusted moving company since 2013. 10+ years experience, 5000+ happy customers, professional team. Know our story & values.",
+        'meta_keywords': "about expert gati packers, moving company pune history, best movers mumbai, trusted packers movers pune, professional relocation company",
+        'og_title': "About Expert Gati Packers - Leading Moving Company in Pune & Mumbai",
+        'og_description': "Discover why Expert Gati is Pune & Mumbai's most trusted moving company. 10+ years of excellence, certified professionals, 5000+ successful relocations.",
+        'twitter_title': "About Expert Gati Packers and Movers",
+        'twitter_description': "10+ years of moving excellence in Pune & Mumbai. Meet the team behind India's trusted relocation services.",
+    },
+    "Teams": {
+        'meta_title': "Our Professional Moving Team | Expert Gati Packers and Movers",
+        'meta_description': "Meet our experienced and professional moving team. Trained packers, skilled drivers, and courteous staff in Pune & Mumbai. Certified professionals committed to safe relocations.",
+        'meta_keywords': "professional movers team pune, expert packers staff, trained moving crew mumbai, certified relocation team, experienced movers pune",
+        'og_title': "Meet Our Professional Moving Team - Expert Gati Pune & Mumbai",
+        'og_description': "Our certified moving professionals are ready to handle your relocation. Experienced, trained, and committed to excellence in Pune & Mumbai.",
+        'twitter_title': "Our Moving Team - Expert Gati Packers",
+        'twitter_description': "Meet the professional team behind Pune & Mumbai's most trusted moving company. Experienced, certified, and customer-focused.",
+    },
+}
+
+
+def seo_defaults(request, page_name):
+    """SEO_DEFAULTS for page_name, with this request's URL as canonical"""
+    return {**SEO_DEFAULTS[page_name], "canonical_url": request.build_absolute_uri()}
 
 
 def get_or_create_seo(page_name, defaults):
-    """Helper function to get or create SEO settings"""
+    """Helper function to get or create SEO settings (served from seo_cache)"""
+    seo = seo_cache.get(page_name)
+    if seo is not None:
+        return seo
+
     try:
         seo = SEOSettings.objects.get(page_name=page_name)
     except ObjectDoesNotExist:
         seo = SEOSettings.objects.create(page_name=page_name, **defaults)
+
+    seo_cache.set(page_name, seo)
     return seo
 
 
+@ratelimit("quote")
+@cache_page_for("seo:Home")
 def home(request):
     """Home page view"""
-    seo = get_or_create_seo(
-        page_name="Home",
-        defaults={
-            'meta_title': "Expert Gati Packers and Movers Pune | Best Moving Company Mumbai",
-            'meta_description': "Expert Gati Packers and Movers - #1 Trusted Packers and Movers in Pune & Mumbai. Professional home & office shifting services across India. Get FREE quotes! ✓Safe ✓Reliable ✓Affordable",
-            'meta_keywords': "packers and movers pune, movers pune, packers movers mumbai, home shifting pune, office relocation pune, best packers movers pune, gati packers pune",
-            'canonical_url': request.build_absolute_uri(),
-            'og_title': "Expert Gati Packers and Movers - Pune & Mumbai's #1 Moving Company",
-            'og_description': "Professional packing & moving services in Pune, Mumbai & across India. 10+ years experience, 5000+ happy customers. Get instant free quote!",
-            'twitter_title': "Expert Gati Packers and Movers - Pune & Mumbai",
-            'twitter_description': "Trusted packers and movers in Pune & Mumbai. Safe, affordable & professional relocation services across India."
-        }
-    )
+    seo = get_or_create_seo(page_name="Home", defaults=seo_defaults(request, "Home"))
     
     if request.method == "POST":
         form = MovingRequestForm(request.POST)
         if form.is_valid():
             instance = form.save(commit=False)
-            instance.ip_address = request.META.get("REMOTE_ADDR")
-            instance.save()
-
-            # Optional: send email notification (configure EMAIL settings)
-            # send_mail(
-            #     subject=f"New contact from {instance.name}",
-            #     message=instance.message,
-            #     from_email=instance.email,
-            #     recipient_list=["you@yourdomain.com"],
-            # )
+            instance.ip_address = client_ip(request)
+            # A repeat of an earlier submission gets the same success redirect
+            # (ingest.submit also queues the email notification)
+            if idempotency.submit_once(instance, form.cleaned_data, ingest.submit):
+                metrics.count_submission("quote", "accepted")
+            else:
+                metrics.count_submission("quote", "duplicate")
 
             messages.success(request, "Thanks! Your message has been sent. We'll contact you shortly.")
             return redirect("home")  # reload page (seo will be reloaded)
         else:
             # Form invalid — show errors and SEO together
             messages.error(request, "Please fix the errors below.")
+            metrics.count_submission("quote", "invalid")
     else:
         form = MovingRequestForm()
 
@@ -59,43 +107,30 @@ def home(request):
     return render(request, "pages/home.html", {"seo": seo, "form": form})
 
 
+@ratelimit("contact")
 def contact(request):
     """Contact page view — handles form POST and always provides SEO data."""
     # Ensure SEO is available for both GET and POST renderings
-    seo = get_or_create_seo(
-        page_name="Contact",
-        defaults={
-            'meta_title': "Contact Us - Expert Gati Packers and Movers Pune | Get Free Quote",
-            'meta_description': "Contact Expert Gati Packers and Movers for relocation services in Pune & Mumbai. Call us for FREE quotes. Available 24/7. Email, phone & visit our office for best moving rates.",
-            'meta_keywords': "contact packers movers pune, packers movers phone number pune, movers contact mumbai, free quote packers movers, relocation inquiry pune",
-            'canonical_url': request.build_absolute_uri(),
-            'og_title': "Contact Expert Gati Packers and Movers - Get Free Moving Quote",
-            'og_description': "Get in touch with Pune & Mumbai's trusted moving company. Free quotes, 24/7 support, instant response. Call now for relocation assistance!",
-            'twitter_title': "Contact Expert Gati Packers - Free Moving Quote",
-            'twitter_description': "Need movers in Pune or Mumbai? Contact us for instant free quotes and professional moving services."
-        }
-    )
+    seo = get_or_create_seo(page_name="Contact", defaults=seo_defaults(request, "Contact"))
 
     if request.method == "POST":
         form = ContactForm(request.POST)
         if form.is_valid():
             instance = form.save(commit=False)
-            instance.ip_address = request.META.get("REMOTE_ADDR")
-            instance.save()
-
-            # Optional: send email notification (configure EMAIL settings)
-            # send_mail(
-            #     subject=f"New contact from {instance.name}",
-            #     message=instance.message,
-            #     from_email=instance.email,
-            #     recipient_list=["you@yourdomain.com"],
-            # )
+            instance.ip_address = client_ip(request)
+            # A repeat of an earlier submission gets the same success redirect
+            # (ingest.submit also queues the email notification)
+            if idempotency.submit_once(instance, form.cleaned_data, ingest.submit):
+                metrics.count_submission("contact", "accepted")
+            else:
+                metrics.count_submission("contact", "duplicate")
 
             messages.success(request, "Thanks! Your message has been sent. We'll contact you shortly.")
             return redirect("contact")  # reload page (seo will be reloaded)
         else:
             # Form invalid — show errors and SEO together
             messages.error(request, "Please fix the errors below.")
+            metrics.count_submission("contact", "invalid")
     else:
         form = ContactForm()
 
@@ -121,21 +156,10 @@ def faqs(request):
     return render(request, "pages/faqs.html", {"seo": seo})
 
 
+@cache_page_for("seo:OurCompany")
 def ourcompany(request):
     """Our Company page view"""
-    seo = get_or_create_seo(
-        page_name="OurCompany",
-        defaults={
-            'meta_title': "About Expert Gati Packers and Movers | 10+ Years Moving Experience",
-            'meta_description': "Learn about Expert Gati Packers and Movers - Pune & Mumbai's trusted moving company since 2013. 10+ years experience, 5000+ happy customers, professional team. Know our story & values.",
-            'meta_keywords': "about expert gati packers, moving company pune history, best movers mumbai, trusted packers movers pune, professional relocation company",
-            'canonical_url': request.build_absolute_uri(),
-            'og_title': "About Expert Gati Packers - Leading Moving Company in Pune & Mumbai",
-            'og_description': "Discover why Expert Gati is Pune & Mumbai's most trusted moving company. 10+ years of excellence, certified professionals, 5000+ successful relocations.",
-            'twitter_title': "About Expert Gati Packers and Movers",
-            'twitter_description': "10+ years of moving excellence in Pune & Mumbai. Meet the team behind India's trusted relocation services."
-        }
-    )
+    seo = get_or_create_seo(page_name="OurCompany", defaults=seo_defaults(request, "OurCompany"))
     return render(request, "pages/our-company.html", {"seo": seo})
 
 
@@ -157,8 +181,9 @@ def rates(request):
     return render(request, "pages/rates.html", {"seo": seo})
 
 
+@cache_page_for("seo:Blog", "blog", params=("after", "before"))
 def blog(request):
-    """Blog page view"""
+    """Blog archive, paginated by (created_at, id) cursors"""
     seo = get_or_create_seo(
         page_name="Blog",
         defaults={
@@ -172,24 +197,123 @@ def blog(request):
             'twitter_description': "Get expert moving tips, packing hacks, and relocation guides. Your complete resource for stress-free moving in Pune & Mumbai."
         }
     )
-    return render(request, "pages/blog.html", {"seo": seo})
+    posts = BlogPost.objects.filter(published=True).only("title", "slug", "excerpt", "created_at")
+    try:
+        page = keyset_page(
+            posts,
+            getattr(settings, "BLOG_PAGE_SIZE", 9),
+            after=request.GET.get("after"),
+            before=request.GET.get("before"),
+        )
+    except ValueError:
+        raise Http404("Invalid page cursor")
+    return render(request, "pages/blog.html", {"seo": seo, "page": page})
+
+
+def blog_search(request):
+    """Full-text search over published posts (see booking/search.py)"""
+    query = request.GET.get("q", "").strip()[:200]
+    seo = SEOSettings(
+        page_name="Blog",
+        meta_title=f"Search: {query} | Expert Gati Packers Blog" if query else "Search | Expert Gati Packers Blog",
+        robots="noindex, follow",
+    )
+    return render(request, "pages/blog-search.html", {
+        "seo": seo,
+        "query": query,
+        "results": search.search(query),
+    })
+
+
+def blog_detail(request, slug):
+    """Blog post view, cached until the post is next saved"""
+    posts = BlogPost.objects.filter(published=True)
+    updated_at = posts.filter(slug=slug).values_list("updated_at", flat=True).first()
+    if updated_at is None:
+        raise Http404("No such post")
 
+    def render_post():
+        post = posts.get(slug=slug)
+        description = post.excerpt or Truncator(strip_tags(post.content)).chars(160)
+        seo = SEOSettings(
+            page_name="Blog",
+            meta_title=post.title,
+            meta_description=description,
+            canonical_url=request.build_absolute_uri(post.get_absolute_url()),
+            og_title=post.title,
+            og_description=description,
+            og_type="article",
+            twitter_title=post.title,
+            twitter_description=description,
+        )
+        return render(request, "pages/blog-detail.html", {"seo": seo, "post": post})
 
+    return page_cache.cached_response(request, updated_at, render_post)
+
+
+@cache_page_for("seo:Teams", "team")
 def teams(request):
     """Teams page view"""
-    seo = get_or_create_seo(
-        page_name="Teams",
-        defaults={
-            'meta_title': "Our Professional Moving Team | Expert Gati Packers and Movers",
-            'meta_description': "Meet our experienced and professional moving team. Trained packers, skilled drivers, and courteous staff in Pune & Mumbai. Certified professionals committed to safe relocations.",
-            'meta_keywords': "professional movers team pune, expert packers staff, trained moving crew mumbai, certified relocation team, experienced movers pune",
-            'canonical_url': request.build_absolute_uri(),
-            'og_title': "Meet Our Professional Moving Team - Expert Gati Pune & Mumbai",
-            'og_description': "Our certified moving professionals are ready to handle your relocation. Experienced, trained, and committed to excellence in Pune & Mumbai.",
-            'twitter_title': "Our Moving Team - Expert Gati Packers",
-            'twitter_description': "Meet the professional team behind Pune & Mumbai's most trusted moving company. Experienced, certified, and customer-focused."
-        }
-    )
+    seo = get_or_create_seo(page_name="Teams", defaults=seo_defaults(request, "Teams"))
     
     members = TeamMember.objects.all()
-    return render(request, 'pages/team.html', {"seo": seo, 'members': members})
\ No newline at end of file
+    return render(request, 'pages/team.html', {"seo": seo, 'members': members})
+
+
+def prometheus_metrics(request):
+    """Worker metrics for Prometheus (see booking/metrics.py)"""
+    if not metrics.authorized(request):
+        return HttpResponseForbidden("Forbidden", content_type="text/plain; charset=utf-8")
+    response = HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
+    patch_cache_control(response, no_store=True)
+    return response
+
+
+def healthz(request):
+    """Liveness: the process is up and serving"""
+    response = HttpResponse("ok", content_type="text/plain; charset=utf-8")
+    patch_cache_control(response, no_store=True)
+    return response
+
+
+def readyz(request):
+    """Readiness: 200 once this worker has warmed up (see booking/warmup.py)"""
+    if warmup.run():
+        response = HttpResponse("ready", content_type="text/plain; charset=utf-8")
+    else:
+        response = HttpResponse("warming up", status=503, content_type="text/plain; charset=utf-8")
+    patch_cache_control(response, no_store=True)
+    return response
+
+
+def _serve_sitemap(request, name, max_age, immutable=False):
+    """Send a pre-built sitemap file, gzipped when the client accepts it"""
+    path = sitemap_files.root() / name
+    gzipped = path.with_name(name + ".gz")
+    if "gzip" in request.headers.get("Accept-Encoding", "") and gzipped.exists():
+        response = FileResponse(open(gzipped, "rb"), content_type="application/xml", filename=name)
+        response["Content-Encoding"] = "gzip"
+    elif path.exists():
+        response = FileResponse(open(path, "rb"), content_type="application/xml", filename=name)
+    else:
+        raise Http404("Sitemap not found")
+
+    patch_vary_headers(response, ("Accept-Encoding",))
+    patch_cache_control(response, public=True, max_age=max_age)
+    if immutable:
+        patch_cache_control(response, immutable=True)
+    return response
+
+
+def sitemap_index(request):
+    """Sitemap index, built by `manage.py build_sitemaps` and on BlogPost changes"""
+    if not (sitemap_files.root() / sitemap_files.INDEX_NAME).exists():
+        sitemap_files.build()
+    return _serve_sitemap(request, sitemap_files.INDEX_NAME, max_age=sitemap_files.INDEX_MAX_AGE)
+
+
+def sitemap_part(request, filename):
+    """Content-hashed sitemap part; its name changes whenever its content does"""
+    if not sitemap_files.PART_NAME.fullmatch(filename):
+        raise Http404("Sitemap not found")
+    return _serve_sitemap(request, filename, max_age=60 * 60 * 24 * 365, immutable=True)
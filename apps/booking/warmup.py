@@ -0,0 +1,199 @@
+"""
+Worker warm-up, so the first requests after a restart aren't the slow ones.
+
+run() is called as each worker boots: config/wsgi.py and config/asgi.py
+call it once the application is loaded, and config/gunicorn.conf.py again
+from post_worker_init (a no-op by then). In order, it
+
+    imports       initialises PIL's image plugins
+    templates     compiles every template under templates/ into the
+                  cached loader
+    urls          compiles every URL pattern and resolves each URL that
+                  takes no arguments
+    leads         writes lead segments left behind by workers that have
+                  exited (see ingest.replay())
+    seo           loads every SEOSettings row into seo_cache
+    pages         renders the page-cached views (home, company, team and
+                  blog) for SITE_URL's host, filling the page cache
+
+Database connections are per thread and requests are served from other
+threads (gthread's pool, or sync_to_async's under ASGI), so warm-up closes
+the connections it opened rather than leaving them idle.
+
+/readyz answers 503 until every step has succeeded in this process, so a
+load balancer only sends traffic to warm workers; a probe to a worker
+whose warm-up failed (the database was down, say) retries the failed
+steps. /healthz only says the process is up.
+
+uvicorn imports the application inside its event loop, where the ORM
+refuses to run, so there the steps run in a helper thread, which closes
+its connections the same way before it exits.
+"""
+import asyncio
+import logging
+import os
+import threading
+from pathlib import Path
+from time import perf_counter
+from urllib.parse import urlsplit
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.core.exceptions import DisallowedHost
+from django.db import connections
+from django.template import TemplateSyntaxError
+from django.template.loader import get_template
+from django.test import RequestFactory
+from django.urls import NoReverseMatch, URLPattern, URLResolver, get_resolver, resolve, reverse
+
+from . import ingest, seo_cache
+from .models import SEOSettings
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_EXTENSIONS = (".html", ".txt", ".xml")
+
+# The page-cached views, by URL name
+PAGES = ("home", "ourcompany", "team", "blog:list")
+
+_done = set()  # (pid, step) pairs that succeeded
+_lock = threading.Lock()
+
+
+def _enabled():
+    return getattr(settings, "WARMUP_ENABLED", True)
+
+
+def _imports():
+    from PIL import Image
+
+    Image.init()
+
+
+def _templates():
+    for directory in settings.TEMPLATES[0]["DIRS"]:
+        for path in sorted(Path(directory).rglob("*")):
+            if path.suffix not in TEMPLATE_EXTENSIONS:
+                continue
+            name = path.relative_to(directory).as_posix()
+            try:
+                get_template(name)
+            except TemplateSyntaxError as e:
+                # It would fail the same way when requested; not a reason to stay unready
+                logger.warning("Template %s does not compile: %s", name, e)
+
+
+def _patterns(patterns, namespace=""):
+    """Yield (qualified name, pattern) for every URLPattern, compiling each regex"""
+    for pattern in patterns:
+        pattern.pattern.regex  # compiled on first access
+        if isinstance(pattern, URLResolver):
+            prefix = f"{namespace}{pattern.namespace}:" if pattern.namespace else namespace
+            yield from _patterns(pattern.url_patterns, prefix)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield f"{namespace}{pattern.name}", pattern
+
+
+def _urls():
+    for name, _ in _patterns(get_resolver().url_patterns):
+        try:
+            resolve(reverse(name))
+        except NoReverseMatch:
+            pass  # takes arguments; compiling the pattern is all that can be done
+
+
+def _leads():
+    # Segments are claimed by renaming them, so workers booting together
+    # never write the same one twice
+    written = ingest.replay()
+    if written:
+        logger.info("Replayed %s buffered leads left by earlier workers", written)
+
+
+def _seo():
+    for seo in SEOSettings.objects.all():
+        seo_cache.set(seo.page_name, seo)
+
+
+def _pages():
+    site = urlsplit(settings.SITE_URL)
+    factory = RequestFactory(HTTP_HOST=site.netloc)
+    for name in PAGES:
+        request = factory.get(reverse(name), secure=site.scheme == "https")
+        try:
+            request.get_host()
+        except DisallowedHost:
+            logger.info("SITE_URL's host is not in ALLOWED_HOSTS; not priming the page cache")
+            return
+        request.resolver_match = match = resolve(request.path_info)
+        if iscoroutinefunction(match.func):
+            async_to_sync(match.func)(request, *match.args, **match.kwargs)
+        else:
+            match.func(request, *match.args, **match.kwargs)
+
+
+STEPS = [
+    ("imports", _imports),
+    ("templates", _templates),
+    ("urls", _urls),
+    ("leads", _leads),
+    ("seo", _seo),
+    ("pages", _pages),
+]
+
+
+def _warm():
+    pid = os.getpid()
+    timings = []
+    unopened = [connection for connection in connections.all() if connection.connection is None]
+    try:
+        for step, function in STEPS:
+            if (pid, step) in _done:
+                continue
+            start = perf_counter()
+            try:
+                function()
+            except Exception:
+                logger.exception("Warm-up step %s failed; the worker stays unready", step)
+                continue
+            _done.add((pid, step))
+            timings.append(f"{step} {(perf_counter() - start) * 1000:.0f}ms")
+    finally:
+        for connection in unopened:
+            connection.close()
+    if timings:
+        logger.info("Warm-up of worker %s: %s", pid, ", ".join(timings))
+    return ready()
+
+
+def _in_event_loop():
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def run():
+    """Run every step that hasn't yet succeeded in this process; return ready()"""
+    if not _enabled() or ready():
+        return True
+    if not _lock.acquire(blocking=False):
+        return False  # already warming up, in another thread
+    try:
+        if not _in_event_loop():
+            return _warm()
+        thread = threading.Thread(target=_warm, name="warmup")
+        thread.start()
+        thread.join()
+        return ready()
+    finally:
+        _lock.release()
+
+
+def ready():
+    """Whether this process has finished warming up"""
+    if not _enabled():
+        return True
+    pid = os.getpid()
+    return all((pid, step) in _done for step, _ in STEPS)
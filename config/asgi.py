@@ -14,3 +14,11 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.development')
 
 application = get_asgi_application()
+
+# Drop metrics left by exited processes, when no server cleared them at
+# start (see booking/metrics.py), and warm this worker up before it takes
+# traffic (see booking/warmup.py)
+from booking import metrics, warmup  # noqa: E402
+
+metrics.prune()
+warmup.run()
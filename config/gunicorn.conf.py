@@ -0,0 +1,44 @@
+"""
+gunicorn settings for the site:
+
+    gunicorn -c config/gunicorn.conf.py config.wsgi:application
+    gunicorn -c config/gunicorn.conf.py -k uvicorn.workers.UvicornWorker config.asgi:application
+
+Every setting can be overridden on the command line or with the
+environment variables below.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = 30
+
+# Workers record metrics (see booking/metrics.py); commands and shells don't
+os.environ.setdefault("METRICS_ENABLED", "1")
+
+# Each worker loads and warms up the application itself; warm-up state is
+# per process (see booking/warmup.py), so preloading would not save it.
+preload_app = False
+
+
+def on_starting(server):
+    """Start the metrics from zero (see booking/metrics.py)"""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.development")
+    import django
+
+    django.setup()
+    from booking import metrics
+
+    metrics.clear()
+
+
+def post_worker_init(worker):
+    """Finish warm-up before the worker accepts connections (see booking/warmup.py)"""
+    from booking import warmup
+
+    if not warmup.run():
+        worker.log.warning("Worker %s booted without finishing warm-up; /readyz will retry", worker.pid)
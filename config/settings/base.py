@@ -14,12 +14,17 @@ import os
 import sys
 from pathlib import Path
 
+from whitenoise.compress import Compressor
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
 root = lambda *x: os.path.join(BASE_DIR, *x)
 sys.path.insert(0, root("apps"))
 
+# Finds the apps' tests as booking.tests and so on (see config/test_runner.py)
+TEST_RUNNER = "config.test_runner.AppsDiscoverRunner"
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -57,12 +62,15 @@ INSTALLED_APPS += PROJECT_APPS
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    "booking.middleware.MetricsMiddleware",
+    "booking.middleware.ServerTimingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "booking.middleware.ViewTimingMiddleware",
 ]
 
 ROOT_URLCONF = "config.urls"
@@ -163,4 +171,141 @@ CORS_ALLOW_ALL_ORIGINS = True
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
-STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "booking.storage.BundlingStaticFilesStorage"},
+}
+
+# SEO lookup cache (see booking/seo_cache.py)
+SEO_CACHE_TIMEOUT = 60 * 60 * 24  # shared cache entry lifetime, seconds
+SEO_CACHE_L1_TTL = 5  # how often each worker re-checks the shared version
+
+# Full-page cache for the marketing views (see booking/page_cache.py)
+PAGE_CACHE_ENABLED = True
+PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Lead ingestion (see booking/ingest.py): "sync" saves inline, "buffered"
+# appends to a local segment file and bulk-writes it in the background.
+LEAD_INGEST_MODE = "sync"
+LEAD_BUFFER_DIR = BASE_DIR / "var" / "leads"
+LEAD_BUFFER_MAX_DELAY = 2  # seconds before a buffered lead reaches the database
+LEAD_BUFFER_MAX_BATCH = 500
+LEAD_BUFFER_FSYNC = True
+
+# Lead notifications (see booking/notifications.py); empty list disables
+DEFAULT_FROM_EMAIL = os.environ.get("DEFAULT_FROM_EMAIL", "webmaster@localhost")
+LEAD_NOTIFY_RECIPIENTS = [
+    address for address in os.environ.get("LEAD_NOTIFY_RECIPIENTS", "").split(",") if address
+]
+LEAD_NOTIFY_ASYNC = True
+LEAD_NOTIFY_DIGEST_THRESHOLD = 5  # per-minute individual emails before switching to a digest
+LEAD_NOTIFY_RETRIES = 3
+LEAD_NOTIFY_BACKOFF = 2  # seconds, doubled on each retry
+
+# Widths generated for uploaded images (see booking/images.py)
+IMAGE_RENDITION_WIDTHS = (160, 320, 640, 1200)
+
+# Upload limits enforced while the request body streams in
+# (see booking/uploadhandlers.py); per-field limits live in booking/utils.py
+FILE_UPLOAD_HANDLERS = [
+    "booking.uploadhandlers.LimitedUploadHandler",
+    "django.core.files.uploadhandler.MemoryFileUploadHandler",
+    "django.core.files.uploadhandler.TemporaryFileUploadHandler",
+]
+UPLOAD_MAX_REQUEST_BYTES = 12 * 1024 * 1024
+UPLOAD_MAX_FILE_BYTES = 5 * 1024 * 1024
+
+# Absolute URLs in generated files such as the sitemap
+SITE_URL = os.environ.get("SITE_URL", "https://www.expertgatipackers.com")
+
+# Pre-built sitemap files (see booking/sitemap_files.py)
+SITEMAP_ROOT = BASE_DIR / "var" / "sitemaps"
+
+# Blog archive and search (see booking/pagination.py and booking/search.py)
+BLOG_PAGE_SIZE = 9
+BLOG_SEARCH_LIMIT = 20
+
+# Rows fetched per round trip when exporting leads (see booking/exports.py)
+EXPORT_CHUNK_SIZE = 2000
+
+# Lead form throttling (see booking/ratelimit.py); rates are "count/period"
+# with period s, m, h or d, optionally prefixed by a multiplier ("20/10m")
+RATELIMIT_ENABLED = True
+RATELIMIT_RATES = {
+    "quote": "5/10m",
+    "contact": "5/10m",
+}
+RATELIMIT_TRUSTED_PROXIES = [  # addresses or CIDRs whose X-Forwarded-For is believed
+    proxy for proxy in os.environ.get("RATELIMIT_TRUSTED_PROXIES", "").split(",") if proxy
+]
+RATELIMIT_MAX_INFLIGHT = 4  # concurrent form POSTs per worker before a 503; keep below GUNICORN_THREADS
+
+# Repeats of a lead submission within this many seconds are dropped
+# (see booking/idempotency.py)
+LEAD_IDEMPOTENCY_WINDOW = 10 * 60
+
+# Stylesheets and scripts base.html loads, in order. collectstatic merges
+# them into per-page bundles with unused selectors purged and the first
+# screen's rules split out for inlining (see booking/assets.py).
+ASSET_CSS = [
+    "css/style.css",
+    "css/font-icons.css",
+    "css/components/datepicker.css",
+    "demos/movers/movers.css",
+    "css/custom.css",
+]
+ASSET_JS = [
+    "js/plugins.min.js",
+    "js/functions.bundle.js",
+    "js/components/datepicker.js",
+]
+ASSET_PURGE_SAFELIST = []  # classes that only scripts outside ASSET_JS add
+
+# Web fonts (see booking/fonts.py): build_fonts vendors GOOGLE_FONTS_URL
+# into static/, collectstatic cuts the icon fonts behind FONT_ICON_CSS down
+# to the glyphs in use, and FONT_PRELOAD is fetched ahead of the CSS
+GOOGLE_FONTS_URL = "https://fonts.googleapis.com/css2?family=Poppins:wght@300;400;500;600;700&display=swap"
+FONT_ICON_CSS = [
+    "css/icons/font-awesome.css",
+    "css/icons/bootstrap-icons.css",
+    "css/icons/unicons.css",
+]
+FONT_PRELOAD = [
+    "fonts/poppins/poppins-400-latin.woff2",
+    "fonts/poppins/poppins-600-latin.woff2",
+    "fonts/icons/bootstrap-icons.woff2",
+]
+
+# AVIF/WebP variants of the theme's images, made by collectstatic and
+# cached by content hash between deploys (see booking/static_images.py)
+STATIC_IMAGE_DIRS = ["images", "demos"]
+STATIC_IMAGE_WIDTHS = (320, 640, 1024, 1600)
+STATIC_IMAGE_CACHE = BASE_DIR / "var" / "static-images"
+WHITENOISE_SKIP_COMPRESS_EXTENSIONS = [*Compressor.SKIP_COMPRESS_EXTENSIONS, "avif"]
+
+# Server-Timing headers and slow-request logging (see booking/middleware.py).
+# Staff always get the header; a sampled share of other requests does too.
+SERVER_TIMING_ENABLED = True
+SERVER_TIMING_SAMPLE_RATE = 0.0
+SERVER_TIMING_SLOW_MS = 1000
+
+# Timings from the benchmark_views command, recorded by its first run on
+# this machine (see booking/benchmarks.py)
+BENCHMARK_BASELINE = BASE_DIR / "var" / "benchmark_baseline.json"
+
+# Per-worker metrics files, summed by /metrics for Prometheus (see
+# booking/metrics.py). Scrapers send "Authorization: Bearer <METRICS_TOKEN>".
+# Off unless METRICS_ENABLED=1, which config/gunicorn.conf.py sets, so that
+# management commands, tests and shells leave no files behind.
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "") == "1"
+METRICS_DIR = BASE_DIR / "var" / "metrics"
+METRICS_MAX_SERIES = 4096  # float64 slots per worker file
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+# Serve the async home, contact, ourcompany and teams views (see
+# booking/async_views.py). Only for ASGI deployments; see README.
+ASYNC_VIEWS = os.environ.get("DJANGO_ASYNC_VIEWS", "") == "1"
+
+# Warm each worker up as it boots; /readyz answers 503 until that is done
+# (see booking/warmup.py)
+WARMUP_ENABLED = os.environ.get("DJANGO_WARMUP", "1") != "0"
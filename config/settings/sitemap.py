@@ -1,6 +1,8 @@
+import hashlib
+
 from django.urls import reverse
 from django.contrib.sitemaps import Sitemap
-from django.utils import timezone
+from django.db.models import Count, Max, Sum
 
 # If you have a BlogPost model, import it. If not, skip blog sitemap.
 try:
@@ -12,7 +14,8 @@ except Exception:
 class StaticViewSitemap(Sitemap):
     """
     Sitemap for static views defined in your urlpatterns.
-    Keep the list of names in `items()` for maintainability.
+    Keep the list of names in `items()` for maintainability; only names
+    that are actually routed belong here, or the sitemap build fails.
     """
     priority = 0.8
     changefreq = "weekly"
@@ -22,16 +25,19 @@ class StaticViewSitemap(Sitemap):
         return [
             "home",
             "contact",
-            "faqs",
             "ourcompany",
-            "rates",
-            "blog",
+            "blog:list",
             "team",  # note: your url name for teams is 'team' in your provided urls
         ]
 
     def location(self, item):
         return reverse(item)
 
+    def fingerprint(self):
+        """Changes whenever a page is added, removed or re-routed"""
+        locations = "\n".join(self.location(item) for item in self.items())
+        return hashlib.sha256(locations.encode()).hexdigest()
+
 
 if BlogPost is not None:
     class BlogSitemap(Sitemap):
@@ -48,7 +54,15 @@ if BlogPost is not None:
         def items(self):
             # Filter only published posts (adjust field names to your model)
             qs = BlogPost.objects.filter(published=True) if hasattr(BlogPost, "published") else BlogPost.objects.all()
-            return qs.order_by("-updated_at") if hasattr(BlogPost, "updated_at") else qs
+            # Only what location() and lastmod() read; stable order for pagination
+            return qs.only("slug", "created_at", "updated_at").order_by("id")
+
+        def fingerprint(self):
+            """Changes whenever a post is published, unpublished, edited or deleted"""
+            summary = self.items().order_by().aggregate(
+                count=Count("id"), ids=Sum("id"), latest=Max("updated_at")
+            )
+            return hashlib.sha256(repr(sorted(summary.items())).encode()).hexdigest()
 
         def lastmod(self, obj):
             # Use updated_at if present, else created_at, else None
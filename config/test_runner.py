@@ -0,0 +1,20 @@
+"""
+Test runner for the apps/ layout.
+
+The apps are imported from apps/ (settings.base puts it on sys.path), so
+their test modules must be found as booking.tests, not apps.booking.tests,
+or their models end up registered under an app that doesn't exist.
+"""
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class AppsDiscoverRunner(DiscoverRunner):
+    """DiscoverRunner that searches apps/ by default and imports from there"""
+
+    def __init__(self, *args, top_level=None, **kwargs):
+        self.apps_dir = str(settings.BASE_DIR / "apps")
+        super().__init__(*args, top_level=top_level or self.apps_dir, **kwargs)
+
+    def build_suite(self, test_labels=None, **kwargs):
+        return super().build_suite(test_labels or [self.apps_dir], **kwargs)